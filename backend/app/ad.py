@@ -1,30 +1,18 @@
-from ldap3 import Server
-from ldap3 import Connection
-from ldap3 import ALL
-from dotenv import load_dotenv
-import os
+"""Accès simplifié à l'Active Directory.
 
-load_dotenv()
-
-AD_SERVER = os.getenv("AD_SERVER")
-AD_USER = os.getenv("AD_USER")
-AD_PASSWORD = os.getenv("AD_PASSWORD")
-AD_BASE_DN = os.getenv("AD_BASE_DN")
-
-server = Server(AD_SERVER, get_info=ALL)
-conn = Connection(server, AD_USER, AD_PASSWORD, auto_bind=True)
+Aucune connexion n'est ouverte à l'import : les recherches passent par
+le pool de connexions et le cache de ad_service.
+"""
+from .glpi_service import ad_service
 
 
 def get_user_info(login):
-
-    search_filter = f"(sAMAccountName={login})"
-    conn.search(AD_BASE_DN, search_filter, attributes=["displayName", "mail"])
-
-    if conn.entries:
-        entry = conn.entries[0]
+    """Nom affiché et adresse mail d'un utilisateur (login par défaut)."""
+    user_info = ad_service.get_user_info(login)
+    if user_info:
         return {
-            "displayName": str(entry.displayName),
-            "mail": str(entry.mail)
+            "displayName": user_info["displayName"],
+            "mail": user_info["mail"]
         }
 
     return {"displayName": login, "mail": None}
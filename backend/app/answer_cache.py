@@ -0,0 +1,140 @@
+"""Cache sémantique des réponses validées.
+
+Avant de solliciter le LLM, on cherche une question déjà posée dont
+l'embedding est très proche et dont la réponse a été validée par un
+utilisateur (Reponse.validite == 1) : cette réponse est alors réutilisée.
+"""
+import json
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlmodel import Session, select, text
+
+from .config import settings
+from .models import Question, Reponse
+
+
+class AnswerCache:
+    """Recherche de réponses validées par similarité d'embedding."""
+
+    def __init__(self, max_distance: float):
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        # Parcours itératif HNSW disponible (pgvector >= 0.8) ; None : à tester
+        self._iterative_scan: Optional[bool] = None
+
+    def _record(self, found: bool):
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_bypass(self):
+        """Comptabilise une requête ayant explicitement ignoré le cache."""
+        with self._lock:
+            self.bypassed += 1
+
+    def lookup(
+        self, session: Session, embedding: List[float]
+    ) -> Optional[Reponse]:
+        """Cherche une réponse validée pour une question similaire.
+
+        Args:
+            session: Session SQLModel
+            embedding: Embedding de la nouvelle question
+
+        Returns:
+            La réponse validée la plus proche sous max_distance, ou None
+        """
+        if session.get_bind().dialect.name == "postgresql":
+            reponse = self._lookup_pgvector(session, embedding)
+        else:
+            reponse = self._lookup_brute_force(session, embedding)
+
+        self._record(reponse is not None)
+        return reponse
+
+    def _enable_iterative_scan(self, session: Session):
+        """Active le parcours itératif de l'index HNSW pour la transaction."""
+        if self._iterative_scan is False:
+            return
+        try:
+            with session.begin_nested():
+                session.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+            self._iterative_scan = True
+        except Exception as e:
+            self._iterative_scan = False
+            print(f"Note: parcours itératif HNSW indisponible (pgvector < 0.8): {e}")
+
+    def _lookup_pgvector(
+        self, session: Session, embedding: List[float]
+    ) -> Optional[Reponse]:
+        """Recherche via l'index HNSW (distance cosinus pgvector).
+
+        Le filtre sur la validité fait partie du parcours ordonné de
+        l'index : les questions sans réponse validée (dont celles
+        enregistrées à chaque succès du cache, de même embedding) ne
+        peuvent pas évincer la réponse validée. Le parcours itératif
+        poursuit l'exploration de l'index tant que le filtre n'a rien
+        retenu.
+        """
+        self._enable_iterative_scan(session)
+        distance = Question.embedding_question.cosine_distance(embedding)
+        statement = (
+            select(Reponse, distance.label("distance"))
+            .join(Question, Reponse.question_id == Question.id)
+            .where(Reponse.validite == 1)
+            .order_by(distance)
+            .limit(1)
+        )
+        row = session.exec(statement).first()
+        # Seuil appliqué après coup : dans le WHERE, il empêcherait
+        # l'utilisation de l'index
+        if row is None or row[1] > self.max_distance:
+            return None
+        return row[0]
+
+    def _lookup_brute_force(
+        self, session: Session, embedding: List[float]
+    ) -> Optional[Reponse]:
+        """Recherche exhaustive pour SQLite (embeddings stockés en JSON)."""
+        rows = session.exec(
+            select(Reponse, Question.embedding_question)
+            .join(Question, Reponse.question_id == Question.id)
+            .where(Reponse.validite == 1)
+        ).all()
+        if not rows:
+            return None
+
+        matrix = np.asarray(
+            [json.loads(stored) for _, stored in rows], dtype=np.float32
+        )
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        distances = 1.0 - (matrix @ query) / np.where(norms > 0, norms, 1.0)
+
+        best = int(np.argmin(distances))
+        if distances[best] <= self.max_distance:
+            return rows[best][0]
+        return None
+
+    def stats(self) -> Dict:
+        """Compteurs du cache (succès, échecs, contournements)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.ANSWER_CACHE_ENABLED,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = AnswerCache(max_distance=settings.ANSWER_CACHE_MAX_DISTANCE)
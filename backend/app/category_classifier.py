@@ -0,0 +1,238 @@
+"""Classification des questions par catégorie de technicien.
+
+Classifieur au plus proche centroïde : chaque catégorie est représentée
+par la moyenne normalisée de l'embedding de sa description et de ceux
+des questions dont la réponse, attribuée à cette catégorie, a été
+validée. Une question est classée par un produit matrice-vecteur avec
+l'embedding déjà calculé pour /ask : ni tokens de prompt ni tokens
+générés, et un résultat déterministe.
+
+Les centroïdes sont calculés au démarrage puis recalculés en tâche de
+fond : /ask n'attend jamais un calcul et utilise les centroïdes
+précédents pendant qu'un nouveau calcul est en cours.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from .database import engine, run_db
+from .models import Question, Reponse, Technicien
+
+logger = logging.getLogger(__name__)
+
+Example = Tuple[str, Sequence[float]]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+class CategoryClassifier:
+    """Plus proche centroïde sur les embeddings de questions.
+
+    Args:
+        categories: Nom de catégorie -> description
+        embed: Fonction asynchrone texte -> embedding
+        load_history: Fonction asynchrone renvoyant des exemples validés
+            (catégorie, embedding de la question)
+        min_score: Similarité cosinus minimale au centroïde ; en deçà, la
+            question n'est pas classée
+        refresh_interval: Intervalle (s) entre deux calculs des centroïdes,
+            pour intégrer les nouvelles réponses validées
+        retry_interval: Délai (s) avant un nouvel essai après un calcul
+            en échec (Ollama ou base indisponible)
+    """
+
+    def __init__(
+        self,
+        categories: Dict[str, str],
+        embed: Callable[[str], Awaitable[Sequence[float]]],
+        load_history: Optional[Callable[[], Awaitable[List[Example]]]] = None,
+        min_score: float = 0.5,
+        refresh_interval: float = 3600.0,
+        retry_interval: float = 30.0,
+    ):
+        self.categories = categories
+        self.embed = embed
+        self.load_history = load_history
+        self.min_score = min_score
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+
+        self._labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._examples: Dict[str, int] = {}
+        self._built_at: Optional[float] = None
+        self._build_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._rebuild = asyncio.Event()
+
+        self.classified = 0
+        self.unclassified = 0
+        self.builds = 0
+        self.build_errors = 0
+
+    async def build(self):
+        """Calcule les centroïdes (descriptions + historique validé).
+
+        Les centroïdes précédents restent utilisés jusqu'à la fin du calcul.
+        """
+        async with self._build_lock:
+            await self._build()
+
+    async def _build(self):
+        names = list(self.categories)
+        descriptions = await asyncio.gather(
+            *(self.embed(f"{name}: {self.categories[name]}") for name in names)
+        )
+        vectors: Dict[str, List[Sequence[float]]] = {
+            name: [vector] for name, vector in zip(names, descriptions)
+        }
+
+        history = await self.load_history() if self.load_history else []
+        for category, embedding in history:
+            if category in vectors:
+                vectors[category].append(embedding)
+
+        centroids = np.vstack([
+            _normalize(np.asarray(vectors[name], dtype=np.float32)).mean(axis=0)
+            for name in names
+        ])
+        with self._lock:
+            self._labels = names
+            self._centroids = _normalize(centroids)
+            self._examples = {name: len(vectors[name]) - 1 for name in names}
+            self._built_at = time.monotonic()
+            self.builds += 1
+
+    async def run_forever(self):
+        """Calcule les centroïdes, puis les recalcule périodiquement."""
+        while True:
+            self._rebuild.clear()
+            try:
+                await self.build()
+                delay = self.refresh_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.build_errors += 1
+                delay = self.retry_interval
+                logger.warning(f"⚠️ Centroïdes des catégories non calculés: {e}")
+            try:
+                await asyncio.wait_for(self._rebuild.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Lance le calcul (puis le rafraîchissement) en tâche de fond."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        """Arrête le rafraîchissement périodique."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def scores(self, embedding: Sequence[float]) -> Dict[str, float]:
+        """Similarité cosinus de la question à chaque centroïde."""
+        with self._lock:
+            if self._centroids is None:
+                return {}
+            labels, centroids = self._labels, self._centroids
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        return dict(zip(labels, (centroids @ query).tolist()))
+
+    async def classify(
+        self, embedding: Sequence[float]
+    ) -> Tuple[Optional[str], float]:
+        """Catégorie la plus proche d'une question.
+
+        Args:
+            embedding: Embedding de la question
+
+        Returns:
+            Tuple (catégorie, similarité) ; catégorie None si la similarité
+            reste sous min_score, ou si les centroïdes ne sont pas encore
+            calculés
+        """
+        scores = self.scores(embedding)
+        if not scores:
+            return None, 0.0
+
+        label = max(scores, key=scores.get)
+        score = scores[label]
+        with self._lock:
+            if score < self.min_score:
+                self.unclassified += 1
+                return None, score
+            self.classified += 1
+            return label, score
+
+    def invalidate(self):
+        """Demande un recalcul immédiat des centroïdes (tâche de fond)."""
+        self._rebuild.set()
+
+    def stats(self) -> Dict:
+        """Exemples par catégorie et compteurs de classement."""
+        with self._lock:
+            total = self.classified + self.unclassified
+            return {
+                "built": self._centroids is not None,
+                "builds": self.builds,
+                "build_errors": self.build_errors,
+                "age_s": (
+                    time.monotonic() - self._built_at
+                    if self._built_at is not None else None
+                ),
+                "min_score": self.min_score,
+                "examples": dict(self._examples),
+                "classified": self.classified,
+                "unclassified": self.unclassified,
+                "classified_rate": self.classified / total if total else 0.0,
+            }
+
+
+def _select_validated_examples(limit: int) -> List[Example]:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Technicien.nom, Question.embedding_question)
+            .join(Reponse, Reponse.technicien_id == Technicien.id)
+            .join(Question, Reponse.question_id == Question.id)
+            .where(Reponse.validite == 1)
+            .order_by(Reponse.id.desc())
+            .limit(limit)
+        ).all()
+
+    examples = []
+    for category, embedding in rows:
+        # SQLite : embedding sérialisé en JSON ; PostgreSQL : vecteur pgvector
+        if isinstance(embedding, str):
+            embedding = json.loads(embedding)
+        if embedding is not None and len(embedding):
+            examples.append((category, embedding))
+    return examples
+
+
+async def load_validated_examples(limit: int = 5000) -> List[Example]:
+    """Questions dont la réponse validée est attribuée à un technicien.
+
+    Args:
+        limit: Nombre maximal d'exemples (les plus récents)
+
+    Returns:
+        Liste de tuples (catégorie, embedding de la question)
+    """
+    return await run_db(_select_validated_examples, limit)
@@ -1,5 +1,7 @@
 """Configuration centralisée."""
 import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,11 +11,100 @@ class Settings(BaseSettings):
     GLPI_PASSWORD: str = os.getenv("GLPI_PASSWORD", "glpi")
     GLPI_APP_TOKEN: str = os.getenv("GLPI_APP_TOKEN", "")
     USE_MOCK: bool = os.getenv("USE_MOCK", "false").lower() == "true"
+    # Synchronisation de la base de connaissances GLPI (hors mock)
+    GLPI_SYNC_INTERVAL: float = float(os.getenv("GLPI_SYNC_INTERVAL", "300"))
+    GLPI_SYNC_PAGE_SIZE: int = int(os.getenv("GLPI_SYNC_PAGE_SIZE", "100"))
+    # Intervalle (s) de la réconciliation des éléments purgés (0 : désactivée)
+    GLPI_SYNC_RECONCILE_INTERVAL: float = float(
+        os.getenv("GLPI_SYNC_RECONCILE_INTERVAL", "3600")
+    )
     
-    # Ollama
+    # Ollama : un ou plusieurs serveurs (séparés par des virgules)
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://ollama:11434")
+    # Serveurs dédiés à la génération / aux embeddings (défaut : OLLAMA_HOST)
+    OLLAMA_CHAT_HOSTS: str = os.getenv("OLLAMA_CHAT_HOSTS") or OLLAMA_HOST
+    OLLAMA_EMBED_HOSTS: str = os.getenv("OLLAMA_EMBED_HOSTS") or OLLAMA_HOST
+    # Intervalle (s) de vérification des serveurs (joignables, modèle présent)
+    OLLAMA_HEALTH_INTERVAL: float = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "30"))
     MODEL_NAME: str = "mistral"
     EMBEDDING_MODEL: str = "nomic-embed-text"
+    # Durée de résidence en mémoire après un appel ("30m", "1h", "-1" : toujours)
+    CHAT_KEEP_ALIVE: str = os.getenv("CHAT_KEEP_ALIVE", "30m")
+    EMBEDDING_KEEP_ALIVE: str = os.getenv("EMBEDDING_KEEP_ALIVE", "30m")
+    # Préchargement des modèles au démarrage (en tâche de fond)
+    MODEL_WARMUP_ENABLED: bool = os.getenv("MODEL_WARMUP_ENABLED", "true").lower() == "true"
+    # Sollicitation périodique (s) gardant les modèles chargés (0 : désactivée)
+    MODEL_KEEP_WARM_INTERVAL: float = float(os.getenv("MODEL_KEEP_WARM_INTERVAL", "0"))
+
+    # Taille du contexte RAG (tokens estimés) et seuil de quasi-doublon
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_DUPLICATE_THRESHOLD: float = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+    # Tokens générés au plus ; num_ctx est ajusté au prompt, dans cette limite
+    CHAT_NUM_PREDICT: int = int(os.getenv("CHAT_NUM_PREDICT", "512"))
+    CHAT_MAX_CTX: int = int(os.getenv("CHAT_MAX_CTX", "8192"))
+
+    # Classement des questions par catégorie de technicien (plus proche centroïde)
+    CATEGORY_CLASSIFIER_ENABLED: bool = os.getenv("CATEGORY_CLASSIFIER_ENABLED", "true").lower() == "true"
+    # Similarité cosinus minimale au centroïde pour retenir la catégorie
+    CATEGORY_MIN_SCORE: float = float(os.getenv("CATEGORY_MIN_SCORE", "0.5"))
+    # Question non classée : demander le tag [CATEGORY:...] au LLM
+    CATEGORY_LLM_FALLBACK: bool = os.getenv("CATEGORY_LLM_FALLBACK", "true").lower() == "true"
+    CATEGORY_REFRESH_INTERVAL: float = float(os.getenv("CATEGORY_REFRESH_INTERVAL", "3600"))
+    CATEGORY_HISTORY_LIMIT: int = int(os.getenv("CATEGORY_HISTORY_LIMIT", "5000"))
+
+    # Cache des embeddings : LRU mémoire + fichier SQLite (vide = mémoire seule)
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+
+    # Recherche web (API Ollama Web Search) et cache des résultats
+    OLLAMA_API_KEY: Optional[str] = os.getenv("OLLAMA_API_KEY")
+    WEB_SEARCH_URL: str = os.getenv("WEB_SEARCH_URL", "https://ollama.com/api/web_search")
+    WEB_SEARCH_TIMEOUT: float = float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))
+    WEB_SEARCH_CACHE_SIZE: int = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512"))
+    # Âge maximal (s) d'un résultat en cache ; fichier SQLite optionnel (vide = mémoire seule)
+    WEB_SEARCH_CACHE_MAX_AGE: float = float(os.getenv("WEB_SEARCH_CACHE_MAX_AGE", "3600"))
+    WEB_SEARCH_CACHE_PATH: str = os.getenv("WEB_SEARCH_CACHE_PATH", "")
+
+    # Découpage des documents en passages à l'indexation (caractères)
+    PASSAGE_MAX_CHARS: int = int(os.getenv("PASSAGE_MAX_CHARS", "600"))
+    PASSAGE_OVERLAP_CHARS: int = int(os.getenv("PASSAGE_OVERLAP_CHARS", "120"))
+
+    # Recherche GLPI : "lexical" (BM25), "dense" (embeddings) ou "hybrid"
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    # Similarité cosinus minimale en mode dense avant bascule vers le web
+    DENSE_THRESHOLD: float = float(os.getenv("DENSE_THRESHOLD", "0.55"))
+    # Fusion RRF du mode hybride : score = somme(poids / (RRF_K + rang))
+    HYBRID_LEXICAL_WEIGHT: float = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+    HYBRID_DENSE_WEIGHT: float = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+
+    # Cache sémantique des réponses validées
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    # Distance cosinus maximale entre deux questions considérées identiques
+    ANSWER_CACHE_MAX_DISTANCE: float = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.08"))
+
+    # Générations LLM simultanées ; au-delà, file d'attente équitable par utilisateur
+    LLM_MAX_CONCURRENT: int = int(os.getenv("LLM_MAX_CONCURRENT", "2"))
+    # Demandes en attente au-delà desquelles /ask répond 429 (Retry-After)
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "32"))
+    LLM_MAX_QUEUE_PER_USER: int = int(os.getenv("LLM_MAX_QUEUE_PER_USER", "4"))
+    # Attente maximale (s) d'un créneau de génération
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))
+
+    # Questions identiques simultanées : un seul calcul partagé (single-flight)
+    ASK_COALESCING_ENABLED: bool = os.getenv("ASK_COALESCING_ENABLED", "true").lower() == "true"
+
+    # Écriture des questions/réponses : "write_behind" (lots en tâche de fond) ou "sync"
+    PERSISTENCE_MODE: str = os.getenv("PERSISTENCE_MODE", "write_behind")
+    PERSISTENCE_QUEUE_SIZE: int = int(os.getenv("PERSISTENCE_QUEUE_SIZE", "1000"))
+    PERSISTENCE_BATCH_SIZE: int = int(os.getenv("PERSISTENCE_BATCH_SIZE", "100"))
+    # Délai d'attente (s) pour compléter un lot avant écriture
+    PERSISTENCE_FLUSH_INTERVAL: float = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "0.05"))
+    # Identifiants réservés par accès à la séquence
+    PERSISTENCE_ID_BLOCK_SIZE: int = int(os.getenv("PERSISTENCE_ID_BLOCK_SIZE", "50"))
+    # Hors PostgreSQL, écriture différée seulement si un seul processus écrit
+    PERSISTENCE_SINGLE_PROCESS: bool = os.getenv("PERSISTENCE_SINGLE_PROCESS", "false").lower() == "true"
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,109 @@
+"""Assemblage du contexte RAG dans un budget de tokens.
+
+Le temps de prefill du LLM (CPU) croît avec la longueur du prompt : le
+contenu des sources est débarrassé de ses blancs superflus, les sources
+quasi identiques ne sont gardées qu'une fois, et les sources sont
+ajoutées par pertinence décroissante jusqu'à épuisement du budget (la
+dernière pouvant être tronquée).
+"""
+import math
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Sequence, Tuple
+
+from .retrieval import tokenize
+
+# Caractères par token, estimation prudente pour du français (Mistral)
+CHARS_PER_TOKEN = 3.5
+
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation du nombre de tokens d'un texte."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Réduit les blancs : indentation, espaces répétés, lignes vides."""
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.splitlines())
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Coupe un texte à environ `tokens` tokens, sur une fin de mot."""
+    limit = int(tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 2]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > limit // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + " …"
+
+
+def _terms(text: str) -> FrozenSet[str]:
+    return frozenset(tokenize(text))
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Indice de Jaccard entre deux ensembles de termes."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def pack_context(
+    results: Sequence[Dict[str, Any]],
+    budget: int,
+    render: Callable[[int, Dict[str, Any]], str],
+    duplicate_threshold: float = 0.8,
+    min_tokens: int = 48,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Sélectionne et met en forme les sources dans un budget de tokens.
+
+    Args:
+        results: Sources triées par pertinence décroissante
+        budget: Nombre maximal de tokens de contexte
+        render: Mise en forme d'une source (numéro à partir de 1, source)
+        duplicate_threshold: Similarité (Jaccard des termes) au-delà de
+            laquelle une source est écartée comme doublon d'une précédente
+        min_tokens: Contenu minimal d'une source tronquée ; en deçà, elle
+            est écartée
+
+    Returns:
+        Tuple (blocs de contexte, sources retenues au contenu normalisé)
+    """
+    blocks: List[str] = []
+    packed: List[Dict[str, Any]] = []
+    seen: List[FrozenSet[str]] = []
+    used = 0
+
+    for result in results:
+        content = normalize_whitespace(result.get("content") or "")
+        terms = _terms(f"{result.get('title', '')} {content}")
+        if any(_similarity(terms, other) >= duplicate_threshold for other in seen):
+            continue
+
+        source = {**result, "content": content}
+        number = len(packed) + 1
+        block = render(number, source)
+        tokens = estimate_tokens(block)
+
+        if used + tokens > budget:
+            overhead = estimate_tokens(render(number, {**source, "content": ""}))
+            available = budget - used - overhead
+            if available < min_tokens:
+                break
+            source["content"] = truncate_to_tokens(content, available)
+            block = render(number, source)
+            tokens = estimate_tokens(block)
+
+        blocks.append(block)
+        packed.append(source)
+        seen.append(terms)
+        used += tokens
+        if used >= budget:
+            break
+
+    return blocks, packed
@@ -1,4 +1,8 @@
+import asyncio
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
 from sqlmodel import SQLModel, create_engine, text
 
@@ -6,13 +10,50 @@ DATABASE_URL = os.getenv(
     "DATABASE_URL", "postgresql://user:password@db/mydatabase"
 )
 
+# Taille du pool de connexions (hors SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Journalisation des requêtes SQL (coûteuse : désactivée par défaut)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
 connect_args = (
     {"check_same_thread": False}
     if DATABASE_URL.startswith("sqlite")
     else {}
 )
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, echo=True)
+pool_args = (
+    {}
+    if DATABASE_URL.startswith("sqlite")
+    else {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+)
+
+engine = create_engine(
+    DATABASE_URL, connect_args=connect_args, echo=DB_ECHO, **pool_args
+)
+
+# Threads dédiés aux accès base depuis le code asynchrone : un par
+# connexion possible, sans concurrencer le threadpool par défaut
+_db_executor = ThreadPoolExecutor(
+    max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW, thread_name_prefix="db"
+)
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Exécute une fonction d'accès base (synchrone) hors de la boucle.
+
+    Args:
+        func: Fonction utilisant une Session SQLModel
+        *args: Arguments positionnels de func
+        **kwargs: Arguments nommés de func
+
+    Returns:
+        Le résultat de func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor, functools.partial(func, *args, **kwargs)
+    )
 
 
 def create_db_and_tables():
@@ -29,3 +70,20 @@ def create_db_and_tables():
             )
 
     SQLModel.metadata.create_all(engine)
+
+    if "postgresql" in DATABASE_URL:
+        # Index ANN pour le cache sémantique des réponses (distance cosinus)
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_question_embedding_hnsw "
+                        "ON question USING hnsw "
+                        "(embedding_question vector_cosine_ops)"
+                    )
+                )
+                conn.commit()
+        except Exception as e:
+            print(
+                f"Note: Index HNSW non créé: {e}"
+            )
@@ -0,0 +1,104 @@
+"""Cache des embeddings à deux niveaux (mémoire + disque).
+
+Les embeddings sont indexés par empreinte SHA-256 du couple
+(modèle, texte) : changer EMBEDDING_MODEL invalide donc naturellement
+les entrées existantes. Le niveau disque survit aux redémarrages et est
+partagé par les workers uvicorn.
+"""
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .cache import DiskStore, LRUCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """LRU en mémoire devant un stockage SQLite persistant."""
+
+    def __init__(self, maxsize: int, path: Optional[str] = None):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk = DiskStore(path, table="embeddings") if path else None
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Empreinte du couple (modèle, texte)."""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Retourne l'embedding en cache, ou None."""
+        key = self.make_key(model, text)
+
+        embedding = self.memory.get(key)
+        if embedding is not None:
+            return embedding
+
+        if self.disk is not None:
+            try:
+                blob = self.disk.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Cache embeddings disque illisible: {e}")
+                blob = None
+            if blob is not None:
+                embedding = np.frombuffer(blob, dtype=np.float32).tolist()
+                self.memory.set(key, embedding)
+                with self._lock:
+                    self.disk_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, embedding: List[float]):
+        """Enregistre un embedding dans les deux niveaux."""
+        key = self.make_key(model, text)
+        self.memory.set(key, embedding)
+
+        if self.disk is not None:
+            try:
+                self.disk.set(
+                    key, np.asarray(embedding, dtype=np.float32).tobytes()
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Cache embeddings disque non écrit: {e}")
+
+    def stats(self) -> Dict:
+        """Taille et taux de succès de chaque niveau."""
+        memory = self.memory.stats()
+        disk_size = None
+        if self.disk is not None and os.path.exists(self.disk.path):
+            try:
+                disk_size = len(self.disk)
+            except Exception:
+                pass
+
+        with self._lock:
+            memory_hits = memory["hits"]
+            lookups = memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_size": memory["size"],
+                "memory_maxsize": memory["maxsize"],
+                "disk_size": disk_size,
+                "memory_hits": memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (memory_hits + self.disk_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+
+embedding_cache = EmbeddingCache(
+    maxsize=settings.EMBEDDING_CACHE_SIZE,
+    path=settings.EMBEDDING_CACHE_PATH or None,
+)
@@ -3,16 +3,35 @@ from typing import Dict
 from typing import Any
 from datetime import datetime
 from datetime import timedelta
+from functools import cached_property
 import random
 
+from .config import settings
+from .retrieval import KnowledgeIndex
+
 
 class GLPIMockData:
-    """Générateur de données GLPI mockées pour le RAG"""
+    """Générateur de données GLPI mockées pour le RAG.
+
+    Les données et l'index sont générés au premier accès : importer le
+    module (ou l'application hors mode mock) ne coûte rien.
+    """
+
+    @cached_property
+    def tickets(self) -> List[Dict[str, Any]]:
+        return self._generate_tickets()
 
-    def __init__(self):
-        self.tickets = self._generate_tickets()
-        self.kb_articles = self._generate_kb_articles()
-        self.faq_items = self._generate_faq_items()
+    @cached_property
+    def kb_articles(self) -> List[Dict[str, Any]]:
+        return self._generate_kb_articles()
+
+    @cached_property
+    def faq_items(self) -> List[Dict[str, Any]]:
+        return self._generate_faq_items()
+
+    @cached_property
+    def index(self) -> KnowledgeIndex:
+        return self._build_index()
 
     def _generate_tickets(self) -> List[Dict[str, Any]]:
         """Génère des tickets GLPI mockés"""
@@ -271,8 +290,12 @@ Si le reset en libre-service échoue, contacter:
         ]
         return faq
 
-    def search_all(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        results = []
+    def _build_index(self) -> KnowledgeIndex:
+        """Construit l'index de recherche sur tickets, articles KB et FAQ."""
+        index = KnowledgeIndex(
+            max_chars=settings.PASSAGE_MAX_CHARS,
+            overlap=settings.PASSAGE_OVERLAP_CHARS,
+        )
 
         for ticket in self.tickets:
             ticket_text = " ".join(filter(None, [
@@ -280,75 +303,58 @@ Si le reset en libre-service échoue, contacter:
                 ticket["description"],
                 ticket.get("solution", "")
             ]))
-            score = self._simple_score(query, ticket_text)
-            if score > 0:
-                results.append({
-                    "source": "ticket",
-                    "id": ticket["id"],
-                    "title": ticket["title"],
-                    "content": f"""**Problème**:
-                     {ticket['description']}\n\n
-                     **Solution**: {ticket['solution']}""",
-                    "metadata": {
-                        "category": ticket["category"],
-                        "status": ticket["status"],
-                        "priority": ticket["priority"]
-                    },
-                    "score": score
-                })
+            index.upsert({
+                "source": "ticket",
+                "id": ticket["id"],
+                "title": ticket["title"],
+                "content": f"""**Problème**:
+                 {ticket['description']}\n\n
+                 **Solution**: {ticket['solution']}""",
+                "metadata": {
+                    "category": ticket["category"],
+                    "status": ticket["status"],
+                    "priority": ticket["priority"]
+                }
+            }, ticket_text)
 
         for article in self.kb_articles:
-            score = self._simple_score(
-                query, article["title"] + " " + article["content"])
-            if score > 0:
-                results.append({
-                    "source": "kb_article",
-                    "id": article["id"],
-                    "title": article["title"],
-                    "content": article["content"],
-                    "metadata": {
-                        "category": article["category"],
-                        "views": article["views"]
-                    },
-                    "score": score
-                })
+            index.upsert({
+                "source": "kb_article",
+                "id": article["id"],
+                "title": article["title"],
+                "content": article["content"],
+                "metadata": {
+                    "category": article["category"],
+                    "views": article["views"]
+                }
+            }, article["title"] + " " + article["content"])
 
         for faq in self.faq_items:
-            score = self._simple_score(
-                query, faq["question"] + " " + faq["answer"])
-            if score > 0:
-                results.append({
-                    "source": "faq",
-                    "id": faq["id"],
-                    "title": faq["question"],
-                    "content": f"""**Question**: {faq['question']}
-                     \n\n**Réponse**: {faq['answer']}""",
-                    "metadata": {
-                        "category": faq["category"],
-                        "popularity": faq["popularity"]
-                    },
-                    "score": score
-                })
-
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:limit]
-
-    def _simple_score(self, query: str, text: str) -> float:
-
-        query_lower = query.lower()
-        text_lower = text.lower()
-
-        if query_lower in text_lower:
-            return 1.0
-
-        query_words = query_lower.split()
-        matches = sum(1 for word in query_words if len(
-            word) > 2 and word in text_lower)
-
-        if len(query_words) == 0:
-            return 0.0
-
-        return matches / len(query_words)
+            index.upsert({
+                "source": "faq",
+                "id": faq["id"],
+                "title": faq["question"],
+                "content": f"""**Question**: {faq['question']}
+                 \n\n**Réponse**: {faq['answer']}""",
+                "metadata": {
+                    "category": faq["category"],
+                    "popularity": faq["popularity"]
+                }
+            }, faq["question"] + " " + faq["answer"])
+
+        return index
+
+    def search_all(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Recherche BM25 dans tickets, articles KB et FAQ.
+
+        Args:
+            query: Question de l'utilisateur
+            limit: Nombre maximum de résultats
+
+        Returns:
+            Résultats triés par score décroissant (score dans [0, 1])
+        """
+        return self.index.search(query, limit=limit)
 
 
 glpi_mock = GLPIMockData()
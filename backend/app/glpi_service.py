@@ -3,11 +3,21 @@ Service d'infrastructure : GLPI + Active Directory
 Gère uniquement l'interaction avec les systèmes externes.
 """
 import os
+import time
+import asyncio
 import base64
 import logging
-import requests
-from typing import Dict, Optional
-from ldap3 import Server, Connection, ALL
+import threading
+import httpx
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from ldap3 import NONE, SYNC, Server
+from ldap3.core.exceptions import LDAPOperationResult
+from ldap3.core.results import RESULT_NO_SUCH_OBJECT, RESULT_SUCCESS
+from ldap3.utils.conv import escape_filter_chars
+
+from .cache import LRUCache
+from .ldap_pool import LDAPConnectionPool
+from .ticket_cache import TicketCache
 
 logger = logging.getLogger(__name__)
 
@@ -26,56 +36,192 @@ AD_SERVER = os.getenv("AD_SERVER", "34.201.92.124")
 AD_USER = os.getenv("AD_USER", "a2s@m2data.local")
 AD_PASSWORD = os.getenv("AD_PASSWORD", "12345678aS")
 AD_BASE_DN = os.getenv("AD_BASE_DN", "DC=M2DATA,DC=LOCAL")
+# Connexions LDAP liées conservées et cache des fiches utilisateur (secondes)
+AD_POOL_SIZE = int(os.getenv("AD_POOL_SIZE", "5"))
+AD_CACHE_SIZE = int(os.getenv("AD_CACHE_SIZE", "2048"))
+AD_CACHE_TTL = float(os.getenv("AD_CACHE_TTL", "900"))
+AD_NEGATIVE_CACHE_TTL = float(os.getenv("AD_NEGATIVE_CACHE_TTL", "120"))
+# Logins par filtre (|(sAMAccountName=...)...) et taille des pages LDAP
+AD_BULK_CHUNK_SIZE = int(os.getenv("AD_BULK_CHUNK_SIZE", "100"))
+AD_PAGE_SIZE = int(os.getenv("AD_PAGE_SIZE", "500"))
 
 TIMEOUT = 10
+# Connexions HTTP simultanées / conservées (keep-alive) vers GLPI
+GLPI_MAX_CONNECTIONS = int(os.getenv("GLPI_MAX_CONNECTIONS", "20"))
+# Durée de réutilisation d'un jeton de session GLPI (secondes), en deçà
+# du session.gc_maxlifetime PHP du serveur
+GLPI_SESSION_TTL = float(os.getenv("GLPI_SESSION_TTL", "1200"))
+# Tickets dont les détails sont récupérés simultanément (requêtes groupées)
+GLPI_BULK_CONCURRENCY = int(os.getenv("GLPI_BULK_CONCURRENCY", "5"))
+# Cache des détails de tickets : fraîcheur avant revalidation sur date_mod,
+# âge maximal d'une copie servie quand GLPI est injoignable (secondes)
+TICKET_CACHE_SIZE = int(os.getenv("TICKET_CACHE_SIZE", "2048"))
+TICKET_CACHE_TTL = float(os.getenv("TICKET_CACHE_TTL", "30"))
+TICKET_CACHE_MAX_STALE = float(os.getenv("TICKET_CACHE_MAX_STALE", "3600"))
+
+# Ids des champs de l'API search (GET /listSearchOptions/<itemtype>)
+SEARCH_ID = 2
+SEARCH_USER_LOGIN = 1
+SEARCH_TICKET_NAME = 1
+SEARCH_TICKET_REQUESTER = 4
+SEARCH_TICKET_STATUS = 12
+SEARCH_TICKET_DATE = 15
+SEARCH_TICKET_DATE_MOD = 19
+TICKET_DISPLAY = [
+    SEARCH_ID, SEARCH_TICKET_NAME, SEARCH_TICKET_STATUS,
+    SEARCH_TICKET_DATE, SEARCH_TICKET_DATE_MOD,
+]
 
 # ================================================================================
 # GLPI SERVICE
 # ================================================================================
 
 class GLPIService:
-    """Gestion des interactions avec GLPI."""
+    """Gestion des interactions avec GLPI (client HTTP asynchrone).
+    
+    Un seul client httpx (pool keep-alive) et un seul jeton de session,
+    réutilisé par tous les appels jusqu'à expiration : initSession n'est
+    rejoué que si le jeton a dépassé GLPI_SESSION_TTL ou si GLPI le
+    refuse (401), auquel cas la requête est rejouée une fois.
+    """
     
     def __init__(self):
-        self._session_token = None
+        self._session_token: Optional[str] = None
+        self._session_expires = 0.0
+        self._session_lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Login -> id utilisateur GLPI
+        self._user_ids = LRUCache(maxsize=1024)
+        self.ticket_cache = TicketCache(
+            maxsize=TICKET_CACHE_SIZE,
+            ttl=TICKET_CACHE_TTL,
+            max_stale=TICKET_CACHE_MAX_STALE,
+        )
+        
+        self.requests = 0
+        self.session_inits = 0
+        self.reauths = 0
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client HTTP partagé (pool de connexions keep-alive)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=GLPI_URL,
+                timeout=TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=GLPI_MAX_CONNECTIONS,
+                    max_keepalive_connections=GLPI_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Ferme la session GLPI et le pool de connexions HTTP."""
+        await self._close_session()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
-    def _get_session(self) -> Optional[str]:
-        """Ouvre une session GLPI."""
-        if self._session_token:
-            return self._session_token
+    async def _get_session(self, expired: Optional[str] = None) -> Optional[str]:
+        """
+        Retourne le jeton de session courant, ouvert si nécessaire.
         
-        creds = base64.b64encode(f"{GLPI_USER}:{GLPI_PASSWORD}".encode()).decode()
-        headers = {
-            "App-Token": GLPI_APP_TOKEN,
-            "Authorization": f"Basic {creds}"
-        }
+        Args:
+            expired: Jeton refusé par GLPI ; il est remplacé, sauf si une
+                requête concurrente l'a déjà fait
+        """
+        token = self._session_token
+        if token and token != expired and time.monotonic() < self._session_expires:
+            return token
         
-        try:
-            r = requests.get(f"{GLPI_URL}/initSession", headers=headers, timeout=TIMEOUT)
-            r.raise_for_status()
-            self._session_token = r.json().get("session_token")
-            logger.info("✅ GLPI session créée")
-            return self._session_token
-        except Exception as e:
-            logger.error(f"❌ GLPI session: {e}")
-            return None
+        async with self._session_lock:
+            token = self._session_token
+            if token and token != expired and time.monotonic() < self._session_expires:
+                return token
+            
+            creds = base64.b64encode(f"{GLPI_USER}:{GLPI_PASSWORD}".encode()).decode()
+            headers = {
+                "App-Token": GLPI_APP_TOKEN,
+                "Authorization": f"Basic {creds}"
+            }
+            
+            try:
+                r = await self.client.get("/initSession", headers=headers)
+                r.raise_for_status()
+                self._session_token = r.json().get("session_token")
+                self._session_expires = time.monotonic() + GLPI_SESSION_TTL
+                self.session_inits += 1
+                if expired:
+                    self.reauths += 1
+                logger.info("✅ GLPI session créée")
+                return self._session_token
+            except Exception as e:
+                self._session_token = None
+                logger.error(f"❌ GLPI session: {e}")
+                return None
     
-    def _close_session(self):
+    async def _close_session(self):
         """Ferme la session GLPI."""
-        if not self._session_token:
+        token, self._session_token = self._session_token, None
+        if not token or self._client is None or self._client.is_closed:
             return
         try:
-            requests.get(
-                f"{GLPI_URL}/killSession",
-                headers={"App-Token": GLPI_APP_TOKEN, "Session-Token": self._session_token},
+            await self.client.get(
+                "/killSession",
+                headers={"App-Token": GLPI_APP_TOKEN, "Session-Token": token},
                 timeout=5
             )
-        except:
+        except Exception:
             pass
-        finally:
-            self._session_token = None
     
-    def create_ticket(self, username: str, question: str, user_info: Dict = None) -> Optional[Dict]:
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Envoie une requête authentifiée, avec ré-authentification sur 401.
+        
+        Raises:
+            httpx.HTTPError: Si aucune session ne peut être ouverte
+        """
+        headers = {"App-Token": GLPI_APP_TOKEN, **kwargs.pop("headers", {})}
+        token = await self._get_session()
+        
+        for attempt in range(2):
+            if not token:
+                raise httpx.HTTPError("Session GLPI indisponible")
+            self.requests += 1
+            r = await self.client.request(
+                method, path, headers={**headers, "Session-Token": token}, **kwargs
+            )
+            # Jeton expiré côté GLPI (timeout de session PHP, redémarrage...)
+            if r.status_code != 401 or attempt:
+                return r
+            logger.info("🔑 Session GLPI expirée, ré-authentification")
+            token = await self._get_session(expired=token)
+        return r
+    
+    def stats(self) -> Dict:
+        """Compteurs de session et état du pool de connexions."""
+        pool = {"max_connections": GLPI_MAX_CONNECTIONS}
+        transport = getattr(self._client, "_transport", None)
+        connections = getattr(getattr(transport, "_pool", None), "connections", None)
+        if connections is not None:
+            pool["open"] = len(connections)
+            pool["idle"] = sum(1 for c in connections if c.is_idle())
+        
+        return {
+            "requests": self.requests,
+            "session_inits": self.session_inits,
+            "reauths": self.reauths,
+            "session_active": (
+                self._session_token is not None
+                and time.monotonic() < self._session_expires
+            ),
+            "pool": pool,
+            "ticket_cache": self.ticket_cache.stats(),
+        }
+    
+    async def create_ticket(self, username: str, question: str, user_info: Dict = None) -> Optional[Dict]:
         """
         Crée un ticket dans GLPI.
         
@@ -87,10 +233,6 @@ class GLPIService:
         Returns:
             Dict avec id, message ou None si erreur
         """
-        session = self._get_session()
-        if not session:
-            return None
-        
         # Prépare le nom du ticket avec les infos AD si disponibles
         display_name = user_info.get('displayName', username) if user_info else username
         user_email = user_info.get('mail', '') if user_info else ''
@@ -102,13 +244,10 @@ class GLPIService:
         ticket_content += f"\n\nQuestion:\n{question}"
         
         try:
-            r = requests.post(
-                f"{GLPI_URL}/Ticket",
-                headers={
-                    "App-Token": GLPI_APP_TOKEN,
-                    "Session-Token": session,
-                    "Content-Type": "application/json"
-                },
+            r = await self._request(
+                "POST",
+                "/Ticket",
+                headers={"Content-Type": "application/json"},
                 json={
                     "input": {
                         "name": ticket_name,
@@ -118,13 +257,13 @@ class GLPIService:
                         "impact": 3,
                         "priority": 3
                     }
-                },
-                timeout=TIMEOUT
+                }
             )
             r.raise_for_status()
             result = r.json()
             
             if result.get('id'):
+                self.ticket_cache.invalidate(result['id'])
                 logger.info(f"✅ Ticket #{result['id']} créé pour {username}")
                 return {
                     "id": result['id'],
@@ -137,128 +276,483 @@ class GLPIService:
         except Exception as e:
             logger.error(f"❌ Création ticket: {e}")
             return None
+    
+    async def update_ticket(self, ticket_id: int, fields: Dict) -> bool:
+        """
+        Met à jour un ticket GLPI.
+        
+        Args:
+            ticket_id: Id du ticket
+            fields: Champs à modifier (status, urgency, content...)
+        
+        Returns:
+            True si GLPI a accepté la modification
+        """
+        try:
+            r = await self._request(
+                "PUT",
+                f"/Ticket/{ticket_id}",
+                headers={"Content-Type": "application/json"},
+                json={"input": fields}
+            )
+            r.raise_for_status()
+            logger.info(f"✅ Ticket #{ticket_id} mis à jour")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Mise à jour ticket #{ticket_id}: {e}")
+            return False
         finally:
-            self._close_session()
+            # Même en cas d'échec : l'état réel dans GLPI est incertain
+            self.ticket_cache.invalidate(ticket_id)
     
-    def get_ticket_details(self, ticket_id: int) -> Optional[Dict]:
+    async def _get_sub_items(
+        self, ticket_id: int, itemtype: str, strict: bool = False
+    ) -> list:
         """
-        Récupère les détails d'un ticket.
+        Sous-éléments d'un ticket (suivis, solutions).
+        
+        Args:
+            ticket_id: Id du ticket
+            itemtype: Type des sous-éléments (TicketFollowup, ITILSolution)
+            strict: Lever l'erreur au lieu de renvoyer [] en cas d'échec
+        """
+        try:
+            r = await self._request("GET", f"/Ticket/{ticket_id}/{itemtype}")
+            r.raise_for_status()
+            return r.json() or []
+        except Exception as e:
+            if strict:
+                raise
+            logger.warning(f"⚠️ {itemtype}: {e}")
+        return []
+    
+    async def get_ticket_details(
+        self, ticket_id: int, use_cache: bool = True
+    ) -> Optional[Dict]:
+        """
+        Récupère les détails d'un ticket (cache revalidé sur date_mod).
+        
+        Args:
+            ticket_id: Id du ticket
+            use_cache: False pour forcer la lecture complète depuis GLPI
         
         Returns:
             Dict avec id, status, solution ou None
         """
-        session = self._get_session()
-        if not session:
+        if not use_cache:
+            return await self._fetch_ticket_details(ticket_id)
+        try:
+            # Détails partiels jamais mis en cache : toute erreur est levée
+            return await self.ticket_cache.get(
+                ticket_id, self._fetch_complete_ticket_details, self._get_ticket_date_mod
+            )
+        except Exception as e:
+            logger.error(f"❌ Détails ticket #{ticket_id}: {e}")
+            return None
+    
+    async def _get_ticket_date_mod(self, ticket_id: int) -> Optional[str]:
+        """date_mod courant d'un ticket (None s'il n'existe plus)."""
+        r = await self._request("GET", f"/Ticket/{ticket_id}")
+        if r.status_code == 404:
             return None
+        r.raise_for_status()
+        return r.json().get("date_mod")
+    
+    async def _fetch_complete_ticket_details(self, ticket_id: int) -> Optional[Dict]:
+        """Détails d'un ticket ; lève une exception s'ils seraient incomplets."""
+        return await self._fetch_ticket_details(ticket_id, strict=True)
+    
+    async def _fetch_ticket_details(
+        self, ticket_id: int, strict: bool = False
+    ) -> Optional[Dict]:
+        """
+        Lit les détails d'un ticket dans GLPI.
         
-        headers = {"App-Token": GLPI_APP_TOKEN, "Session-Token": session}
+        Le ticket, ses suivis et ses solutions sont demandés simultanément.
         
-        try:
-            # Ticket principal
-            r = requests.get(f"{GLPI_URL}/Ticket/{ticket_id}", headers=headers, timeout=TIMEOUT)
+        Args:
+            ticket_id: Id du ticket
+            strict: Lever l'erreur (ticket, suivis ou solutions illisibles)
+                au lieu de renvoyer None ou des détails partiels
+        
+        Returns:
+            Dict des détails, ou None si le ticket est introuvable
+        """
+        async def get_ticket():
+            r = await self._request("GET", f"/Ticket/{ticket_id}")
+            if r.status_code == 404:
+                return None
             r.raise_for_status()
-            ticket = r.json()
-            
-            solution = None
-            
-            # 1. TicketFollowup (le plus courant)
-            try:
-                r2 = requests.get(f"{GLPI_URL}/Ticket/{ticket_id}/TicketFollowup", headers=headers, timeout=TIMEOUT)
-                if r2.status_code == 200:
-                    followups = r2.json() or []
-                    for followup in reversed(followups):
-                        content = followup.get('content', '').strip()
-                        if content and len(content) > 10:
-                            solution = content
-                            break
-            except Exception as e:
-                logger.warning(f"⚠️ Followups: {e}")
-            
-            # 2. ITILSolution
-            if not solution:
-                try:
-                    r3 = requests.get(f"{GLPI_URL}/Ticket/{ticket_id}/ITILSolution", headers=headers, timeout=TIMEOUT)
-                    if r3.status_code == 200:
-                        solutions = r3.json() or []
-                        if solutions:
-                            solution = solutions[-1].get('content', '').strip()
-                except Exception as e:
-                    logger.warning(f"⚠️ ITILSolution: {e}")
-            
-            # 3. Champ solution direct
-            if not solution and ticket.get('solution'):
-                solution = ticket['solution'].strip()
-            
-            return {
-                "id": ticket.get("id"),
-                "status": ticket.get("status"),
-                "name": ticket.get("name"),
-                "content": ticket.get("content"),
-                "solution": solution,
-                "date": ticket.get("date"),
-                "date_mod": ticket.get("date_mod")
-            }
-            
+            return r.json()
+        
+        try:
+            ticket, followups, solutions = await asyncio.gather(
+                get_ticket(),
+                self._get_sub_items(ticket_id, "TicketFollowup", strict),
+                self._get_sub_items(ticket_id, "ITILSolution", strict),
+            )
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"❌ Détails ticket #{ticket_id}: {e}")
             return None
-        finally:
-            self._close_session()
+        if ticket is None:
+            return None
+        
+        solution = None
+        
+        # 1. TicketFollowup (le plus courant)
+        for followup in reversed(followups):
+            content = (followup.get('content') or '').strip()
+            if content and len(content) > 10:
+                solution = content
+                break
+        
+        # 2. ITILSolution
+        if not solution and solutions:
+            solution = (solutions[-1].get('content') or '').strip()
+        
+        # 3. Champ solution direct
+        if not solution and ticket.get('solution'):
+            solution = ticket['solution'].strip()
+        
+        return {
+            "id": ticket.get("id"),
+            "status": ticket.get("status"),
+            "name": ticket.get("name"),
+            "content": ticket.get("content"),
+            "solution": solution,
+            "date": ticket.get("date"),
+            "date_mod": ticket.get("date_mod")
+        }
     
-    def get_user_tickets(self, username: str, limit: int = 20) -> list:
+    async def get_tickets_details(
+        self, ticket_ids: List[int], concurrency: Optional[int] = None
+    ) -> Dict[int, Optional[Dict]]:
         """
-        Récupère les tickets d'un utilisateur (recherche dans le contenu).
+        Récupère les détails de plusieurs tickets en parallèle.
+        
+        Args:
+            ticket_ids: Identifiants des tickets (doublons ignorés)
+            concurrency: Tickets traités simultanément (défaut :
+                GLPI_BULK_CONCURRENCY) ; chacun émet jusqu'à 3 requêtes
         
         Returns:
-            Liste de tickets
+            Dict id -> détails, ou None si le ticket est introuvable
         """
-        session = self._get_session()
-        if not session:
-            return []
+        semaphore = asyncio.Semaphore(concurrency or GLPI_BULK_CONCURRENCY)
+        unique_ids = list(dict.fromkeys(ticket_ids))
         
-        try:
-            # Note: GLPI search API est complexe, ici on récupère les derniers tickets
-            # et on filtre côté application (pas optimal mais simple)
-            r = requests.get(
-                f"{GLPI_URL}/Ticket",
-                headers={"App-Token": GLPI_APP_TOKEN, "Session-Token": session},
-                params={"range": f"0-{limit*2-1}"},
-                timeout=TIMEOUT
+        async def fetch(ticket_id: int) -> Optional[Dict]:
+            async with semaphore:
+                return await self.get_ticket_details(ticket_id)
+        
+        results = await asyncio.gather(*(fetch(i) for i in unique_ids))
+        return dict(zip(unique_ids, results))
+    
+    async def get_items(
+        self, itemtype: str, start: int = 0, end: int = 49, **params
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Liste une page d'éléments GLPI (getAllItems).
+        
+        Args:
+            itemtype: Type GLPI (Ticket, ITILSolution, KnowbaseItem...)
+            start: Index du premier élément
+            end: Index du dernier élément (inclus)
+            **params: Paramètres additionnels (sort, order, is_deleted...)
+        
+        Returns:
+            Tuple (éléments, nombre total d'après Content-Range ou None)
+        
+        Raises:
+            httpx.HTTPError: En cas d'échec de la requête
+        """
+        r = await self._request(
+            "GET",
+            f"/{itemtype}",
+            params={"range": f"{start}-{end}", **params}
+        )
+        # 400 ERROR_RANGE_EXCEED_TOTAL : page au-delà du dernier élément
+        if r.status_code == 400 and "RANGE_EXCEED" in r.text:
+            return [], None
+        r.raise_for_status()
+        
+        total = None
+        content_range = r.headers.get("Content-Range", "")
+        if "/" in content_range:
+            total = int(content_range.rsplit("/", 1)[1])
+        return r.json() or [], total
+    
+    @staticmethod
+    def _criteria_params(criteria: List[Tuple[int, str, Any]]) -> List[Tuple[str, Any]]:
+        """Encode des critères (champ, type, valeur) pour l'API search."""
+        params = []
+        for i, (field, searchtype, value) in enumerate(criteria):
+            if i:
+                params.append((f"criteria[{i}][link]", "AND"))
+            params += [
+                (f"criteria[{i}][field]", field),
+                (f"criteria[{i}][searchtype]", searchtype),
+                (f"criteria[{i}][value]", value),
+            ]
+        return params
+    
+    async def search(
+        self,
+        itemtype: str,
+        criteria: List[Tuple[int, str, Any]],
+        display: List[int],
+        start: int = 0,
+        end: int = 49,
+        sort: int = 2,
+        order: str = "DESC",
+    ) -> Tuple[List[Dict], int]:
+        """
+        Recherche filtrée côté serveur (API search de GLPI).
+        
+        Args:
+            itemtype: Type GLPI recherché
+            criteria: Liste de (id de champ, searchtype, valeur), combinés en ET
+            display: Ids des champs à renvoyer
+            start: Index du premier résultat
+            end: Index du dernier résultat (inclus)
+            sort: Id du champ de tri
+            order: ASC ou DESC
+        
+        Returns:
+            Tuple (lignes indexées par id de champ, nombre total de résultats)
+        
+        Raises:
+            httpx.HTTPError: En cas d'échec de la requête
+        """
+        params = self._criteria_params(criteria)
+        params += [(f"forcedisplay[{i}]", field) for i, field in enumerate(display)]
+        params += [("range", f"{start}-{end}"), ("sort", sort), ("order", order)]
+        
+        r = await self._request("GET", f"/search/{itemtype}", params=params)
+        # 400 ERROR_RANGE_EXCEED_TOTAL : page au-delà du dernier résultat
+        if r.status_code == 400 and "RANGE_EXCEED" in r.text:
+            return [], start
+        r.raise_for_status()
+        
+        body = r.json() or {}
+        total = body.get("totalcount", 0)
+        content_range = r.headers.get("Content-Range", "")
+        if "/" in content_range:
+            total = int(content_range.rsplit("/", 1)[1])
+        return body.get("data") or [], total
+    
+    async def get_user_id(self, username: str) -> Optional[int]:
+        """Id GLPI d'un utilisateur à partir de son login (mis en cache)."""
+        user_id = self._user_ids.get(username)
+        if user_id is not None:
+            return user_id
+        
+        rows, _ = await self.search(
+            "User",
+            [(SEARCH_USER_LOGIN, "contains", f"^{username}$")],
+            display=[SEARCH_ID],
+            end=0,
+        )
+        if not rows:
+            return None
+        user_id = int(rows[0][str(SEARCH_ID)])
+        self._user_ids.set(username, user_id)
+        return user_id
+    
+    def _ticket_criteria(
+        self,
+        user_id: int,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        before_id: Optional[int] = None,
+    ) -> List[Tuple[int, str, Any]]:
+        criteria = [(SEARCH_TICKET_REQUESTER, "equals", user_id)]
+        if status:
+            # Statut numérique, "notold" (ouverts), "old" (résolus/clos) ou "all"
+            criteria.append((SEARCH_TICKET_STATUS, "equals", status))
+        if since:
+            criteria.append((SEARCH_TICKET_DATE, "morethan", since))
+        if until:
+            criteria.append((SEARCH_TICKET_DATE, "lessthan", until))
+        if before_id:
+            criteria.append((SEARCH_ID, "lessthan", before_id))
+        return criteria
+    
+    @staticmethod
+    def _ticket_from_row(row: Dict) -> Dict:
+        return {
+            "id": int(row[str(SEARCH_ID)]),
+            "name": row.get(str(SEARCH_TICKET_NAME)),
+            "status": row.get(str(SEARCH_TICKET_STATUS)),
+            "date": row.get(str(SEARCH_TICKET_DATE)),
+            "date_mod": row.get(str(SEARCH_TICKET_DATE_MOD)),
+        }
+    
+    async def iter_user_tickets(
+        self,
+        username: str,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page_size: int = 50,
+    ) -> AsyncIterator[Dict]:
+        """
+        Parcourt tous les tickets d'un demandeur, page par page.
+        
+        Chaque page n'est demandée qu'une fois la précédente consommée ;
+        l'en-tête Content-Range indique quand s'arrêter.
+        
+        Args:
+            username: Login du demandeur
+            status: Filtre de statut (voir _ticket_criteria)
+            since: Date d'ouverture minimale (YYYY-MM-DD)
+            until: Date d'ouverture maximale (YYYY-MM-DD)
+            page_size: Tickets par requête
+        
+        Yields:
+            Tickets (id, name, status, date, date_mod), du plus récent au plus ancien
+        """
+        user_id = await self.get_user_id(username)
+        if user_id is None:
+            return
+        
+        criteria = self._ticket_criteria(user_id, status, since, until)
+        start = 0
+        while True:
+            rows, total = await self.search(
+                "Ticket", criteria, TICKET_DISPLAY,
+                start=start, end=start + page_size - 1,
             )
-            r.raise_for_status()
-            tickets = r.json() or []
-            
-            # Filtre par username dans le contenu
-            user_tickets = []
-            for ticket in tickets:
-                if username.lower() in ticket.get('content', '').lower():
-                    user_tickets.append({
-                        "id": ticket.get("id"),
-                        "name": ticket.get("name"),
-                        "status": ticket.get("status"),
-                        "date": ticket.get("date")
-                    })
+            for row in rows:
+                yield self._ticket_from_row(row)
+            start += page_size
+            if not rows or start >= total:
+                return
+    
+    async def get_user_tickets(
+        self,
+        username: str,
+        limit: int = 20,
+        before_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+    ) -> list:
+        """
+        Récupère les tickets d'un demandeur (filtrés par GLPI).
+        
+        Pagination par curseur : passer en before_id l'id du dernier ticket
+        reçu pour obtenir les suivants, sans décalage si de nouveaux
+        tickets arrivent entre deux pages.
+        
+        Returns:
+            Liste de tickets, du plus récent au plus ancien
+        """
+        try:
+            user_id = await self.get_user_id(username)
+            if user_id is None:
+                return []
             
-            return user_tickets[:limit]
+            rows, _ = await self.search(
+                "Ticket",
+                self._ticket_criteria(user_id, status, since, before_id=before_id),
+                TICKET_DISPLAY,
+                end=limit - 1,
+            )
+            return [self._ticket_from_row(row) for row in rows]
             
         except Exception as e:
             logger.error(f"❌ Tickets user {username}: {e}")
             return []
-        finally:
-            self._close_session()
 
 # ================================================================================
 # ACTIVE DIRECTORY SERVICE
 # ================================================================================
 
 class ADService:
-    """Gestion des interactions avec Active Directory."""
+    """Gestion des interactions avec Active Directory.
     
-    def __init__(self):
-        self.server = Server(AD_SERVER, get_info=ALL)
+    Les recherches passent par un pool de connexions liées ; les fiches
+    utilisateur sont gardées en cache AD_CACHE_TTL secondes, et les logins
+    inconnus AD_NEGATIVE_CACHE_TTL secondes.
+    """
+    
+    ATTRIBUTES = [
+        "sAMAccountName",
+        "displayName",
+        "mail",
+        "department",
+        "title",
+        "telephoneNumber",
+        "distinguishedName"
+    ]
+    
+    def __init__(
+        self,
+        server: Optional[Server] = None,
+        client_strategy: str = SYNC,
+    ):
+        self.server = server
         self.user = AD_USER
         self.password = AD_PASSWORD
         self.base_dn = AD_BASE_DN
+        self.client_strategy = client_strategy
+        self._pool: Optional[LDAPConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._users = LRUCache(maxsize=AD_CACHE_SIZE, ttl=AD_CACHE_TTL)
+        self._unknown = LRUCache(maxsize=AD_CACHE_SIZE, ttl=AD_NEGATIVE_CACHE_TTL)
+    
+    @property
+    def pool(self) -> LDAPConnectionPool:
+        """Pool de connexions LDAP, créé à la première recherche.
+        
+        Le schéma de l'annuaire n'est pas lu au bind (get_info=NONE) : seuls
+        des attributs texte sont consultés.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                if self.server is None:
+                    self.server = Server(AD_SERVER, get_info=NONE)
+                self._pool = LDAPConnectionPool(
+                    self.server,
+                    self.user,
+                    self.password,
+                    size=AD_POOL_SIZE,
+                    client_strategy=self.client_strategy,
+                )
+            return self._pool
+    
+    def _entry_to_user(self, login: str, entry) -> Dict:
+        return {
+            "username": login,
+            "displayName": str(entry.displayName) if entry.displayName else login,
+            "mail": str(entry.mail) if entry.mail else None,
+            "department": str(entry.department) if entry.department else None,
+            "title": str(entry.title) if entry.title else None,
+            "phone": str(entry.telephoneNumber) if entry.telephoneNumber else None,
+            "dn": str(entry.distinguishedName) if entry.distinguishedName else None
+        }
+    
+    @staticmethod
+    def _check_search(conn):
+        """
+        Lève une erreur si la dernière recherche a échoué.
+        
+        ldap3 (raise_exceptions=False) renvoie False aussi bien pour une
+        recherche sans résultat que pour une erreur (serveur occupé, délai
+        dépassé...) : seul le code résultat permet de les distinguer.
+        L'erreur levée est une LDAPException, rejouée par pool.run.
+        """
+        result = conn.result or {}
+        code = result.get("result")
+        if code not in (RESULT_SUCCESS, RESULT_NO_SUCH_OBJECT):
+            raise LDAPOperationResult(
+                result=code,
+                description=result.get("description"),
+                message=result.get("message"),
+            )
     
     def get_user_info(self, login: str) -> Optional[Dict]:
         """
@@ -270,51 +764,149 @@ class ADService:
         Returns:
             Dict avec displayName, mail, department, etc. ou None
         """
+        user_info = self._users.get(login)
+        if user_info is not None:
+            return dict(user_info)
+        if self._unknown.get(login) is not None:
+            return None
+        
         try:
-            conn = Connection(
-                self.server,
-                user=self.user,
-                password=self.password,
-                auto_bind=True
-            )
+            search_filter = f"(sAMAccountName={escape_filter_chars(login)})"
             
-            search_filter = f"(sAMAccountName={login})"
-            attributes = [
-                "displayName",
-                "mail",
-                "department",
-                "title",
-                "telephoneNumber",
-                "distinguishedName"
-            ]
+            def search(conn):
+                if not conn.search(
+                    self.base_dn,
+                    search_filter,
+                    attributes=self.ATTRIBUTES
+                ):
+                    self._check_search(conn)
+                return list(conn.entries)
             
-            conn.search(
-                self.base_dn,
-                search_filter,
-                attributes=attributes
-            )
+            entries = self.pool.run(search)
             
-            if conn.entries:
-                entry = conn.entries[0]
-                user_info = {
-                    "username": login,
-                    "displayName": str(entry.displayName) if entry.displayName else login,
-                    "mail": str(entry.mail) if entry.mail else None,
-                    "department": str(entry.department) if entry.department else None,
-                    "title": str(entry.title) if entry.title else None,
-                    "phone": str(entry.telephoneNumber) if entry.telephoneNumber else None,
-                    "dn": str(entry.distinguishedName) if entry.distinguishedName else None
-                }
-                
+            if entries:
+                user_info = self._entry_to_user(login, entries[0])
+                self._users.set(login, user_info)
                 logger.info(f"✅ AD info pour {login}: {user_info['displayName']}")
-                return user_info
+                return dict(user_info)
             
+            self._unknown.set(login, True)
             logger.warning(f"⚠️ Utilisateur {login} non trouvé dans l'AD")
             return None
             
         except Exception as e:
             logger.error(f"❌ AD lookup pour {login}: {e}")
             return None
+    
+    def _search_paged(self, conn, search_filter: str) -> List:
+        """Recherche paginée (contrôle Simple Paged Results, RFC 2696)."""
+        entries = []
+        cookie = None
+        while True:
+            conn.search(
+                self.base_dn,
+                search_filter,
+                attributes=self.ATTRIBUTES,
+                paged_size=AD_PAGE_SIZE,
+                paged_cookie=cookie,
+            )
+            # Une page en échec ne doit pas passer pour la fin des résultats
+            self._check_search(conn)
+            entries.extend(conn.entries)
+            cookie = (
+                conn.result.get("controls", {})
+                .get("1.2.840.113556.1.4.319", {})
+                .get("value", {})
+                .get("cookie")
+            )
+            if not cookie:
+                return entries
+    
+    def get_users_info(
+        self, logins: List[str], chunk_size: Optional[int] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Récupère les informations de plusieurs utilisateurs.
+        
+        Les logins absents du cache sont recherchés par lots, une recherche
+        (|(sAMAccountName=a)(sAMAccountName=b)...) par lot.
+        
+        Args:
+            logins: sAMAccountNames (les doublons sont ignorés)
+            chunk_size: Logins par filtre LDAP (AD_BULK_CHUNK_SIZE par défaut)
+        
+        Returns:
+            Login -> fiche utilisateur, ou None si introuvable
+        """
+        chunk_size = chunk_size or AD_BULK_CHUNK_SIZE
+        results: Dict[str, Optional[Dict]] = {}
+        missing: List[str] = []
+        
+        for login in dict.fromkeys(logins):
+            user_info = self._users.get(login)
+            if user_info is not None:
+                results[login] = dict(user_info)
+            elif self._unknown.get(login) is not None:
+                results[login] = None
+            else:
+                missing.append(login)
+        
+        for i in range(0, len(missing), chunk_size):
+            chunk = missing[i:i + chunk_size]
+            search_filter = "(|{})".format("".join(
+                f"(sAMAccountName={escape_filter_chars(login)})" for login in chunk
+            ))
+            
+            try:
+                entries = self.pool.run(
+                    lambda conn: self._search_paged(conn, search_filter)
+                )
+            except Exception as e:
+                logger.error(f"❌ AD lookup groupé ({len(chunk)} logins): {e}")
+                for login in chunk:
+                    results[login] = None
+                continue
+            
+            # sAMAccountName est insensible à la casse
+            found = {
+                str(entry.sAMAccountName).lower(): entry
+                for entry in entries
+                if entry.sAMAccountName
+            }
+            for login in chunk:
+                entry = found.get(login.lower())
+                if entry is None:
+                    self._unknown.set(login, True)
+                    results[login] = None
+                else:
+                    user_info = self._entry_to_user(login, entry)
+                    self._users.set(login, user_info)
+                    results[login] = dict(user_info)
+        
+        if missing:
+            logger.info(
+                f"✅ AD lookup groupé: {len(missing)} logins, "
+                f"{sum(1 for login in missing if results[login])} trouvés"
+            )
+        return results
+    
+    def invalidate(self, login: str):
+        """Oublie la fiche en cache d'un utilisateur."""
+        self._users.pop(login)
+        self._unknown.pop(login)
+    
+    def close(self):
+        """Ferme les connexions LDAP."""
+        if self._pool is not None:
+            self._pool.close()
+    
+    def stats(self) -> Dict:
+        """État du pool LDAP et du cache des fiches utilisateur."""
+        return {
+            "pool": self._pool.stats() if self._pool is not None else None,
+            "cache": self._users.stats(),
+            "negative_cache": self._unknown.stats(),
+        }
 
 # ================================================================================
 # INSTANCES GLOBALES
@@ -0,0 +1,440 @@
+"""Synchronisation incrémentale de la base de connaissances GLPI.
+
+Un moteur de fond parcourt les tickets, solutions et articles de la base
+de connaissances GLPI triés par date_mod décroissante, jusqu'au dernier
+point de synchronisation (high-water mark), et met à jour l'index de
+recherche local. /ask interroge cet index : aucun appel GLPI sur le
+chemin critique.
+
+Les éléments purgés (articles, qui n'ont pas de corbeille ; tickets et
+solutions supprimés définitivement) ou devenus invisibles au compte de
+service ne réapparaissent dans aucun parcours incrémental : une
+réconciliation périodique relit la liste des identifiants existants et
+retire de l'index ceux qui ont disparu.
+"""
+import asyncio
+import html
+import logging
+import re
+import time
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+)
+
+from .config import settings
+from .glpi_service import GLPIService, glpi_service
+from .retrieval import KnowledgeIndex
+
+logger = logging.getLogger(__name__)
+
+# Statuts GLPI des tickets
+TICKET_STATUS = {
+    1: "Nouveau",
+    2: "En cours (attribué)",
+    3: "En cours (planifié)",
+    4: "En attente",
+    5: "Résolu",
+    6: "Clos",
+}
+# Statut d'une solution refusée par le demandeur
+SOLUTION_REFUSED = 4
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BLANK_RE = re.compile(r"[ \t]+")
+
+
+def html_to_text(value: Optional[str]) -> str:
+    """Convertit un champ riche GLPI (HTML échappé) en texte brut."""
+    if not value:
+        return ""
+    text = html.unescape(html.unescape(value))
+    text = re.sub(r"<br\s*/?>|</p>|</li>|</div>", "\n", text, flags=re.I)
+    text = _TAG_RE.sub("", text)
+    lines = (_BLANK_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class GLPISyncEngine:
+    """Maintient un KnowledgeIndex à jour à partir de l'API REST GLPI.
+
+    Seuls les tickets disposant d'une solution sont indexés : un ticket
+    sans solution n'apporte pas de réponse exploitable.
+    """
+
+    def __init__(
+        self,
+        service: GLPIService,
+        index: Optional[KnowledgeIndex] = None,
+        page_size: int = 100,
+        interval: float = 300.0,
+        reconcile_interval: float = 3600.0,
+    ):
+        self.service = service
+        self.index = index if index is not None else KnowledgeIndex()
+        self.page_size = page_size
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        # Itemtype -> date_mod la plus récente déjà traitée
+        self.high_water: Dict[str, str] = {}
+
+        self._tickets: Dict[int, Dict[str, Any]] = {}
+        self._solutions: Dict[int, str] = {}
+        # Ticket -> (date_mod, id) de la solution la plus récente vue
+        self._solution_versions: Dict[int, Tuple[str, int]] = {}
+        # Articles indexés (FAQ ou base de connaissances)
+        self._kb_items: Set[int] = set()
+        self._last_reconcile: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_changes: Dict[str, int] = {}
+        self.reconciliations = 0
+        self.reconcile_removals = 0
+
+    async def changed_items(
+        self, itemtype: str, since: Optional[str] = None, **params
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Éléments modifiés depuis `since`, du plus récent au plus ancien.
+
+        Les éléments dont date_mod égale `since` sont renvoyés à nouveau :
+        la mise à jour de l'index est idempotente.
+        """
+        start = 0
+        while True:
+            items, total = await self.service.get_items(
+                itemtype,
+                start=start,
+                end=start + self.page_size - 1,
+                sort="date_mod",
+                order="DESC",
+                **params,
+            )
+            for item in items:
+                if since and (item.get("date_mod") or "") < since:
+                    return
+                yield item
+
+            start += self.page_size
+            if len(items) < self.page_size or (total is not None and start >= total):
+                return
+
+    async def sync_once(self) -> Dict[str, int]:
+        """Effectue un passage de synchronisation.
+
+        Returns:
+            Nombre d'éléments traités par itemtype
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            changes = {
+                "Ticket": await self._sync_itemtype("Ticket", self._apply_ticket),
+                "Ticket (corbeille)": await self._sync_itemtype(
+                    "Ticket", self._apply_deleted_ticket, "Ticket:deleted",
+                    is_deleted=1,
+                ),
+                "ITILSolution": await self._sync_itemtype(
+                    "ITILSolution", self._apply_solution
+                ),
+                "KnowbaseItem": await self._sync_itemtype(
+                    "KnowbaseItem", self._apply_kb_item
+                ),
+            }
+            if self._reconcile_due():
+                changes["Suppressions"] = await self._reconcile()
+
+            self.runs += 1
+            self.last_run = time.time()
+            self.last_duration = time.perf_counter() - started
+            self.last_changes = changes
+            return changes
+
+    async def _sync_itemtype(
+        self,
+        itemtype: str,
+        apply: Callable[[Dict[str, Any]], None],
+        mark: Optional[str] = None,
+        **params,
+    ) -> int:
+        """Applique les éléments modifiés puis avance le high-water mark.
+
+        Le mark n'avance qu'une fois tous les éléments traités : une erreur
+        en cours de route fait reprendre au même point au passage suivant.
+        """
+        mark = mark or itemtype
+        newest = since = self.high_water.get(mark)
+        count = 0
+
+        async for item in self.changed_items(itemtype, since, **params):
+            apply(item)
+            count += 1
+            date_mod = item.get("date_mod") or ""
+            if newest is None or date_mod > newest:
+                newest = date_mod
+
+        if newest:
+            self.high_water[mark] = newest
+        return count
+
+    def _reconcile_due(self) -> bool:
+        if not self.reconcile_interval:
+            return False
+        now = time.monotonic()
+        if self._last_reconcile is None:
+            # Premier passage : lecture complète, rien à réconcilier
+            self._last_reconcile = now
+            return False
+        return now - self._last_reconcile >= self.reconcile_interval
+
+    async def list_items(self, itemtype: str, **params) -> Optional[List[Dict[str, Any]]]:
+        """Tous les éléments existants d'un itemtype, triés par id.
+
+        Returns:
+            Les éléments, ou None si la liste a changé pendant la lecture
+            (une suppression décale les pages : un élément pourrait
+            manquer et être retiré à tort)
+        """
+        items: List[Dict[str, Any]] = []
+        totals = set()
+        start = 0
+        while True:
+            page, total = await self.service.get_items(
+                itemtype,
+                start=start,
+                end=start + self.page_size - 1,
+                sort="id",
+                order="ASC",
+                **params,
+            )
+            items.extend(page)
+            totals.add(total)
+            start += self.page_size
+            if len(page) < self.page_size or (total is not None and start >= total):
+                break
+        if len(totals) > 1:
+            logger.warning(f"⚠️ {itemtype} modifiés pendant la réconciliation, reportée")
+            return None
+        return items
+
+    async def _reconcile(self) -> int:
+        """Retire de l'index les éléments qui n'existent plus dans GLPI.
+
+        Returns:
+            Nombre de documents retirés
+        """
+        removed = 0
+        tickets = await self.list_items("Ticket", only_id=1)
+        solutions = await self.list_items("ITILSolution")
+        kb_items = await self.list_items("KnowbaseItem", only_id=1)
+
+        if tickets is not None:
+            existing = {item["id"] for item in tickets}
+            for ticket_id in set(self._tickets) - existing:
+                self._apply_deleted_ticket({"id": ticket_id})
+                removed += 1
+
+        if solutions is not None:
+            newest: Dict[int, Dict[str, Any]] = {}
+            for solution in solutions:
+                if solution.get("itemtype") != "Ticket":
+                    continue
+                ticket_id = solution.get("items_id")
+                if ticket_id not in newest or self._version(solution) > self._version(
+                    newest[ticket_id]
+                ):
+                    newest[ticket_id] = solution
+            for ticket_id, version in list(self._solution_versions.items()):
+                solution = newest.get(ticket_id)
+                if solution is not None and self._version(solution) == version:
+                    continue
+                # Solution retenue supprimée : la précédente, s'il en reste une
+                del self._solution_versions[ticket_id]
+                if solution is None:
+                    if self._solutions.pop(ticket_id, None) is not None:
+                        removed += 1
+                    self._index_ticket(ticket_id)
+                else:
+                    self._apply_solution(solution)
+
+        if kb_items is not None:
+            # L'API ne renvoie que les articles visibles du compte de service
+            existing = {item["id"] for item in kb_items}
+            for item_id in self._kb_items - existing:
+                self._remove_kb_item(item_id)
+                removed += 1
+
+        self._last_reconcile = time.monotonic()
+        self.reconciliations += 1
+        self.reconcile_removals += removed
+        if removed:
+            logger.info(f"🧹 Réconciliation GLPI: {removed} documents retirés")
+        return removed
+
+    @staticmethod
+    def _version(solution: Dict[str, Any]) -> Tuple[str, int]:
+        return (solution.get("date_mod") or "", solution.get("id") or 0)
+
+    def _apply_ticket(self, ticket: Dict[str, Any]):
+        ticket_id = ticket["id"]
+        self._tickets[ticket_id] = {
+            "name": ticket.get("name") or f"Ticket #{ticket_id}",
+            "content": html_to_text(ticket.get("content")),
+            "status": TICKET_STATUS.get(ticket.get("status"), ticket.get("status")),
+            "category": ticket.get("itilcategories_id"),
+            "priority": ticket.get("priority"),
+        }
+        self._index_ticket(ticket_id)
+
+    def _apply_deleted_ticket(self, ticket: Dict[str, Any]):
+        self._tickets.pop(ticket["id"], None)
+        self._solutions.pop(ticket["id"], None)
+        self._solution_versions.pop(ticket["id"], None)
+        self.index.remove("ticket", ticket["id"])
+
+    def _apply_solution(self, solution: Dict[str, Any]):
+        if solution.get("itemtype") != "Ticket":
+            return
+        ticket_id = solution.get("items_id")
+        # Les solutions arrivent de la plus récente à la plus ancienne :
+        # une solution antérieure à celle déjà retenue est ignorée (elle ne
+        # doit ni remplacer ni, si refusée, retirer la plus récente)
+        version = self._version(solution)
+        current = self._solution_versions.get(ticket_id)
+        if current is not None and version < current:
+            return
+        self._solution_versions[ticket_id] = version
+        if solution.get("status") == SOLUTION_REFUSED:
+            self._solutions.pop(ticket_id, None)
+        else:
+            self._solutions[ticket_id] = html_to_text(solution.get("content"))
+        self._index_ticket(ticket_id)
+
+    def _index_ticket(self, ticket_id: int):
+        ticket = self._tickets.get(ticket_id)
+        solution = self._solutions.get(ticket_id)
+        if ticket is None or not solution:
+            self.index.remove("ticket", ticket_id)
+            return
+
+        self.index.upsert({
+            "source": "ticket",
+            "id": ticket_id,
+            "title": ticket["name"],
+            "content": f"**Problème**:\n{ticket['content']}\n\n**Solution**: {solution}",
+            "metadata": {
+                "category": ticket["category"],
+                "status": ticket["status"],
+                "priority": ticket["priority"],
+            },
+        }, " ".join([ticket["name"], ticket["content"], solution]))
+
+    @staticmethod
+    def _is_published(item: Dict[str, Any]) -> bool:
+        """Article dans sa période de publication (begin_date/end_date)."""
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        begin, end = item.get("begin_date"), item.get("end_date")
+        return (not begin or begin <= now) and (not end or end > now)
+
+    def _remove_kb_item(self, item_id: int):
+        self._kb_items.discard(item_id)
+        self.index.remove("faq", item_id)
+        self.index.remove("kb_article", item_id)
+
+    def _apply_kb_item(self, item: Dict[str, Any]):
+        if not self._is_published(item):
+            self._remove_kb_item(item["id"])
+            return
+        self._kb_items.add(item["id"])
+        source = "faq" if item.get("is_faq") else "kb_article"
+        other = "kb_article" if source == "faq" else "faq"
+        # Un article peut basculer entre FAQ et base de connaissances
+        self.index.remove(other, item["id"])
+
+        title = item.get("name") or f"Article #{item['id']}"
+        answer = html_to_text(item.get("answer"))
+        if source == "faq":
+            content = f"**Question**: {title}\n\n**Réponse**: {answer}"
+        else:
+            content = answer
+
+        self.index.upsert({
+            "source": source,
+            "id": item["id"],
+            "title": title,
+            "content": content,
+            "metadata": {
+                "category": item.get("knowbaseitemcategories_id"),
+                "views": item.get("view"),
+            },
+        }, f"{title} {answer}")
+
+    async def run_forever(
+        self, embed: Optional[Callable[[str], Awaitable[List[float]]]] = None
+    ):
+        """Synchronise toutes les `interval` secondes.
+
+        Args:
+            embed: Fonction d'embedding ; si fournie, les documents modifiés
+                sont embarqués après chaque passage (hors du chemin de /ask)
+        """
+        while True:
+            try:
+                changes = await self.sync_once()
+                if any(changes.values()):
+                    logger.info(f"🔄 Synchronisation GLPI: {changes}")
+                if embed is not None and self.index.pending_embeddings:
+                    await self.index.embed_pending(embed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Synchronisation GLPI: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(
+        self, embed: Optional[Callable[[str], Awaitable[List[float]]]] = None
+    ):
+        """Lance la synchronisation périodique en tâche de fond."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(embed))
+
+    async def stop(self):
+        """Arrête la synchronisation périodique."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        """État de la synchronisation et de l'index."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "documents": len(self.index),
+            "pending_embeddings": self.index.pending_embeddings,
+            "high_water": dict(self.high_water),
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run": self.last_run,
+            "last_duration_s": self.last_duration,
+            "last_changes": self.last_changes,
+            "reconciliations": self.reconciliations,
+            "reconcile_removals": self.reconcile_removals,
+        }
+
+
+glpi_sync = GLPISyncEngine(
+    glpi_service,
+    index=KnowledgeIndex(
+        max_chars=settings.PASSAGE_MAX_CHARS,
+        overlap=settings.PASSAGE_OVERLAP_CHARS,
+    ),
+    page_size=settings.GLPI_SYNC_PAGE_SIZE,
+    interval=settings.GLPI_SYNC_INTERVAL,
+    reconcile_interval=settings.GLPI_SYNC_RECONCILE_INTERVAL,
+)
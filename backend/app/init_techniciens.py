@@ -1,4 +1,6 @@
 """Script pour initialiser la table des techniciens."""
+import threading
+
 from sqlmodel import Session, select
 
 from .database import engine
@@ -64,25 +66,45 @@ TECHNICIENS_DATA = [
 ]
 
 
+# Cache nom -> id, rempli par init_techniciens (la table ne change plus ensuite)
+_technicien_ids: dict[str, int] = {}
+_technicien_ids_lock = threading.Lock()
+
+
 def init_techniciens():
-    """Initialise la table des techniciens avec les données par défaut."""
+    """Initialise la table des techniciens avec les données par défaut.
+
+    Une seule requête lit les techniciens existants ; les manquants sont
+    insérés en un flush, qui fournit aussi leurs ids.
+    """
     with Session(engine) as session:
-        for tech_data in TECHNICIENS_DATA:
-            existing = session.exec(
-                select(Technicien).where(Technicien.nom == tech_data["nom"])
-            ).first()
-            if not existing:
-                technicien = Technicien(**tech_data)
-                session.add(technicien)
-        session.commit()
+        ids = dict(session.exec(select(Technicien.nom, Technicien.id)).all())
 
+        missing = [
+            Technicien(**tech_data)
+            for tech_data in TECHNICIENS_DATA
+            if tech_data["nom"] not in ids
+        ]
+        if missing:
+            session.add_all(missing)
+            session.flush()
+            ids.update((technicien.nom, technicien.id) for technicien in missing)
+            session.commit()
 
-def get_technicien_by_nom(nom: str) -> Technicien | None:
-    """Récupère un technicien par son nom de catégorie."""
-    with Session(engine) as session:
-        return session.exec(
-            select(Technicien).where(Technicien.nom == nom)
-        ).first()
+        with _technicien_ids_lock:
+            _technicien_ids.clear()
+            _technicien_ids.update(ids)
+
+
+def get_technicien_id(nom: str) -> int | None:
+    """Id du technicien d'une catégorie, chargé une seule fois depuis la base."""
+    with _technicien_ids_lock:
+        if not _technicien_ids:
+            with Session(engine) as session:
+                _technicien_ids.update(
+                    session.exec(select(Technicien.nom, Technicien.id)).all()
+                )
+        return _technicien_ids.get(nom)
 
 
 def get_all_categories() -> list[str]:
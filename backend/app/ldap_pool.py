@@ -0,0 +1,199 @@
+"""Pool de connexions LDAP liées (bind) réutilisables.
+
+Chaque connexion est liée une seule fois puis rendue au pool après usage.
+Une connexion restée inactive trop longtemps est vérifiée avant d'être
+réutilisée ; une connexion rompue est fermée et remplacée par une
+nouvelle connexion liée.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ldap3 import SYNC, Connection, Server
+from ldap3.core.exceptions import LDAPBindError, LDAPException
+
+logger = logging.getLogger(__name__)
+
+
+class LDAPPoolTimeout(Exception):
+    """Aucune connexion LDAP libérée dans le délai imparti."""
+
+
+class LDAPConnectionPool:
+    """Pool borné de connexions LDAP, thread-safe.
+
+    Args:
+        server: Serveur ldap3
+        user: Compte de service (bind)
+        password: Mot de passe du compte de service
+        size: Nombre maximal de connexions ouvertes
+        check_after: Inactivité (s) au-delà de laquelle la connexion est
+            vérifiée avant réutilisation
+        timeout: Attente maximale (s) d'une connexion libre
+        client_strategy: Stratégie ldap3 (MOCK_SYNC pour les tests)
+    """
+
+    def __init__(
+        self,
+        server: Server,
+        user: Optional[str],
+        password: Optional[str],
+        size: int = 5,
+        check_after: float = 60.0,
+        timeout: float = 10.0,
+        client_strategy: str = SYNC,
+    ):
+        self.server = server
+        self.user = user
+        self.password = password
+        self.size = size
+        self.check_after = check_after
+        self.timeout = timeout
+        self.client_strategy = client_strategy
+
+        # Connexions libres : (connexion, instant de restitution)
+        self._idle: List[Tuple[Connection, float]] = []
+        self._open = 0
+        self._available = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.rebinds = 0
+        self.retries = 0
+        self.health_check_failures = 0
+
+    def _connect(self) -> Connection:
+        conn = Connection(
+            self.server,
+            user=self.user,
+            password=self.password,
+            client_strategy=self.client_strategy,
+            receive_timeout=self.timeout,
+        )
+        if not conn.bind():
+            description = conn.result.get("description") if conn.result else None
+            conn.unbind()
+            raise LDAPBindError(f"Bind LDAP refusé: {description}")
+        self.created += 1
+        return conn
+
+    def _is_healthy(self, conn: Connection, idle_since: float) -> bool:
+        if conn.closed or not conn.bound:
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        # "Who am I?" (RFC 4532) : détecte une connexion coupée par le serveur
+        try:
+            identity = conn.extend.standard.who_am_i()
+        except LDAPException:
+            return False
+        return identity is not None and not conn.closed
+
+    @staticmethod
+    def _discard(conn: Connection):
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    def _acquire(self) -> Connection:
+        deadline = time.monotonic() + self.timeout
+        with self._available:
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LDAPPoolTimeout(
+                        f"Aucune connexion LDAP libre ({self.size} utilisées)"
+                    )
+                self._available.wait(remaining)
+
+        try:
+            if conn is None:
+                return self._connect()
+            if self._is_healthy(conn, idle_since):
+                self.reused += 1
+                return conn
+            self.health_check_failures += 1
+            self._discard(conn)
+            self.rebinds += 1
+            return self._connect()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self):
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+
+    def _release(self, conn: Connection):
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Emprunte une connexion liée, rendue au pool en sortie.
+
+        Une connexion sur laquelle survient une erreur LDAP est fermée
+        plutôt que rendue.
+
+        Raises:
+            LDAPPoolTimeout: Si toutes les connexions restent occupées
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except LDAPException:
+            self._discard(conn)
+            self._release_slot()
+            raise
+        except BaseException:
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def run(self, operation: Callable[[Connection], Any]) -> Any:
+        """Exécute une opération, rejouée une fois sur une nouvelle
+        connexion si la première échoue (connexion coupée, serveur
+        redémarré...)."""
+        try:
+            with self.connection() as conn:
+                return operation(conn)
+        except LDAPException as e:
+            logger.warning(f"⚠️ Connexion LDAP perdue, nouvel essai: {e}")
+            self.retries += 1
+            with self.connection() as conn:
+                return operation(conn)
+
+    def close(self):
+        """Ferme les connexions libres."""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict:
+        """Connexions ouvertes/libres et compteurs de (re)connexion."""
+        with self._available:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "rebinds": self.rebinds,
+                "retries": self.retries,
+                "health_check_failures": self.health_check_failures,
+            }
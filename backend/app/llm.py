@@ -1,30 +1,24 @@
 """Module d'intégration avec Ollama pour LLM et embeddings."""
-import os
+import asyncio
+import functools
 import re
 
-from typing import Dict, List, Optional, Tuple, Any
-
-
-import ollama
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 
+from .category_classifier import CategoryClassifier, load_validated_examples
 from .config import settings
-from .glpi_service import glpi_service
+from .context_packer import estimate_tokens, pack_context
+from .embedding_cache import embedding_cache
 from .glpi_mock import glpi_mock
+from .glpi_sync import glpi_sync
+from .llm_scheduler import llm_scheduler
+from .ollama_pool import chat_pool, embed_pool
+from .retrieval import KnowledgeIndex, fuse_ranks
+from .web_search import web_search
 
 
-# Configuration du client Ollama local (pour LLM et embeddings)
-ollama_host = os.getenv("OLLAMA_HOST", "http://ollama:11434")
-client = ollama.Client(host=ollama_host)
-
-# Clé API Ollama pour la recherche web (service cloud ollama.com)
-OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
-
-MODEL_NAME = "mistral"
-EMBEDDING_MODEL_NAME = "nomic-embed-text"
 GLPI_THRESHOLD = 0.5  # Seuil de pertinence pour basculer sur la recherche web
 
-client = ollama.Client(host=settings.OLLAMA_HOST)
-
 TECHNICIEN_CATEGORIES = {
     "Techniciens": "Support technique général, assistance informatique DSIN",
     "Réseau": "Problèmes réseau, connexion internet, wifi, câblage",
@@ -40,24 +34,106 @@ TECHNICIEN_CATEGORIES = {
 }
 
 
-def get_embedding(text: str) -> list[float]:
-    """Génère un embedding vectoriel."""
-    response = client.embeddings(model=settings.EMBEDDING_MODEL, prompt=text)
-    return response["embedding"]
+async def get_embedding(text: str) -> list[float]:
+    """Génère un embedding vectoriel (mis en cache par modèle et texte)."""
+    # Le cache peut lire le disque : hors de la boucle d'évènements
+    cached = await asyncio.to_thread(
+        embedding_cache.get, settings.EMBEDDING_MODEL, text
+    )
+    if cached is not None:
+        return cached
+
+    response = await embed_pool.call(
+        lambda client: client.embeddings(
+            model=settings.EMBEDDING_MODEL,
+            prompt=text,
+            keep_alive=embed_pool.keep_alive,
+        )
+    )
+    embedding = response["embedding"]
+    await asyncio.to_thread(
+        embedding_cache.set, settings.EMBEDDING_MODEL, text, embedding
+    )
+    return embedding
 
 
-def get_chat_response(question: str) -> str:
-    """Obtient une réponse directe du LLM."""
-    response = client.chat(
-        model=settings.MODEL_NAME,
-        messages=[{"role": "user", "content": question}]
-    )
+def chat_options(prompt: str) -> Dict[str, int]:
+    """Options Ollama ajustées à la taille du prompt.
+
+    num_ctx couvre le prompt (estimé) et la réponse (num_predict). Il est
+    arrondi à une puissance de deux à partir de 2048 : chaque nouvelle
+    valeur de num_ctx force Ollama à recharger le modèle, on se limite
+    donc à quelques paliers.
+    """
+    num_predict = settings.CHAT_NUM_PREDICT
+    needed = estimate_tokens(prompt) + num_predict
+    num_ctx = 2048
+    while num_ctx < needed and num_ctx < settings.CHAT_MAX_CTX:
+        num_ctx *= 2
+    return {
+        "num_ctx": min(num_ctx, settings.CHAT_MAX_CTX),
+        "num_predict": num_predict,
+    }
+
+
+# Routage des questions vers un technicien sans passer par le LLM
+category_classifier = CategoryClassifier(
+    TECHNICIEN_CATEGORIES,
+    embed=get_embedding,
+    load_history=functools.partial(
+        load_validated_examples, settings.CATEGORY_HISTORY_LIMIT
+    ),
+    min_score=settings.CATEGORY_MIN_SCORE,
+    refresh_interval=settings.CATEGORY_REFRESH_INTERVAL,
+)
+
+
+async def classify_question(question_embedding: List[float]) -> Optional[str]:
+    """Catégorie de technicien d'une question, d'après son embedding.
+
+    Returns:
+        Nom de catégorie, ou None si le classifieur est désactivé,
+        indisponible ou trop incertain (le tag du LLM prend alors le relais
+        si CATEGORY_LLM_FALLBACK)
+    """
+    if not settings.CATEGORY_CLASSIFIER_ENABLED:
+        return None
+    try:
+        category, score = await category_classifier.classify(question_embedding)
+    except Exception as e:
+        print(f"[Catégorie] Classifieur indisponible: {e}")
+        return None
+    print(f"[Catégorie] {category or 'non classée'} (similarité {score:.2f})")
+    return category
+
+
+def llm_category_needed(category: Optional[str]) -> bool:
+    """Indique si le prompt doit demander le tag [CATEGORY:...] au LLM."""
+    return category is None and settings.CATEGORY_LLM_FALLBACK
+
+
+async def get_chat_response(question: str) -> str:
+    """Obtient une réponse directe du LLM.
+
+    Raises:
+        LLMOverloaded: Si la file d'attente du LLM est pleine
+    """
+    async with llm_scheduler.slot():
+        response = await chat_pool.call(lambda client: client.chat(
+            model=settings.MODEL_NAME,
+            messages=[{"role": "user", "content": question}],
+            options=chat_options(question),
+            keep_alive=chat_pool.keep_alive,
+        ))
     return response["message"]["content"]
 
 
-def search_web(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+async def search_web(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
     """Effectue une recherche sur le web via l'API Ollama Web Search.
 
+    Les résultats d'une même requête (normalisée) sont servis depuis le
+    cache pendant WEB_SEARCH_CACHE_MAX_AGE secondes.
+
     Args:
         query: Requête de recherche
         max_results: Nombre maximum de résultats
@@ -65,41 +141,22 @@ def search_web(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
     Returns:
         Liste de dictionnaires contenant les résultats
     """
-    results = []
-    
-    if not OLLAMA_API_KEY:
-        print("[Web Search] OLLAMA_API_KEY non configurée - recherche web désactivée")
-        return results
-    
-    try:
-        # Créer un client avec les headers d'authentification pour ollama.com
-        web_client = ollama.Client(
-            host="https://ollama.com",
-            headers={"Authorization": f"Bearer {OLLAMA_API_KEY}"}
-        )
-        
-        # Appel à l'API web_search
-        response = web_client.web_search(query=query, max_results=max_results)
-        
-        # Traitement des résultats
-        web_results = response.results if hasattr(response, 'results') else []
-        print(f"[Web Search] {len(web_results)} résultats trouvés pour: {query}")
-        
-        for i, r in enumerate(web_results):
-            results.append({
-                "source": "web",
-                "id": f"web_{i+1}",
-                "title": getattr(r, 'title', 'Sans titre'),
-                "content": getattr(r, 'content', ''),
-                "metadata": {
-                    "url": getattr(r, 'url', ''),
-                    "category": "Web"
-                }
-            })
-    except Exception as e:
-        print(f"[Web Search] Erreur lors de la recherche web: {e}")
-    
-    return results
+    web_results = await web_search.search(query, max_results=max_results)
+    print(f"[Web Search] {len(web_results)} résultats trouvés pour: {query}")
+
+    return [
+        {
+            "source": "web",
+            "id": f"web_{i+1}",
+            "title": r["title"],
+            "content": r["content"],
+            "metadata": {
+                "url": r["url"],
+                "category": "Web"
+            }
+        }
+        for i, r in enumerate(web_results)
+    ]
 
 
 def parse_category_from_response(response: str) -> Tuple[str, Optional[str]]:
@@ -128,51 +185,181 @@ def _build_categories_prompt() -> str:
     return "\n".join(lines)
 
 
-def get_rag_response(
-    question: str, top_k: int = 4
-) -> Tuple[str, List[Dict], Optional[str]]:
-    """Génère une réponse en utilisant RAG avec GLPI ou le Web.
+def _is_relevant(results: List[Dict], threshold: float) -> bool:
+    """Indique si le meilleur résultat atteint le seuil de pertinence."""
+    return bool(results) and results[0].get("score", 0.0) >= threshold
+
+
+def _knowledge_index() -> KnowledgeIndex:
+    """Index interrogé : données mock, ou copie locale synchronisée de GLPI."""
+    return glpi_mock.index if settings.USE_MOCK else glpi_sync.index
+
+
+def _search_lexical(question: str, limit: int) -> Tuple[List[Dict], bool]:
+    """Recherche BM25 dans la base de connaissances."""
+    results = _knowledge_index().search(question, limit=limit)
+    return results, _is_relevant(results, GLPI_THRESHOLD)
+
+
+async def _dense_hits(
+    question: str, limit: int, question_embedding: Optional[List[float]]
+) -> List[Tuple[Any, float]]:
+    """Passages les plus proches de la question (similarité cosinus).
+
+    Les embeddings des passages sont calculés en tâche de fond (voir
+    embed_knowledge_index et glpi_sync) : un passage pas encore embarqué
+    n'est simplement pas trouvé.
+    """
+    if question_embedding is None:
+        question_embedding = await get_embedding(question)
+    return _knowledge_index().search_dense_passages(question_embedding, limit=limit)
+
+
+async def embed_knowledge_index(retry_interval: float = 30.0):
+    """Embarque les passages de l'index mock, hors du chemin de /ask.
+
+    Les passages en échec (Ollama pas encore prêt...) sont repris toutes
+    les retry_interval secondes, jusqu'à ce qu'il n'en reste aucun.
+    """
+    index = _knowledge_index()
+    while index.pending_embeddings:
+        try:
+            count = await index.embed_pending(get_embedding)
+            print(f"[Dense] {count} passages embarqués")
+        except Exception as e:
+            print(f"[Dense] Embeddings de l'index indisponibles: {e}")
+        if index.pending_embeddings:
+            await asyncio.sleep(retry_interval)
+
+
+async def _search_dense(
+    question: str, limit: int, question_embedding: Optional[List[float]]
+) -> Tuple[List[Dict], bool]:
+    """Recherche vectorielle dans la base de connaissances."""
+    hits = await _dense_hits(
+        question, limit * KnowledgeIndex.CANDIDATES_PER_RESULT, question_embedding
+    )
+    results = _knowledge_index().collapse(hits, limit)
+    return results, _is_relevant(results, settings.DENSE_THRESHOLD)
+
+
+async def _search_hybrid(
+    question: str, top_k: int, question_embedding: Optional[List[float]]
+) -> Tuple[List[Dict], bool]:
+    """Recherche lexicale et vectorielle en parallèle, fusionnées par RRF.
+
+    La fusion se fait par passage, avant regroupement par document. Les
+    résultats sont pertinents si l'un des deux moteurs dépasse son propre
+    seuil ; le score des résultats fusionnés est le score RRF.
+    """
+    index = _knowledge_index()
+    candidates = (
+        max(top_k, settings.HYBRID_CANDIDATES) * KnowledgeIndex.CANDIDATES_PER_RESULT
+    )
+    lexical = asyncio.create_task(
+        asyncio.to_thread(index.search_passages, question, candidates)
+    )
+    try:
+        dense_hits = await _dense_hits(question, candidates, question_embedding)
+    except Exception as e:
+        print(f"[Hybrid] Recherche vectorielle indisponible, BM25 seul: {e}")
+        lexical_results = index.collapse(await lexical, top_k)
+        return lexical_results, _is_relevant(lexical_results, GLPI_THRESHOLD)
+
+    lexical_hits = await lexical
+
+    fused = fuse_ranks(
+        [
+            (lexical_hits, settings.HYBRID_LEXICAL_WEIGHT),
+            (dense_hits, settings.HYBRID_DENSE_WEIGHT),
+        ],
+        k=settings.RRF_K,
+        limit=candidates,
+    )
+    relevant = (
+        bool(lexical_hits) and lexical_hits[0][1] >= GLPI_THRESHOLD
+        or bool(dense_hits) and dense_hits[0][1] >= settings.DENSE_THRESHOLD
+    )
+    return index.collapse(fused, top_k), relevant
+
+
+def retrieval_needs_embedding() -> bool:
+    """Indique si search_glpi utilise l'embedding de la question.
+
+    Sinon la recherche peut démarrer sans attendre le calcul de l'embedding.
+    """
+    return settings.RETRIEVAL_MODE in ("dense", "hybrid")
+
+
+async def search_glpi(
+    question: str,
+    top_k: int = 4,
+    question_embedding: Optional[List[float]] = None,
+) -> Tuple[List[Dict], bool]:
+    """Recherche les sources GLPI pertinentes pour une question.
+
+    Hors mock, l'index interrogé est celui tenu à jour en tâche de fond
+    par glpi_sync : aucun appel GLPI n'est fait ici. Le moteur dépend de
+    settings.RETRIEVAL_MODE : "lexical" (BM25), "dense" (embeddings) ou
+    "hybrid" (les deux, fusion RRF). L'embedding de la question déjà
+    calculé par /ask est réutilisé. En cas d'échec de la recherche
+    vectorielle, la recherche BM25 prend le relais.
 
     Args:
         question: Question de l'utilisateur
-        top_k: Nombre de sources à récupérer (pour GLPI)
+        top_k: Nombre de sources à récupérer
+        question_embedding: Embedding de la question, si déjà calculé
 
     Returns:
-        Tuple (réponse_générée, sources_utilisées, catégorie_technicien)
+        Tuple (résultats triés par pertinence, pertinence suffisante)
     """
-    # 1. Recherche dans GLPI
-    glpi_results = glpi_mock.search_all(question, limit=top_k)
-    
-    # 2. Vérification du score et décision de bascule vers Web
+    if settings.RETRIEVAL_MODE == "hybrid":
+        return await _search_hybrid(question, top_k, question_embedding)
+
+    if settings.RETRIEVAL_MODE == "dense":
+        try:
+            return await _search_dense(question, top_k, question_embedding)
+        except Exception as e:
+            print(f"[Dense] Recherche vectorielle indisponible, repli BM25: {e}")
+
+    return _search_lexical(question, top_k)
+
+
+async def select_context(
+    question: str, glpi_results: List[Dict], relevant: bool
+) -> Tuple[List[Dict], str]:
+    """Choisit le contexte : GLPI si pertinent, sinon recherche Web.
+
+    Args:
+        question: Question de l'utilisateur
+        glpi_results: Résultats de search_glpi
+        relevant: Pertinence suffisante des résultats GLPI
+
+    Returns:
+        Tuple (résultats retenus, libellé du type de contexte)
+    """
+    # Vérification du score et décision de bascule vers Web
     use_web_search = False
     context_results = []
     source_type_label = "CONTEXTE GLPI"
     print(f"glpi_results: {glpi_results}")
 
-    """Génère une réponse en utilisant RAG avec GLPI."""
-    
-    # Utiliser mock ou service réel selon config
-    if settings.USE_MOCK:
-        glpi_results = glpi_mock.search_all(question, limit=top_k)
-    else:
-        glpi_results = glpi_service.get_user_tickets(question, limit=top_k)
-
     if not glpi_results:
         use_web_search = True
     else:
         # Le premier résultat a le meilleur score (car trié)
         best_score = glpi_results[0].get("score", 0.0)
-        print(f"Pertinence GLPI max: {best_score:.2f} < Threshold: {GLPI_THRESHOLD}")
-        if best_score < GLPI_THRESHOLD:
+        print(f"Pertinence GLPI max: {best_score:.2f} (mode {settings.RETRIEVAL_MODE})")
+        if not relevant:
             use_web_search = True
         else:
             context_results = glpi_results
 
-    # 3. Exécution de la recherche Web si nécessaire
+    # Exécution de la recherche Web si nécessaire
     if use_web_search:
 
-        print(f"Pertinence GLPI trop faible (ou nulle) -> Bascule vers recherche Web (Threshold: {GLPI_THRESHOLD})")
-        web_results = search_web(question, max_results=3)
+        print("Pertinence GLPI trop faible (ou nulle) -> Bascule vers recherche Web")
+        web_results = await search_web(question, max_results=3)
         if web_results:
             context_results = web_results
             source_type_label = "CONTEXTE WEB"
@@ -181,74 +368,232 @@ def get_rag_response(
             context_results = glpi_results
             source_type_label = "CONTEXTE GLPI (Faible pertinence)"
 
-    # Si aucun résultat nulle part (ni GLPI pertinent, ni Web), réponse directe
-    if not context_results:
-        raw_response = get_chat_response(question)
-        cleaned, category = parse_category_from_response(raw_response)
-        return cleaned, [], category
-
-    # 4. Construction du contexte
-    context_parts = []
-    sources = []
-
-    for i, result in enumerate(context_results, 1):
-        source_name = result.get('source', 'unknown').upper()
-        # Pour le web, on affiche l'URL si dispo
-        if source_name == "WEB" and "url" in result.get("metadata", {}):
-            source_info = f"{source_name} - {result['metadata']['url']}"
-        else:
-            source_info = source_name
+    return context_results, source_type_label
+
+
+def _render_source(number: int, result: Dict) -> str:
+    """Bloc de contexte d'une source."""
+    source_name = result.get("source", "unknown").upper()
+    # Pour le web, on affiche l'URL si dispo
+    if source_name == "WEB" and "url" in result.get("metadata", {}):
+        source_info = f"{source_name} - {result['metadata']['url']}"
+    else:
+        source_info = source_name
+    return (
+        f"[Source {number} - {source_info}]\n"
+        f"Titre: {result['title']}\n"
+        f"{result['content']}\n"
+        "---"
+    )
 
-        context_parts.append(f"[Source {i} - {source_info}]")
-    # Construire le contexte
-    context_parts = []
-    sources = []
 
-    for i, result in enumerate(glpi_results, 1):
-        context_parts.append(f"[Source {i} - {result['source'].upper()}]")
-        context_parts.append(f"Titre: {result['title']}")
-        context_parts.append(result["content"])
-        context_parts.append("\n---\n")
+def format_rag_prompt(
+    question: str,
+    context_results: List[Dict],
+    source_type_label: str,
+    ask_category: bool = True,
+) -> Tuple[str, List[Dict]]:
+    """Construit le prompt RAG à partir du contexte retenu.
 
-        sources.append({
+    Le contexte est limité à settings.CONTEXT_TOKEN_BUDGET tokens
+    (estimés) : blancs réduits, doublons écartés, sources ajoutées par
+    pertinence décroissante. La liste des catégories et la consigne du
+    tag ne sont ajoutées que si ask_category (question non classée).
+
+    Returns:
+        Tuple (prompt, sources_utilisées) ; sans aucun contexte, le prompt
+        est la question elle-même (réponse directe du LLM)
+    """
+    blocks, packed = pack_context(
+        context_results,
+        budget=settings.CONTEXT_TOKEN_BUDGET,
+        render=_render_source,
+        duplicate_threshold=settings.CONTEXT_DUPLICATE_THRESHOLD,
+    )
+
+    # Si aucun résultat nulle part (ni GLPI pertinent, ni Web), réponse directe
+    if not packed:
+        return question, []
+
+    sources = [
+        {
             "type": result["source"],
             "id": result["id"],
             "title": result["title"],
             "metadata": result["metadata"],
-        })
-
-    context = "\n".join(context_parts)
-    categories_prompt = _build_categories_prompt()
+        }
+        for result in packed
+    ]
+    context = "\n".join(blocks)
+    categories_prompt = f"\n\n{_build_categories_prompt()}" if ask_category else ""
+    category_instruction = (
+        "\n3. À LA FIN de ta réponse, ajoute un tag [CATEGORY:NomCatégorie] "
+        "pour indiquer quel technicien devrait traiter cette question, choisi "
+        "parmi les catégories listées ci-dessus."
+        if ask_category else ""
+    )
 
     prompt = f"""Tu es un assistant IT helpdesk. Réponds à la question en \
-utilisant UNIQUEMENT les informations fournies dans le contexte ci-dessous. \
-Le contexte provient de : {source_type_label}.
-Si l'information n'est pas dans le contexte, dis-le clairement.
-utilisant UNIQUEMENT les informations fournies dans le contexte ci-dessous.
+utilisant UNIQUEMENT les informations du contexte ci-dessous. Si \
+l'information n'est pas dans le contexte, dis-le clairement.
 
 {source_type_label}:
-{context}
-
-{categories_prompt}
+{context}{categories_prompt}
 
 QUESTION: {question}
 
 INSTRUCTIONS:
 1. Réponds de manière concise et précise, cite les sources si pertinent.
-2. Si le contexte vient du WEB, précise-le dans ta réponse.
-3. À LA FIN de ta réponse, ajoute un tag [CATEGORY:NomCatégorie] pour \
-indiquer quel technicien devrait traiter cette question. Choisis la \
-catégorie la plus appropriée parmi celles listées ci-dessus.
-2. À LA FIN de ta réponse, ajoute un tag [CATEGORY:NomCatégorie].
+2. Si le contexte vient du WEB, précise-le dans ta réponse.{category_instruction}
 
 RÉPONSE:"""
 
-    response = client.chat(
-        model=settings.MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}]
+    return prompt, sources
+
+
+async def build_rag_prompt(
+    question: str,
+    top_k: int = 4,
+    question_embedding: Optional[List[float]] = None,
+    ask_category: bool = True,
+) -> Tuple[str, List[Dict]]:
+    """Recherche le contexte (GLPI ou Web) et construit le prompt RAG.
+
+    Args:
+        question: Question de l'utilisateur
+        top_k: Nombre de sources à récupérer (pour GLPI)
+        question_embedding: Embedding de la question, si déjà calculé
+        ask_category: Demander au LLM le tag de catégorie
+
+    Returns:
+        Tuple (prompt, sources_utilisées)
+    """
+    glpi_results, relevant = await search_glpi(question, top_k, question_embedding)
+    context_results, source_type_label = await select_context(
+        question, glpi_results, relevant
+    )
+    return format_rag_prompt(
+        question, context_results, source_type_label, ask_category
+    )
+
+
+async def get_rag_response(
+    question: str,
+    top_k: int = 4,
+    question_embedding: Optional[List[float]] = None,
+) -> Tuple[str, List[Dict], Optional[str]]:
+    """Génère une réponse en utilisant RAG avec GLPI ou le Web.
+
+    Args:
+        question: Question de l'utilisateur
+        top_k: Nombre de sources à récupérer (pour GLPI)
+        question_embedding: Embedding de la question, si déjà calculé
+
+    Returns:
+        Tuple (réponse_générée, sources_utilisées, catégorie_technicien) ;
+        la catégorie vient du classifieur, sinon du tag du LLM
+    """
+    category = None
+    if question_embedding is not None:
+        category = await classify_question(question_embedding)
+    prompt, sources = await build_rag_prompt(
+        question, top_k, question_embedding, llm_category_needed(category)
     )
 
-    raw_response = response["message"]["content"]
-    cleaned_response, category = parse_category_from_response(raw_response)
+    raw_response = await get_chat_response(prompt)
+    cleaned_response, tagged = parse_category_from_response(raw_response)
 
-    return cleaned_response, sources, category
\ No newline at end of file
+    return cleaned_response, sources, category or tagged
+
+
+class CategoryTagFilter:
+    """Retire les tags [CATEGORY:...] d'un flux de tokens.
+
+    Le texte à partir d'un crochet ouvrant est retenu jusqu'au crochet
+    fermant : il est alors supprimé s'il s'agit d'un tag de catégorie,
+    sinon restitué tel quel.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Ajoute un morceau de texte et retourne la partie affichable."""
+        self._pending += chunk
+        output = []
+
+        while self._pending:
+            start = self._pending.find("[")
+            if start == -1:
+                output.append(self._pending)
+                self._pending = ""
+                break
+
+            output.append(self._pending[:start])
+            end = self._pending.find("]", start)
+            if end == -1:
+                self._pending = self._pending[start:]
+                break
+
+            tag = self._pending[start:end + 1]
+            _, category = parse_category_from_response(tag)
+            if category is None and "CATEGORY" not in tag.upper():
+                output.append(tag)
+            self._pending = self._pending[end + 1:]
+
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Retourne le texte encore retenu (crochet jamais refermé)."""
+        pending, self._pending = self._pending, ""
+        return pending
+
+
+async def stream_rag_response(
+    question: str,
+    top_k: int = 4,
+    question_embedding: Optional[List[float]] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Version streaming de get_rag_response.
+
+    Produit successivement :
+    - ("sources", sources_utilisées) avant la génération ;
+    - ("token", texte) au fil de la génération, tags de catégorie retirés ;
+    - ("answer", (réponse_nettoyée, catégorie)) une fois la génération finie.
+
+    La catégorie vient du classifieur si l'embedding est fourni et la
+    question classée, sinon du tag du LLM.
+    """
+    category = None
+    if question_embedding is not None:
+        category = await classify_question(question_embedding)
+    prompt, sources = await build_rag_prompt(
+        question, top_k, question_embedding, llm_category_needed(category)
+    )
+    yield "sources", sources
+
+    raw_parts = []
+    tag_filter = CategoryTagFilter()
+    # Créneau conservé jusqu'à la fin de la génération
+    async with llm_scheduler.slot():
+        # Basculement vers un autre serveur possible avant le premier token
+        stream = chat_pool.stream(lambda client: client.chat(
+            model=settings.MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            options=chat_options(prompt),
+            keep_alive=chat_pool.keep_alive,
+            stream=True,
+        ))
+        async for chunk in stream:
+            content = chunk["message"]["content"]
+            raw_parts.append(content)
+            visible = tag_filter.feed(content)
+            if visible:
+                yield "token", visible
+
+    remaining = tag_filter.flush()
+    if remaining:
+        yield "token", remaining
+
+    answer, tagged = parse_category_from_response("".join(raw_parts))
+    yield "answer", (answer, category or tagged)
@@ -0,0 +1,201 @@
+"""Ordonnancement des générations LLM : admission et file équitable.
+
+Ollama sur CPU ne traite efficacement que quelques générations à la
+fois ; au-delà, toutes ralentissent ensemble jusqu'à expirer. Le
+planificateur borne le nombre de générations simultanées et met les
+suivantes en file, une file par utilisateur servie à tour de rôle : un
+utilisateur qui envoie dix questions ne retarde pas celle de son voisin.
+
+Quand la file est pleine, la demande est refusée immédiatement
+(LLMOverloaded, avec un délai Retry-After estimé) plutôt que d'attendre
+un délai d'expiration.
+"""
+import asyncio
+import contextvars
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional
+
+from .config import settings
+
+# Utilisateur à l'origine des générations de la requête en cours
+current_user: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar(
+    "llm_user", default=None
+)
+
+
+class LLMOverloaded(Exception):
+    """File d'attente du LLM pleine, ou attente trop longue.
+
+    Attributes:
+        retry_after: Délai conseillé (s) avant une nouvelle tentative
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """Limite de concurrence et file d'attente équitable par utilisateur.
+
+    Toutes les opérations ont lieu dans la boucle d'évènements : pas de
+    verrou nécessaire.
+
+    Args:
+        max_concurrent: Générations simultanées maximales
+        max_queue: Demandes en attente maximales (tous utilisateurs)
+        max_queue_per_user: Demandes en attente maximales d'un utilisateur
+        queue_timeout: Attente maximale (s) d'un créneau
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_queue: int = 32,
+        max_queue_per_user: int = 4,
+        queue_timeout: float = 120.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+
+        self._running = 0
+        # Utilisateur -> demandes en attente ; l'ordre des clés donne le
+        # tour de passage
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # Durée moyenne (mobile) d'une génération, pour estimer Retry-After
+        self.service_time = 10.0
+
+    def retry_after(self) -> int:
+        """Délai estimé (s) pour que la file actuelle s'écoule."""
+        backlog = self._queued + 1
+        return max(1, math.ceil(backlog * self.service_time / self.max_concurrent))
+
+    def _reject(self, message: str):
+        self.rejected += 1
+        raise LLMOverloaded(message, self.retry_after())
+
+    def check(self, user: Optional[Hashable] = None):
+        """Refuse immédiatement une demande qui ne pourrait pas être mise en file.
+
+        Raises:
+            LLMOverloaded: Si la file globale ou celle de l'utilisateur est pleine
+        """
+        if self._running < self.max_concurrent and not self._queued:
+            return
+        if self._queued >= self.max_queue:
+            self._reject(f"File LLM pleine ({self._queued} demandes en attente)")
+        waiting = len(self._queues.get(user, ()))
+        if waiting >= self.max_queue_per_user:
+            self._reject(f"Trop de demandes en attente pour cet utilisateur ({waiting})")
+
+    def _remove(self, user: Hashable, future: asyncio.Future):
+        waiters = self._queues.get(user)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        self._queued -= 1
+        if not waiters:
+            del self._queues[user]
+
+    def _release(self):
+        # Créneau transmis directement au prochain utilisateur servi
+        while self._queues:
+            user, waiters = next(iter(self._queues.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+
+    async def _acquire(self, user: Hashable):
+        if self._running < self.max_concurrent and not self._queued:
+            self._running += 1
+            return
+
+        self.check(user)
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append(future)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Créneau attribué au moment de l'annulation : le rendre
+                self._release()
+            else:
+                self._remove(user, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                self._reject(f"Aucun créneau LLM libéré en {self.queue_timeout:.0f} s")
+            raise
+
+    @asynccontextmanager
+    async def slot(self, user: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """Réserve un créneau de génération pour la durée du bloc.
+
+        Args:
+            user: Utilisateur demandeur (par défaut : current_user)
+
+        Raises:
+            LLMOverloaded: Si la file est pleine ou l'attente trop longue
+        """
+        if user is None:
+            user = current_user.get()
+        queued_at = time.monotonic()
+        await self._acquire(user)
+
+        started = time.monotonic()
+        wait = started - queued_at
+        self.admitted += 1
+        self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        try:
+            yield
+        finally:
+            self.service_time = 0.8 * self.service_time + 0.2 * (
+                time.monotonic() - started
+            )
+            self._release()
+
+    def stats(self) -> Dict:
+        """Occupation, profondeur de file et temps d'attente."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": 1000 * self.total_wait / self.waits if self.waits else 0.0,
+            "wait_ms_max": 1000 * self.max_wait,
+            "service_ms_avg": 1000 * self.service_time,
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrent=settings.LLM_MAX_CONCURRENT,
+    max_queue=settings.LLM_MAX_QUEUE,
+    max_queue_per_user=settings.LLM_MAX_QUEUE_PER_USER,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+)
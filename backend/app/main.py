@@ -1,23 +1,40 @@
+import asyncio
 import json
+from datetime import date
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from fastapi import Depends
 from fastapi import FastAPI
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from sqlmodel import Session, select
+from pydantic import BaseModel, Field
+from sqlmodel import Session
 
 from . import llm
+from .answer_cache import answer_cache
+from .config import settings
 from .database import DATABASE_URL
 from .database import create_db_and_tables
 from .database import engine
+from .database import run_db
+from .embedding_cache import embedding_cache
 from .glpi_mock import glpi_mock
-from .init_techniciens import get_technicien_by_nom, init_techniciens
+from .glpi_sync import glpi_sync
+from .init_techniciens import get_technicien_id, init_techniciens
+from .llm_scheduler import LLMOverloaded, current_user, llm_scheduler
 from .models import Question
 from .models import Reponse
-from .models import Technicien
+from .ollama_pool import chat_pool, embed_pool
+from .persistence import store as persistence
+from .pipeline import StageGraph, StageStats
+from .single_flight import SingleFlight
+from .web_search import web_search
 
 from .glpi_service import glpi_service, ad_service
 from pydantic import BaseModel
@@ -29,6 +46,12 @@ class CreateTicketRequest(BaseModel):
 class TicketDetailsResponse(BaseModel):
     ticket_id: int
 
+class TicketsDetailsRequest(BaseModel):
+    ticket_ids: List[int] = Field(..., min_length=1, max_length=200)
+
+class UsersInfoRequest(BaseModel):
+    usernames: List[str] = Field(..., min_length=1, max_length=1000)
+
 app = FastAPI(
     title="RAG GLPI avec Ollama + Mistral",
     docs_url=None,
@@ -44,10 +67,111 @@ app.add_middleware(
 )
 
 
+# Durée de chaque étape du démarrage (exposée dans /api/metrics)
+startup_report: Dict[str, Any] = {}
+# Tâches de fond lancées au démarrage, annulées à l'arrêt
+background_tasks: List[asyncio.Task] = []
+
+
+def _build_startup_graph() -> StageGraph:
+    """Décrit le démarrage comme un graphe d'étapes.
+
+    - database : extension, tables et index
+    - techniciens : après database
+    - knowledge_index (mock) : génération des données et de l'index BM25
+    - knowledge_embeddings (mock, recherche dense/hybride) : après
+      knowledge_index, lancement du calcul en tâche de fond des
+      embeddings des passages
+    - glpi_sync (hors mock) : lancement de la synchronisation GLPI
+    - category_classifier : après database, lancement du calcul (puis du
+      rafraîchissement) en tâche de fond des centroïdes des catégories
+    - ollama_health : lancement, en tâche de fond, de la vérification
+      périodique des serveurs Ollama et du préchargement des modèles
+      (voir /api/ready)
+
+    Les clients Ollama, GLPI et LDAP sont créés au premier appel.
+    """
+    graph = StageGraph()
+
+    async def database():
+        await run_in_threadpool(create_db_and_tables)
+
+    async def techniciens(_):
+        await run_in_threadpool(init_techniciens)
+
+    graph.add("database", database)
+    graph.add("techniciens", techniciens, after=["database"])
+
+    if settings.USE_MOCK:
+        async def knowledge_index():
+            await run_in_threadpool(lambda: glpi_mock.index)
+
+        graph.add("knowledge_index", knowledge_index)
+
+        if llm.retrieval_needs_embedding():
+            async def knowledge_embeddings(_):
+                background_tasks.append(
+                    asyncio.create_task(llm.embed_knowledge_index())
+                )
+
+            graph.add(
+                "knowledge_embeddings", knowledge_embeddings,
+                after=["knowledge_index"],
+            )
+    else:
+        async def start_glpi_sync():
+            # Copie locale de la base de connaissances GLPI pour /ask
+            embed = llm.get_embedding if llm.retrieval_needs_embedding() else None
+            glpi_sync.start(embed=embed)
+
+        graph.add("glpi_sync", start_glpi_sync)
+
+    if settings.CATEGORY_CLASSIFIER_ENABLED:
+        async def category_classifier(_):
+            # Historique validé lu en base : après database
+            llm.category_classifier.start()
+
+        graph.add("category_classifier", category_classifier, after=["database"])
+
+    async def ollama_health():
+        chat_pool.start()
+        embed_pool.start()
+
+    graph.add("ollama_health", ollama_health)
+    return graph
+
+
 @app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
-    init_techniciens()
+async def on_startup():
+    graph = _build_startup_graph()
+    await graph.run()
+
+    startup_report.clear()
+    startup_report.update(
+        total_ms=round(max(end for _, end in graph.timings.values()) * 1000, 2),
+        stages_ms={
+            name: round((end - start) * 1000, 2)
+            for name, (start, end) in graph.timings.items()
+        },
+        critical_path=graph.critical_path(),
+    )
+    print(f"🚀 Démarrage: {startup_report['total_ms']} ms ({graph.server_timing()})")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await glpi_sync.stop()
+    await llm.category_classifier.stop()
+    await chat_pool.stop()
+    await embed_pool.stop()
+    await run_in_threadpool(persistence.close)
+    await glpi_service.aclose()
+    await web_search.aclose()
+    await run_in_threadpool(ad_service.close)
 
 
 def get_session():
@@ -55,11 +179,20 @@ def get_session():
         yield session
 
 
+# Durées agrégées des étapes de /ask/
+ask_stage_stats = StageStats()
+
+# Calculs /ask/ en cours, partagés entre questions identiques simultanées
+ask_flights = SingleFlight()
+
+
 class AskRequest(BaseModel):
     """Modèle de requête pour poser une question."""
 
     user_ad_id: int =1
     question: str
+    # False pour forcer une nouvelle génération (ignore le cache sémantique)
+    use_cache: bool = True
 
 
 class FeedbackRequest(BaseModel):
@@ -94,73 +227,365 @@ def preview_glpi_data(source_type: str):
         )
 
 
+def _lookup_cached_answer(request: AskRequest, embedding: list) -> dict | None:
+    """Cherche une réponse validée réutilisable (cache sémantique).
+
+    Returns:
+        Dict avec id, answer, technicien_id et category, ou None
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    if not request.use_cache:
+        answer_cache.record_bypass()
+        return None
+
+    with Session(engine) as session:
+        cached = answer_cache.lookup(session, embedding)
+        if cached is None:
+            return None
+        return {
+            "id": cached.id,
+            "answer": cached.reponse_label,
+            "technicien_id": cached.technicien_id,
+            "category": cached.technicien.nom if cached.technicien else None,
+        }
+
+
+async def _store_question(request: AskRequest, embedding: list) -> int:
+    """Enregistre la question et son embedding, retourne son id."""
+    # Pour SQLite, sérialiser l'embedding en JSON
+    embedding_to_store = embedding
+    if "sqlite" in DATABASE_URL:
+        embedding_to_store = json.dumps(embedding)
+
+    return await persistence.add(Question(
+        user_ad_id=request.user_ad_id,
+        question_label=request.question,
+        embedding_question=embedding_to_store,
+    ))
+
+
+def _find_technicien_id(category: str | None) -> int | None:
+    """Récupère l'id du technicien correspondant à la catégorie."""
+    if not category:
+        return None
+    return get_technicien_id(category)
+
+
+async def _store_reponse(
+    question_id: int, reponse_label: str, technicien_id: int | None
+) -> int:
+    """Enregistre la réponse générée (ou réutilisée), retourne son id."""
+    return await persistence.add(Reponse(
+        reponse_label=reponse_label,
+        question_id=question_id,
+        technicien_id=technicien_id,
+    ))
+
+
+def _build_answer_graph(request: AskRequest) -> StageGraph:
+    """Décrit le calcul de la réponse de /ask/ comme un graphe d'étapes.
+
+    - embed : embedding de la question
+    - cache : après embed (cache sémantique)
+    - retrieve : recherche GLPI
+    - classify : après embed (catégorie de technicien, plus proche centroïde)
+    - context : après retrieve et cache (bascule Web éventuelle)
+    - generate : après context, cache et classify (LLM, sauf réponse en
+      cache ; tag de catégorie demandé seulement si la question n'est
+      pas classée)
+    - technicien : après generate
+
+    La recherche ne dépend de l'embedding qu'en mode dense/hybride. Aucune
+    étape ne dépend de l'utilisateur : le calcul est partagé entre
+    questions identiques simultanées (voir _shared_answer).
+    """
+    graph = StageGraph()
+
+    async def embed():
+        return await llm.get_embedding(request.question)
+
+    async def cache(embedding):
+        return await run_db(_lookup_cached_answer, request, embedding)
+
+    async def retrieve(embedding=None):
+        return await llm.search_glpi(
+            request.question, question_embedding=embedding
+        )
+
+    async def context(retrieval, cached):
+        # Réponse déjà connue : inutile de lancer une recherche Web
+        if cached:
+            return [], None
+        glpi_results, relevant = retrieval
+        return await llm.select_context(request.question, glpi_results, relevant)
+
+    async def classify(embedding):
+        return await llm.classify_question(embedding)
+
+    async def generate(selected, cached, category):
+        if cached:
+            print(f"♻️ Réponse #{cached['id']} réutilisée (cache sémantique)")
+            return cached["answer"], [], cached["category"]
+
+        prompt, sources = llm.format_rag_prompt(
+            request.question, *selected,
+            ask_category=llm.llm_category_needed(category),
+        )
+        raw_response = await llm.get_chat_response(prompt)
+        answer, tagged = llm.parse_category_from_response(raw_response)
+        print(f"✅ Réponse reçue: {answer[:100]}")
+        return answer, sources, category or tagged
+
+    async def technicien(generated, cached):
+        if cached:
+            return cached["technicien_id"]
+        return _find_technicien_id(generated[2])
+
+    graph.add("embed", embed)
+    graph.add("cache", cache, after=["embed"])
+    if llm.retrieval_needs_embedding():
+        graph.add("retrieve", retrieve, after=["embed"])
+    else:
+        graph.add("retrieve", retrieve)
+    graph.add("classify", classify, after=["embed"])
+    graph.add("context", context, after=["retrieve", "cache"])
+    graph.add("generate", generate, after=["context", "cache", "classify"])
+    graph.add("technicien", technicien, after=["generate", "cache"])
+    return graph
+
+
+async def _compute_answer(
+    request: AskRequest,
+) -> Tuple[StageGraph, Dict[str, Any]]:
+    """Exécute le graphe de réponse, retourne le graphe et ses résultats."""
+    graph = _build_answer_graph(request)
+    try:
+        results = await graph.run()
+    finally:
+        ask_stage_stats.record(graph)
+    print(f"⏱️ Chemin critique: {' → '.join(graph.critical_path())}")
+    return graph, results
+
+
+def _coalescing_key(kind: str, request: AskRequest) -> Tuple:
+    """Clé des calculs partageables : libellé exact de la question et options.
+
+    Les suiveurs enregistrent l'embedding et la réponse calculés par le
+    meneur : seuls des libellés strictement identiques peuvent donc les
+    partager. Le demandeur n'entre pas dans la clé.
+    """
+    return kind, request.question, request.use_cache
+
+
+async def _shared_answer(
+    request: AskRequest,
+) -> Tuple[StageGraph, Dict[str, Any]]:
+    """Calcul de la réponse, partagé avec les questions identiques en cours."""
+    if not settings.ASK_COALESCING_ENABLED:
+        return await _compute_answer(request)
+    return await ask_flights.do(
+        _coalescing_key("ask", request), lambda: _compute_answer(request)
+    )
+
+
+def _admit(kind: str, request: AskRequest):
+    """Contrôle d'admission : refus immédiat si la file du LLM est pleine.
+
+    Réservé au streaming, dont le statut HTTP part avant la consultation
+    du cache sémantique. /ask/ n'en a pas besoin : llm_scheduler.slot()
+    refuse tout aussi immédiatement, mais seulement quand une génération
+    est nécessaire.
+
+    Une question identique déjà en cours ne sollicite pas le LLM : elle
+    est toujours admise. Les générations de la requête sont attribuées à
+    son utilisateur (file équitable).
+
+    Raises:
+        HTTPException: 429 avec Retry-After si la file est pleine
+    """
+    current_user.set(request.user_ad_id)
+    if settings.ASK_COALESCING_ENABLED and ask_flights.in_flight(
+        _coalescing_key(kind, request)
+    ):
+        return
+    try:
+        llm_scheduler.check(request.user_ad_id)
+    except LLMOverloaded as e:
+        raise _too_many_requests(e)
+
+
+def _too_many_requests(error: LLMOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 @app.post("/ask/")
-def ask_question(
-    request: AskRequest, session: Session = Depends(get_session)
-):
+async def ask_question(request: AskRequest, response: Response):
     """Endpoint principal pour poser une question avec RAG.
 
+    Les étapes (embedding, recherche, génération) s'exécutent en parallèle
+    dès que leurs dépendances sont satisfaites ; une question identique
+    déjà en cours de traitement réutilise ce calcul. La question et la
+    réponse sont enregistrées pour chaque demandeur. La durée de chaque
+    étape est renvoyée dans l'en-tête Server-Timing.
+
     Args:
         request: Requête contenant user_ad_id et question
-        session: Session SQLModel pour accès base de données
+        response: Réponse HTTP (en-têtes)
 
     Returns:
-        Dict avec question, answer, response_id et sources
+        Dict avec question, answer, response_id, sources et cached
 
     Raises:
-        HTTPException: En cas d'erreur serveur
+        HTTPException: 429 si le LLM est saturé (file d'attente pleine),
+            500 en cas d'erreur serveur
     """
+    # Pas de contrôle préalable : une réponse en cache reste servie quand
+    # le LLM est saturé ; la génération, elle, est refusée par slot()
+    current_user.set(request.user_ad_id)
     try:
-        embedding = llm.get_embedding(request.question)
+        graph, results = await _shared_answer(request)
+        answer, sources, _ = results["generate"]
+        question_id = await _store_question(request, results["embed"])
+        response_id = await _store_reponse(
+            question_id, answer, results["technicien"]
+        )
+    except LLMOverloaded as e:
+        raise _too_many_requests(e)
+    except Exception as e:
+        import traceback
+        print("🔴 ERREUR DÉTAILLÉE:")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Pour SQLite, sérialiser l'embedding en JSON
-        embedding_to_store = embedding
-        if "sqlite" in DATABASE_URL:
-            embedding_to_store = json.dumps(embedding)
+    response.headers["Server-Timing"] = graph.server_timing()
 
-        db_question = Question(
-            user_ad_id=request.user_ad_id,
-            question_label=request.question,
-            embedding_question=embedding_to_store,
-        )
-        session.add(db_question)
-        session.commit()
-        session.refresh(db_question)
-
-        print("🔍 Appel get_rag_response...")
-        llm_response, sources, category = llm.get_rag_response(request.question)
-        print(f"✅ Réponse reçue: {llm_response[:100]}")
-
-        # Récupérer le technicien correspondant à la catégorie
-        technicien_id = None
-        if category:
-            technicien = session.exec(
-                select(Technicien).where(Technicien.nom == category)
-            ).first()
-            if technicien:
-                technicien_id = technicien.id
-
-        db_reponse = Reponse(
-            reponse_label=llm_response,
-            question_id=db_question.id,
-            technicien_id=technicien_id,
-        )
-        session.add(db_reponse)
-        session.commit()
-        session.refresh(db_reponse)
+    return {
+        "question": request.question,
+        "answer": answer,
+        "response_id": response_id,
+        "sources": sources,
+        "cached": results["cache"] is not None,
+    }
 
-        return {
-            "question": db_question.question_label,
-            "answer": db_reponse.reponse_label,
-            "response_id": db_reponse.id,
-            "sources": sources,
+
+def _sse(event: str, data) -> str:
+    """Formate un évènement Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _answer_events(request: AskRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """Évènements du calcul d'une réponse en streaming.
+
+    - embedding : embedding de la question
+    - sources, token : transmis tels quels au client
+    - answer : réponse nettoyée, catégorie, technicien_id et cached
+    """
+    embedding = await llm.get_embedding(request.question)
+    yield "embedding", embedding
+    cached = await run_db(_lookup_cached_answer, request, embedding)
+
+    if cached:
+        yield "sources", []
+        yield "token", cached["answer"]
+        yield "answer", {
+            "answer": cached["answer"],
+            "category": cached["category"],
+            "technicien_id": cached["technicien_id"],
+            "cached": True,
         }
+        return
+
+    answer, category = "", None
+    async for event, data in llm.stream_rag_response(
+        request.question, question_embedding=embedding
+    ):
+        if event == "answer":
+            answer, category = data
+        else:
+            yield event, data
+    yield "answer", {
+        "answer": answer,
+        "category": category,
+        "technicien_id": _find_technicien_id(category),
+        "cached": False,
+    }
+
 
+def _shared_answer_events(request: AskRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """Évènements de _answer_events, partagés entre questions identiques.
+
+    Un demandeur qui rejoint un calcul en cours reçoit d'abord les
+    évènements déjà produits, puis les suivants.
+    """
+    if not settings.ASK_COALESCING_ENABLED:
+        return _answer_events(request)
+    return ask_flights.stream(
+        _coalescing_key("stream", request), lambda: _answer_events(request)
+    )
+
+
+async def _stream_answer(request: AskRequest) -> AsyncIterator[str]:
+    """Génère les évènements SSE d'une question (voir ask_question_stream)."""
+    try:
+        question_id, final = None, None
+        async for event, data in _shared_answer_events(request):
+            if event == "embedding":
+                question_id = await _store_question(request, data)
+            elif event == "answer":
+                final = data
+            else:
+                yield _sse(event, data)
+
+        response_id = await _store_reponse(
+            question_id, final["answer"], final["technicien_id"]
+        )
+        yield _sse("done", {
+            "response_id": response_id,
+            "answer": final["answer"],
+            "category": final["category"],
+            "cached": final["cached"],
+        })
+
+    except LLMOverloaded as e:
+        yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
     except Exception as e:
         import traceback
-        print("🔴 ERREUR DÉTAILLÉE:")
+        print("🔴 ERREUR DÉTAILLÉE (stream):")
         print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
+        yield _sse("error", {"detail": str(e)})
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: AskRequest):
+    """Variante streaming de /ask/ (Server-Sent Events).
+
+    Évènements émis :
+    - sources : liste des sources, avant la génération
+    - token : morceau de réponse, dès qu'Ollama le produit
+    - done : response_id, réponse nettoyée et catégorie
+    - error : détail de l'erreur (et retry_after si le LLM est saturé)
+
+    Args:
+        request: Requête contenant user_ad_id et question
+
+    Returns:
+        StreamingResponse au format text/event-stream
+
+    Raises:
+        HTTPException: 429 si la file d'attente du LLM est pleine
+    """
+    _admit("stream", request)
+    return StreamingResponse(
+        _stream_answer(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.post("/feedback/")
 def submit_feedback(
@@ -180,6 +605,15 @@ def submit_feedback(
     """
     try:
         db_reponse = session.get(Reponse, request.response_id)
+        # Réponse encore dans la file d'écriture différée : attendre
+        # uniquement cette ligne (un id inconnu n'attend pas)
+        if not db_reponse and persistence.is_pending(Reponse, request.response_id):
+            persistence.wait_for(Reponse, request.response_id, timeout=5.0)
+            db_reponse = session.get(Reponse, request.response_id)
+        if not db_reponse and persistence.failed(Reponse, request.response_id):
+            raise HTTPException(
+                status_code=500, detail="Réponse non enregistrée (échec d'écriture)"
+            )
         if not db_reponse:
             raise HTTPException(
                 status_code=404, detail="Réponse non trouvée"
@@ -202,6 +636,45 @@ def submit_feedback(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/ready")
+def readiness(response: Response):
+    """
+    Disponibilité pour le répartiteur de charge : 200 une fois les modèles
+    de génération et d'embeddings chargés sur au moins un serveur Ollama,
+    503 sinon.
+
+    GET /api/ready
+    """
+    pools = {"chat": chat_pool.ready(), "embed": embed_pool.ready()}
+    ready = all(pools.values())
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, **pools}
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    """
+    Compteurs de performance des caches et services.
+    
+    GET /api/metrics
+    """
+    return {
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "ask_stages": ask_stage_stats.stats(),
+        "ask_coalescing": ask_flights.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "ollama": {"chat": chat_pool.stats(), "embed": embed_pool.stats()},
+        "persistence": persistence.stats(),
+        "glpi_sync": glpi_sync.stats(),
+        "glpi": glpi_service.stats(),
+        "ad": ad_service.stats(),
+        "web_search": web_search.stats(),
+        "category_classifier": llm.category_classifier.stats(),
+        "startup": startup_report,
+    }
+
 
 # ============================================================================
 # ENDPOINTS INFRASTRUCTURE (GLPI + AD)
@@ -209,7 +682,7 @@ def submit_feedback(
 
 
 @app.post("/api/infrastructure/create_ticket")
-def infra_create_ticket(request: CreateTicketRequest):
+async def infra_create_ticket(request: CreateTicketRequest):
     """
     Crée un ticket GLPI avec enrichissement AD.
     
@@ -219,11 +692,11 @@ def infra_create_ticket(request: CreateTicketRequest):
         "question": "Mon wifi ne fonctionne pas"
     }
     """
-    # Récupère infos AD
-    user_info = ad_service.get_user_info(request.username)
+    # Récupère infos AD (ldap3 est bloquant : threadpool)
+    user_info = await run_in_threadpool(ad_service.get_user_info, request.username)
     
     # Crée ticket GLPI
-    ticket = glpi_service.create_ticket(
+    ticket = await glpi_service.create_ticket(
         username=request.username,
         question=request.question,
         user_info=user_info
@@ -240,43 +713,97 @@ def infra_create_ticket(request: CreateTicketRequest):
     }
 
 @app.get("/api/infrastructure/ticket/{ticket_id}")
-def infra_get_ticket(ticket_id: int):
+async def infra_get_ticket(ticket_id: int):
     """
     Récupère les détails d'un ticket.
     
     GET /api/infrastructure/ticket/123
     """
-    details = glpi_service.get_ticket_details(ticket_id)
+    details = await glpi_service.get_ticket_details(ticket_id)
     
     if not details:
         raise HTTPException(404, "Ticket non trouvé")
     
     return details
 
+@app.post("/api/infrastructure/tickets/details")
+async def infra_get_tickets(request: TicketsDetailsRequest):
+    """
+    Récupère les détails de plusieurs tickets en une requête.
+    
+    POST /api/infrastructure/tickets/details
+    {
+        "ticket_ids": [123, 124, 130]
+    }
+    """
+    details = await glpi_service.get_tickets_details(request.ticket_ids)
+    
+    return {
+        "tickets": [d for d in details.values() if d],
+        "not_found": [ticket_id for ticket_id, d in details.items() if not d]
+    }
+
 @app.get("/api/infrastructure/user_tickets/{username}")
-def infra_user_tickets(username: str, limit: int = 20):
+async def infra_user_tickets(
+    username: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = None,
+    status: Optional[str] = None,
+    since: Optional[date] = None,
+):
     """
-    Liste les tickets d'un utilisateur.
+    Liste les tickets d'un utilisateur, du plus récent au plus ancien.
     
     GET /api/infrastructure/user_tickets/jean.dupont?limit=10
+    GET /api/infrastructure/user_tickets/jean.dupont?cursor=<next_cursor>
+    
+    Filtres optionnels : status (1-6, notold, old) et since (YYYY-MM-DD).
+    next_cursor vaut null sur la dernière page.
     """
-    tickets = glpi_service.get_user_tickets(username, limit)
-    return {"username": username, "tickets": tickets}
+    # Un ticket de plus que demandé indique s'il reste une page
+    tickets = await glpi_service.get_user_tickets(
+        username,
+        limit + 1,
+        before_id=cursor,
+        status=status,
+        since=since.isoformat() if since else None,
+    )
+    next_cursor = tickets[limit - 1]["id"] if len(tickets) > limit else None
+    return {
+        "username": username,
+        "tickets": tickets[:limit],
+        "next_cursor": next_cursor,
+    }
 
 @app.get("/api/infrastructure/user_info/{username}")
-def infra_user_info(username: str):
+async def infra_user_info(username: str):
     """
     Récupère les infos AD d'un utilisateur.
     
     GET /api/infrastructure/user_info/jean.dupont
     """
-    user_info = ad_service.get_user_info(username)
+    user_info = await run_in_threadpool(ad_service.get_user_info, username)
     
     if not user_info:
         raise HTTPException(404, "Utilisateur non trouvé dans l'AD")
     
     return user_info
 
+@app.post("/api/infrastructure/users_info")
+async def infra_users_info(request: UsersInfoRequest):
+    """
+    Récupère les infos AD de plusieurs utilisateurs en quelques recherches.
+    
+    POST /api/infrastructure/users_info
+    {"usernames": ["jean.dupont", "marie.martin"]}
+    """
+    users = await run_in_threadpool(ad_service.get_users_info, request.usernames)
+    
+    return {
+        "users": {login: info for login, info in users.items() if info},
+        "not_found": [login for login, info in users.items() if not info],
+    }
+
 frontend_path = (
     Path("/app/frontend")
     if Path("/app/frontend").exists()
@@ -0,0 +1,379 @@
+"""Répartition des appels Ollama sur plusieurs serveurs d'inférence.
+
+Chaque pool (génération, embeddings) regroupe une liste de serveurs
+Ollama. Un appel est routé vers le serveur sain qui a le moins de
+requêtes en cours ; en cas d'erreur de connexion ou d'erreur serveur, il
+est rejoué sur le serveur suivant. Une vérification périodique
+(/api/tags) marque indisponible un serveur injoignable ou qui n'a pas le
+modèle, et réintègre un serveur rétabli.
+
+Ajouter un nœud d'inférence revient à l'ajouter à OLLAMA_HOST (ou à
+OLLAMA_CHAT_HOSTS / OLLAMA_EMBED_HOSTS).
+
+Charger un modèle en mémoire prend plusieurs secondes sur CPU : chaque
+serveur sain est préchargé en tâche de fond dès le démarrage, et
+optionnellement sollicité à intervalle régulier pour que le modèle reste
+résident (keep_alive). Un pool n'est prêt qu'une fois le modèle chargé
+sur au moins un serveur ; un modèle ensuite déchargé faute d'activité
+(keep_alive expiré) n'est rechargé par le pool que si le keep-warm est
+actif, sinon par l'appel suivant.
+"""
+import asyncio
+import logging
+import time
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+)
+
+import httpx
+import ollama
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_hosts(value: str) -> List[str]:
+    """Liste de serveurs séparés par des virgules ou des espaces."""
+    return [host for host in value.replace(",", " ").split() if host]
+
+
+def parse_keep_alive(value: str) -> Union[float, str]:
+    """keep_alive Ollama : durée ("30m", "1h") ou secondes ("-1" : toujours)."""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+async def load_chat_model(
+    client: ollama.AsyncClient, model: str, keep_alive: Union[float, str]
+):
+    """Charge un modèle de génération (requête vide, aucun token produit)."""
+    await client.generate(model=model, prompt="", keep_alive=keep_alive)
+
+
+async def load_embedding_model(
+    client: ollama.AsyncClient, model: str, keep_alive: Union[float, str]
+):
+    """Charge un modèle d'embeddings (embedding d'un texte minimal)."""
+    await client.embeddings(model=model, prompt="ping", keep_alive=keep_alive)
+
+
+def _is_backend_error(error: Exception) -> bool:
+    """Erreur imputable au serveur (et non à la requête) : autre serveur."""
+    if isinstance(error, ollama.ResponseError):
+        # 404 : modèle absent de ce serveur
+        return error.status_code >= 500 or error.status_code == 404
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class OllamaBackend:
+    """Un serveur Ollama, son client et son état."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self._client: Optional[ollama.AsyncClient] = None
+        # Optimiste jusqu'à la première vérification
+        self.healthy = True
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+        # Modèle résident en mémoire (d'après /api/ps ou le préchargement)
+        self.loaded = False
+        # Modèle chargé au moins une fois (préchargé ou trouvé résident)
+        self.warmed = False
+        self.last_warm: Optional[float] = None
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        """Client asynchrone, créé au premier appel."""
+        if self._client is None:
+            self._client = ollama.AsyncClient(host=self.host)
+        return self._client
+
+    def mark_down(self, error: Any):
+        self.healthy = False
+        self.errors += 1
+        self.last_error = str(error)
+
+    async def aclose(self):
+        if self._client is not None:
+            # ollama.AsyncClient n'expose pas de fermeture : client httpx sous-jacent
+            await self._client._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "loaded": self.loaded,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """Serveurs Ollama interchangeables pour un même modèle.
+
+    Args:
+        name: Nom du pool (journaux, métriques)
+        hosts: URL des serveurs Ollama
+        model: Modèle attendu sur chaque serveur
+        check_interval: Intervalle (s) entre deux vérifications
+        keep_alive: Durée de résidence du modèle après un appel
+        load: Chargement du modèle sur un serveur (None : pas de
+            préchargement)
+        keep_warm_interval: Intervalle (s) entre deux sollicitations
+            entretenant le modèle en mémoire (0 : désactivé)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hosts: List[str],
+        model: str,
+        check_interval: float = 30.0,
+        keep_alive: Union[float, str] = "5m",
+        load: Optional[Callable[..., Awaitable[Any]]] = None,
+        keep_warm_interval: float = 0.0,
+    ):
+        if not hosts:
+            raise ValueError(f"Aucun serveur Ollama pour le pool {name}")
+        self.name = name
+        self.model = model
+        self.check_interval = check_interval
+        self.keep_alive = keep_alive
+        self.load = load
+        self.keep_warm_interval = keep_warm_interval
+        self.backends = [OllamaBackend(host) for host in hosts]
+        self._task: Optional[asyncio.Task] = None
+
+        self.failovers = 0
+        self.checks = 0
+        self.warm_ups = 0
+
+    def candidates(self) -> List[OllamaBackend]:
+        """Serveurs à essayer, du moins chargé au plus chargé.
+
+        À charge égale, le moins récemment utilisé passe en premier. Si
+        aucun serveur n'est sain, tous sont essayés.
+        """
+        healthy = [b for b in self.backends if b.healthy] or self.backends
+        return sorted(healthy, key=lambda b: (b.in_flight, b.last_used))
+
+    def _begin(self, backend: OllamaBackend):
+        backend.in_flight += 1
+        backend.requests += 1
+        backend.last_used = time.monotonic()
+
+    def _fail(self, backend: OllamaBackend, error: Exception, last: bool):
+        backend.mark_down(error)
+        if not last:
+            self.failovers += 1
+            logger.warning(
+                f"⚠️ Ollama {self.name} {backend.host} indisponible, "
+                f"serveur suivant: {error}"
+            )
+
+    async def call(self, operation: Callable[[ollama.AsyncClient], Awaitable[T]]) -> T:
+        """Exécute un appel, rejoué sur un autre serveur en cas de panne.
+
+        Args:
+            operation: Appel à effectuer avec le client d'un serveur
+
+        Returns:
+            Le résultat de l'appel
+
+        Raises:
+            Exception: L'erreur du dernier serveur essayé, ou une erreur
+                propre à la requête (non rejouée)
+        """
+        candidates = self.candidates()
+        for position, backend in enumerate(candidates):
+            self._begin(backend)
+            try:
+                return await operation(backend.client)
+            except Exception as e:
+                if not _is_backend_error(e):
+                    raise
+                last = position == len(candidates) - 1
+                self._fail(backend, e, last)
+                if last:
+                    raise
+            finally:
+                backend.in_flight -= 1
+
+    async def stream(
+        self,
+        operation: Callable[[ollama.AsyncClient], Awaitable[AsyncIterator[T]]],
+    ) -> AsyncIterator[T]:
+        """Variante de call() pour une réponse en flux.
+
+        Le changement de serveur n'est possible qu'avant le premier
+        élément ; ensuite, une erreur interrompt le flux.
+        """
+        candidates = self.candidates()
+        for position, backend in enumerate(candidates):
+            self._begin(backend)
+            started = False
+            try:
+                async for item in await operation(backend.client):
+                    started = True
+                    yield item
+                return
+            except Exception as e:
+                if not _is_backend_error(e):
+                    raise
+                last = started or position == len(candidates) - 1
+                self._fail(backend, e, last)
+                if last:
+                    raise
+            finally:
+                backend.in_flight -= 1
+
+    def _has_model(self, models: List[Any]) -> bool:
+        names = {m.model for m in models}
+        return self.model in names or f"{self.model}:latest" in names
+
+    async def check(self, backend: OllamaBackend):
+        """Vérifie qu'un serveur répond, dispose du modèle et l'a chargé."""
+        self.checks += 1
+        backend.last_check = time.monotonic()
+        try:
+            available = await asyncio.wait_for(backend.client.list(), timeout=5.0)
+            running = await asyncio.wait_for(backend.client.ps(), timeout=5.0)
+        except Exception as e:
+            backend.mark_down(e)
+            backend.loaded = False
+            return
+
+        backend.loaded = self._has_model(running.models)
+        backend.warmed = backend.warmed or backend.loaded
+        if self._has_model(available.models):
+            if not backend.healthy:
+                logger.info(f"✅ Ollama {self.name} {backend.host} rétabli")
+            backend.healthy = True
+            backend.last_error = None
+        else:
+            backend.mark_down(f"Modèle {self.model} absent")
+
+    async def check_all(self):
+        """Vérifie tous les serveurs en parallèle."""
+        await asyncio.gather(*(self.check(b) for b in self.backends))
+
+    def _needs_warming(self, backend: OllamaBackend) -> bool:
+        if self.load is None or not backend.healthy:
+            return False
+        # Préchargement initial
+        if not backend.warmed:
+            return True
+        # Ensuite, seul le keep-warm recharge un modèle déchargé après
+        # keep_alive : sinon keep_alive serait de fait infini
+        if not self.keep_warm_interval:
+            return False
+        return not backend.loaded or backend.last_warm is None or (
+            time.monotonic() - backend.last_warm >= self.keep_warm_interval
+        )
+
+    async def warm(self, backend: OllamaBackend):
+        """Charge le modèle sur un serveur (ou prolonge sa résidence)."""
+        started = time.monotonic()
+        try:
+            await self.load(backend.client, self.model, self.keep_alive)
+        except Exception as e:
+            backend.loaded = False
+            logger.warning(
+                f"⚠️ Préchargement de {self.model} sur {backend.host} impossible: {e}"
+            )
+            return
+        backend.loaded = backend.warmed = True
+        backend.last_warm = time.monotonic()
+        self.warm_ups += 1
+        logger.info(
+            f"🔥 {self.model} chargé sur {backend.host} "
+            f"({backend.last_warm - started:.1f} s)"
+        )
+
+    async def warm_all(self):
+        """Précharge le modèle sur les serveurs sains qui en ont besoin."""
+        await asyncio.gather(
+            *(self.warm(b) for b in self.backends if self._needs_warming(b))
+        )
+
+    async def run_forever(self):
+        while True:
+            await self.check_all()
+            await self.warm_all()
+            await asyncio.sleep(self.check_interval)
+
+    def ready(self) -> bool:
+        """Indique si le pool peut servir sans attendre un chargement.
+
+        Il faut au moins un serveur vérifié et sain, avec le modèle
+        préchargé si le préchargement est actif. Un modèle déchargé depuis
+        par keep_alive (serveur inactif) ne rend pas le pool indisponible :
+        il sera rechargé par le prochain appel.
+        """
+        return any(
+            b.last_check is not None
+            and b.healthy
+            and (b.warmed or self.load is None)
+            for b in self.backends
+        )
+
+    def start(self):
+        """Lance la vérification (et le préchargement) en tâche de fond."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        """Arrête la vérification périodique et ferme les clients."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for backend in self.backends:
+            await backend.aclose()
+
+    def stats(self) -> Dict:
+        """État de chaque serveur et nombre de basculements."""
+        return {
+            "model": self.model,
+            "ready": self.ready(),
+            "healthy": sum(b.healthy for b in self.backends),
+            "failovers": self.failovers,
+            "checks": self.checks,
+            "warm_ups": self.warm_ups,
+            "backends": [b.stats() for b in self.backends],
+        }
+
+
+chat_pool = OllamaPool(
+    "chat",
+    parse_hosts(settings.OLLAMA_CHAT_HOSTS),
+    model=settings.MODEL_NAME,
+    check_interval=settings.OLLAMA_HEALTH_INTERVAL,
+    keep_alive=parse_keep_alive(settings.CHAT_KEEP_ALIVE),
+    load=load_chat_model if settings.MODEL_WARMUP_ENABLED else None,
+    keep_warm_interval=settings.MODEL_KEEP_WARM_INTERVAL,
+)
+embed_pool = OllamaPool(
+    "embed",
+    parse_hosts(settings.OLLAMA_EMBED_HOSTS),
+    model=settings.EMBEDDING_MODEL,
+    check_interval=settings.OLLAMA_HEALTH_INTERVAL,
+    keep_alive=parse_keep_alive(settings.EMBEDDING_KEEP_ALIVE),
+    load=load_embedding_model if settings.MODEL_WARMUP_ENABLED else None,
+    keep_warm_interval=settings.MODEL_KEEP_WARM_INTERVAL,
+)
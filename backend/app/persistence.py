@@ -0,0 +1,327 @@
+"""Persistance différée (write-behind) des questions et réponses.
+
+Les identifiants sont attribués immédiatement, par blocs réservés en base,
+et les lignes sont écrites par un thread de fond en transactions groupées :
+la latence de la base n'apparaît plus dans le temps de réponse de /ask.
+
+Hors PostgreSQL, les identifiants viennent d'un compteur propre au
+processus : l'écriture différée n'y est active que si un seul processus
+écrit (PERSISTENCE_SINGLE_PROCESS), sinon l'écriture est immédiate.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from sqlalchemy import Engine, func
+from sqlmodel import Session, SQLModel, select, text
+
+from .cache import LRUCache
+from .config import settings
+from .database import engine, run_db
+from .models import Question, Reponse
+
+logger = logging.getLogger(__name__)
+
+# Ordre d'insertion dans un lot (clés étrangères)
+_INSERT_ORDER = (Question, Reponse)
+
+
+def _row_key(row: SQLModel) -> Tuple[str, int]:
+    return row.__tablename__, row.id
+
+
+class IdAllocator:
+    """Réserve des identifiants par blocs pour chaque table.
+
+    PostgreSQL : valeurs tirées de la séquence de la clé primaire, donc
+    sans collision entre workers. SQLite : compteur en mémoire initialisé
+    sur max(id), valable pour un seul processus.
+    """
+
+    def __init__(self, engine: Engine, block_size: int = 50):
+        self.engine = engine
+        self.block_size = block_size
+        self._blocks: Dict[str, List[int]] = {}
+        self._next: Dict[str, int] = {}
+        # _lock protège les blocs (take() est appelé depuis la boucle
+        # d'évènements) ; _reserve_lock sérialise les accès base, tenus
+        # hors de _lock
+        self._lock = threading.Lock()
+        self._reserve_lock = threading.Lock()
+
+    def take(self, model: Type[SQLModel]) -> Optional[int]:
+        """Retourne un identifiant réservé, ou None si le bloc est épuisé."""
+        with self._lock:
+            block = self._blocks.get(model.__tablename__)
+            return block.pop(0) if block else None
+
+    def refill(self, model: Type[SQLModel]) -> int:
+        """Réserve un nouveau bloc (accès base) et retourne un identifiant."""
+        table = model.__tablename__
+        with self._reserve_lock:
+            # Bloc déjà rechargé par un autre thread pendant l'attente
+            identifier = self.take(model)
+            if identifier is not None:
+                return identifier
+            reserved = self._reserve(model)
+        with self._lock:
+            block = self._blocks.setdefault(table, [])
+            block.extend(reserved)
+            return block.pop(0)
+
+    def _reserve(self, model: Type[SQLModel]) -> List[int]:
+        table = model.__tablename__
+        with Session(self.engine) as session:
+            if self.engine.dialect.name == "postgresql":
+                return list(session.execute(
+                    text(
+                        "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                        "FROM generate_series(1, :count)"
+                    ).bindparams(table=table, count=self.block_size)
+                ).scalars())
+
+            if table not in self._next:
+                current = session.exec(select(func.max(model.id))).one()
+                self._next[table] = (current or 0) + 1
+        start = self._next[table]
+        self._next[table] = start + self.block_size
+        return list(range(start, start + self.block_size))
+
+
+class WriteBehindStore:
+    """File bornée de lignes à insérer, vidée par un thread de fond.
+
+    En mode "sync", add() écrit directement la ligne (comportement
+    historique). Quand la file est pleine, add() attend qu'une place se
+    libère : la base ne peut pas prendre un retard illimité.
+
+    Une ligne dont l'écriture échoue a déjà communiqué son identifiant :
+    l'échec est mémorisé (failed()) pour être signalé à qui la réclame.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        mode: str = "write_behind",
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        id_block_size: int = 50,
+        single_process: bool = False,
+    ):
+        self.engine = engine
+        if (
+            mode == "write_behind"
+            and engine.dialect.name != "postgresql"
+            and not single_process
+        ):
+            # Compteur d'identifiants propre au processus : deux workers
+            # attribueraient les mêmes identifiants
+            logger.warning(
+                "⚠️ Écriture différée refusée hors PostgreSQL sans "
+                "PERSISTENCE_SINGLE_PROCESS=true : écriture immédiate"
+            )
+            mode = "sync"
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ids = IdAllocator(engine, id_block_size)
+
+        self._queue: "queue.Queue[Optional[SQLModel]]" = queue.Queue(maxsize=queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+        # Numéros d'ordre des lignes mises en file / écrites
+        self._enqueued = 0
+        self._written = 0
+        self._progress = threading.Condition()
+        # (table, id) des lignes en file, pas encore écrites
+        self._pending: Set[Tuple[str, int]] = set()
+        self._failed = LRUCache(maxsize=10000)
+        self.last_error: Optional[str] = None
+
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.queue_full = 0
+
+    async def add(self, row: SQLModel) -> int:
+        """Enregistre une ligne et retourne son identifiant.
+
+        Args:
+            row: Instance Question ou Reponse (id renseigné si absent)
+
+        Returns:
+            Identifiant de la ligne, utilisable immédiatement
+        """
+        if self.mode == "sync":
+            return await run_db(self._write_now, row)
+
+        if row.id is None:
+            row.id = self.ids.take(type(row))
+            if row.id is None:
+                row.id = await run_db(self.ids.refill, type(row))
+
+        with self._progress:
+            self._pending.add(_row_key(row))
+        self._ensure_worker()
+        try:
+            self._enqueue(row, block=False)
+        except queue.Full:
+            self.queue_full += 1
+            await run_db(self._enqueue, row, True)
+        return row.id
+
+    def _write_now(self, row: SQLModel) -> int:
+        with Session(self.engine) as session:
+            session.add(row)
+            session.commit()
+            session.refresh(row)
+            return row.id
+
+    def _enqueue(self, row: SQLModel, block: bool):
+        self._queue.put(row, block=block)
+        with self._progress:
+            self._enqueued += 1
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="write-behind", daemon=True
+                )
+                self._worker.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            # Avant écriture : après commit, les attributs sont expirés
+            keys = [_row_key(r) for r in batch]
+            self._write_batch(batch)
+            with self._progress:
+                self._written += len(batch)
+                self._pending.difference_update(keys)
+                self._progress.notify_all()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[SQLModel]):
+        """Insère un lot en une transaction ; ligne par ligne en cas d'échec."""
+        batch = sorted(batch, key=lambda r: _INSERT_ORDER.index(type(r)))
+        try:
+            with Session(self.engine) as session:
+                session.add_all(batch)
+                session.commit()
+            self.batches += 1
+            self.rows_written += len(batch)
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Écriture groupée échouée, reprise ligne à ligne: {e}")
+
+        for row in batch:
+            key = _row_key(row)
+            try:
+                # INSERT simple : un identifiant déjà pris échoue au lieu
+                # d'écraser la ligne existante (comme le ferait merge)
+                with Session(self.engine) as session:
+                    session.add(row)
+                    session.commit()
+                self.rows_written += 1
+            except Exception as e:
+                self.rows_failed += 1
+                self.last_error = f"{type(row).__name__} #{key[1]}: {e}"
+                self._failed.set(key, True)
+                logger.error(f"❌ {type(row).__name__} #{key[1]} non enregistrée: {e}")
+
+    def is_pending(self, model: Type[SQLModel], row_id: int) -> bool:
+        """Indique si la ligne est en file d'écriture (pas encore écrite)."""
+        with self._progress:
+            return (model.__tablename__, row_id) in self._pending
+
+    def wait_for(
+        self, model: Type[SQLModel], row_id: int, timeout: Optional[float] = None
+    ) -> bool:
+        """Attend l'écriture (réussie ou non) d'une ligne en file.
+
+        Returns:
+            False si le délai a expiré avant son écriture
+        """
+        key = (model.__tablename__, row_id)
+        with self._progress:
+            return self._progress.wait_for(
+                lambda: key not in self._pending, timeout=timeout
+            )
+
+    def failed(self, model: Type[SQLModel], row_id: int) -> bool:
+        """Indique si l'écriture de la ligne a échoué."""
+        return self._failed.get((model.__tablename__, row_id)) is not None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attend l'écriture de toutes les lignes déjà mises en file.
+
+        Returns:
+            False si le délai a expiré avant la fin de l'écriture
+        """
+        with self._progress:
+            target = self._enqueued
+            return self._progress.wait_for(
+                lambda: self._written >= target, timeout=timeout
+            )
+
+    def close(self, timeout: float = 10.0):
+        """Écrit les lignes restantes puis arrête le thread de fond."""
+        with self._start_lock:
+            worker, self._worker = self._worker, None
+        if worker is None or not worker.is_alive():
+            return
+        self._queue.put(None)
+        worker.join(timeout)
+
+    def stats(self) -> Dict:
+        """État de la file et compteurs d'écriture."""
+        return {
+            "mode": self.mode,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "last_error": self.last_error,
+            "queue_full": self.queue_full,
+        }
+
+
+store = WriteBehindStore(
+    engine,
+    mode=settings.PERSISTENCE_MODE,
+    queue_size=settings.PERSISTENCE_QUEUE_SIZE,
+    batch_size=settings.PERSISTENCE_BATCH_SIZE,
+    flush_interval=settings.PERSISTENCE_FLUSH_INTERVAL,
+    id_block_size=settings.PERSISTENCE_ID_BLOCK_SIZE,
+    single_process=settings.PERSISTENCE_SINGLE_PROCESS,
+)
@@ -0,0 +1,140 @@
+"""Exécution d'étapes asynchrones selon leurs dépendances.
+
+Chaque étape démarre dès que les étapes dont elle dépend sont terminées :
+les étapes indépendantes s'exécutent donc en parallèle. Les durées sont
+mesurées pour identifier le chemin critique.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+
+class StageGraph:
+    """Graphe de dépendances d'étapes asynchrones.
+
+    Les dépendances d'une étape doivent être déclarées avant elle, ce qui
+    garantit l'absence de cycle. Chaque étape reçoit en arguments les
+    résultats de ses dépendances, dans l'ordre déclaré.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]] = {}
+        # Nom -> (début, fin) en secondes depuis le lancement du graphe
+        self.timings: Dict[str, Tuple[float, float]] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        after: Sequence[str] = (),
+    ):
+        """Déclare une étape.
+
+        Args:
+            name: Nom unique de l'étape
+            func: Coroutine recevant les résultats des dépendances
+            after: Noms des étapes dont elle dépend
+
+        Raises:
+            ValueError: Si le nom existe déjà ou si une dépendance est inconnue
+        """
+        if name in self._stages:
+            raise ValueError(f"Étape déjà déclarée: {name}")
+        for dependency in after:
+            if dependency not in self._stages:
+                raise ValueError(f"Dépendance inconnue pour {name}: {dependency}")
+        self._stages[name] = (func, tuple(after))
+
+    async def run(self) -> Dict[str, Any]:
+        """Exécute toutes les étapes.
+
+        Returns:
+            Dict nom d'étape -> résultat
+
+        Raises:
+            Exception: La première erreur d'étape ; les autres sont annulées
+        """
+        origin = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> Any:
+            func, after = self._stages[name]
+            inputs = [await tasks[dependency] for dependency in after]
+            start = time.perf_counter() - origin
+            try:
+                return await func(*inputs)
+            finally:
+                self.timings[name] = (start, time.perf_counter() - origin)
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def critical_path(self) -> List[str]:
+        """Chaîne d'étapes ayant déterminé la durée totale.
+
+        En partant de l'étape terminée en dernier, on remonte à chaque fois
+        la dépendance qui s'est terminée le plus tard.
+        """
+        if not self.timings:
+            return []
+
+        path = []
+        current = max(self.timings, key=lambda name: self.timings[name][1])
+        while current is not None:
+            path.append(current)
+            after = [d for d in self._stages[current][1] if d in self.timings]
+            current = max(after, key=lambda d: self.timings[d][1]) if after else None
+        return list(reversed(path))
+
+    def server_timing(self) -> str:
+        """Durées au format de l'en-tête HTTP Server-Timing (ms)."""
+        return ", ".join(
+            f"{name};dur={(end - start) * 1000:.1f}"
+            for name, (start, end) in self.timings.items()
+        )
+
+
+class StageStats:
+    """Agrégat des durées d'étapes sur l'ensemble des requêtes."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, graph: StageGraph):
+        """Ajoute les mesures d'une exécution du graphe."""
+        critical = set(graph.critical_path())
+        with self._lock:
+            for name, (start, end) in graph.timings.items():
+                duration = (end - start) * 1000
+                stat = self._stats.setdefault(
+                    name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "critical": 0}
+                )
+                stat["count"] += 1
+                stat["total_ms"] += duration
+                stat["max_ms"] = max(stat["max_ms"], duration)
+                stat["critical"] += name in critical
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Durée moyenne/max et fréquence sur le chemin critique par étape."""
+        with self._lock:
+            return {
+                name: {
+                    "count": stat["count"],
+                    "avg_ms": stat["total_ms"] / stat["count"],
+                    "max_ms": stat["max_ms"],
+                    "critical_ratio": stat["critical"] / stat["count"],
+                }
+                for name, stat in self._stats.items()
+            }
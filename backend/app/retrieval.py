@@ -0,0 +1,565 @@
+"""Moteur de recherche sur la base de connaissances GLPI.
+
+Index inversé BM25 construit une seule fois au chargement des données,
+puis interrogé à chaque question sans reparcourir le corpus. Un index
+dense (embeddings) permet en complément la recherche sémantique ; les
+deux classements peuvent être fusionnés par rang réciproque (RRF).
+
+Les documents sont indexés par passages (sections markdown, fenêtres
+recouvrantes pour les sections longues) : une recherche retourne chaque
+document réduit aux passages trouvés, les passages contigus fusionnés.
+"""
+import asyncio
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from operator import itemgetter
+from typing import (
+    Any, Awaitable, Callable, Dict, Hashable, List, Sequence, Tuple
+)
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_HEADING_RE = re.compile(r"^\s*#{1,6}\s+\S")
+
+# Mots vides français (sans accents, après normalisation)
+STOPWORDS = frozenset("""
+a ai as au aux avec c ce ces cet cette comment d dans de des du elle elles
+en es est et etre il ils j je l la le les leur leurs lui m ma mais me mes moi
+mon n ne nos notre nous on ont ou par pas plus pour pourquoi qu quand que
+quel quelle quelles quels qui quoi s sa sans se ses son sont sur t ta te tes
+ton tu un une vos votre vous y
+""".split())
+
+
+def fold_accents(text: str) -> str:
+    """Supprime les accents d'un texte (é -> e, ç -> c, ...)."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _stem(token: str) -> str:
+    """Racinisation minimale : retire la marque du pluriel."""
+    if len(token) > 3 and token[-1] in "sx" and token[-2] != "s":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte français en termes normalisés.
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        Liste de termes en minuscules, sans accents ni mots vides
+    """
+    folded = fold_accents(text.lower())
+    return [
+        _stem(token)
+        for token in _TOKEN_RE.findall(folded)
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def _line_size(line: str) -> int:
+    return len(line.strip()) + 1
+
+
+def _windows(
+    lines: List[str], start: int, end: int, max_chars: int, overlap: int
+) -> List[Tuple[int, int]]:
+    """Découpe les lignes [start, end) en fenêtres recouvrantes."""
+    windows = []
+    while True:
+        stop, size = start, 0
+        while stop < end and (
+            stop == start or size + _line_size(lines[stop]) <= max_chars
+        ):
+            size += _line_size(lines[stop])
+            stop += 1
+        windows.append((start, stop))
+        if stop >= end:
+            return windows
+
+        # La fenêtre suivante reprend les dernières lignes (recouvrement)
+        next_start, carried = stop, 0
+        while (
+            next_start - 1 > start
+            and carried + _line_size(lines[next_start - 1]) <= overlap
+        ):
+            next_start -= 1
+            carried += _line_size(lines[next_start])
+        start = next_start
+
+
+def split_passages(
+    text: str, max_chars: int = 600, overlap: int = 120
+) -> List[Tuple[int, int]]:
+    """Découpe un texte (markdown) en passages.
+
+    Chaque titre markdown ouvre une section ; une section réduite à son
+    titre est rattachée à la suivante. Une section plus longue que
+    max_chars est découpée en fenêtres de lignes se recouvrant d'environ
+    overlap caractères.
+
+    Args:
+        text: Contenu du document
+        max_chars: Taille visée d'un passage (une ligne n'est jamais coupée)
+        overlap: Recouvrement entre fenêtres d'une même section
+
+    Returns:
+        Plages de lignes [début, fin) de text.splitlines(), dans l'ordre
+    """
+    lines = text.splitlines()
+    if not lines:
+        return [(0, 0)]
+
+    sections = []
+    start = 0
+    for i, line in enumerate(lines):
+        if i > start and _HEADING_RE.match(line):
+            has_body = any(
+                l.strip() and not _HEADING_RE.match(l) for l in lines[start:i]
+            )
+            if has_body:
+                sections.append((start, i))
+                start = i
+    sections.append((start, len(lines)))
+
+    passages = []
+    for start, end in sections:
+        if sum(_line_size(line) for line in lines[start:end]) > max_chars:
+            passages.extend(_windows(lines, start, end, max_chars, overlap))
+        else:
+            passages.append((start, end))
+    return passages
+
+
+class BM25Index:
+    """Index inversé avec pondération BM25.
+
+    Les postings sont stockés par terme (terme -> {clé document: tf}),
+    une recherche ne parcourt donc que les documents contenant au moins
+    un terme de la requête.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._doc_len: Dict[Hashable, int] = {}
+        self._doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._doc_len
+
+    def add(self, key: Hashable, text: str):
+        """Indexe (ou ré-indexe) un document."""
+        if key in self._doc_len:
+            self.remove(key)
+
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[key] = tf
+        self._doc_len[key] = len(tokens)
+        self._doc_terms[key] = tuple(counts)
+        self._total_len += len(tokens)
+
+    def remove(self, key: Hashable):
+        """Retire un document de l'index."""
+        length = self._doc_len.pop(key, None)
+        if length is None:
+            return
+        self._total_len -= length
+
+        for term in self._doc_terms.pop(key):
+            docs = self._postings[term]
+            del docs[key]
+            if not docs:
+                del self._postings[term]
+
+    def idf(self, term: str) -> float:
+        """IDF BM25 (toujours positif) d'un terme."""
+        n = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._doc_len) - n + 0.5) / (n + 0.5))
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[Hashable, float]]:
+        """Recherche les documents les plus pertinents.
+
+        Le score BM25 est normalisé par la somme des IDF des termes de la
+        requête : 1.0 correspond à un document de longueur moyenne qui
+        contient chaque terme, ce qui le rend comparable à un seuil fixe.
+
+        Args:
+            query: Requête utilisateur
+            limit: Nombre maximum de résultats
+
+        Returns:
+            Liste de tuples (clé, score normalisé dans [0, 1]) triée par
+            pertinence décroissante
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._doc_len or limit <= 0:
+            return []
+
+        k1, b = self.k1, self.b
+        avgdl = self._total_len / len(self._doc_len) or 1.0
+        doc_len = self._doc_len
+
+        scores: Dict[Hashable, float] = {}
+        max_score = 0.0
+        for term in terms:
+            idf = self.idf(term)
+            max_score += idf
+            for key, tf in self._postings.get(term, {}).items():
+                norm = k1 * (1 - b + b * doc_len[key] / avgdl)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(key, min(1.0, score / max_score)) for key, score in top]
+
+
+class DenseIndex:
+    """Index vectoriel pour la recherche par similarité cosinus.
+
+    Les embeddings sont normalisés et stockés dans une matrice float32
+    contiguë : une recherche se résume à un produit matrice-vecteur suivi
+    d'une sélection partielle (argpartition) des k meilleurs scores.
+    """
+
+    def __init__(self):
+        self._keys: List[Hashable] = []
+        self._rows: Dict[Hashable, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def add(self, key: Hashable, vector: Sequence[float]):
+        """Ajoute ou remplace l'embedding d'un document."""
+        array = self._normalize(vector)
+
+        if not self._keys:
+            self._matrix = np.zeros((16, array.shape[0]), dtype=np.float32)
+        elif array.shape[0] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Dimension {array.shape[0]} incompatible avec l'index "
+                f"({self._matrix.shape[1]})"
+            )
+
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == self._matrix.shape[0]:
+                # Croissance géométrique pour amortir les recopies
+                grown = np.zeros(
+                    (row * 2, self._matrix.shape[1]), dtype=np.float32
+                )
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self._keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = array
+
+    def remove(self, key: Hashable):
+        """Retire un document (la dernière ligne prend sa place)."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            last_key = self._keys[last]
+            self._matrix[row] = self._matrix[last]
+            self._keys[row] = last_key
+            self._rows[last_key] = row
+        self._keys.pop()
+
+    def search(
+        self, vector: Sequence[float], limit: int = 5
+    ) -> List[Tuple[Hashable, float]]:
+        """Recherche les documents les plus proches d'un embedding.
+
+        Args:
+            vector: Embedding de la requête
+            limit: Nombre maximum de résultats
+
+        Returns:
+            Liste de tuples (clé, similarité cosinus) triée par score
+            décroissant
+        """
+        size = len(self._keys)
+        if not size or limit <= 0:
+            return []
+
+        scores = self._matrix[:size] @ self._normalize(vector)
+        if limit < size:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(size)
+        top = top[np.argsort(-scores[top])]
+        return [(self._keys[i], float(scores[i])) for i in top]
+
+
+class KnowledgeIndex:
+    """Documents GLPI (tickets, articles KB, FAQ) et leur index de recherche.
+
+    Les documents sont stockés au format des résultats de recherche
+    (source, id, title, content, metadata) et indexés par passages
+    (split_passages). Une recherche retourne au plus un résultat par
+    document, son contenu réduit aux passages trouvés. Les mises à jour
+    (synchronisation GLPI) et les recherches (threads) sont sérialisées
+    par un verrou.
+
+    Args:
+        max_chars: Taille visée d'un passage
+        overlap: Recouvrement entre passages d'une même section
+    """
+
+    # Passages examinés par résultat demandé (plusieurs passages peuvent
+    # venir du même document)
+    CANDIDATES_PER_RESULT = 4
+    # Passages retenus au plus par document trouvé
+    PASSAGES_PER_RESULT = 2
+
+    def __init__(self, max_chars: int = 600, overlap: int = 120):
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self._documents: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        # Document -> (lignes du contenu, plages de lignes des passages)
+        self._passages: Dict[
+            Tuple[str, Any], Tuple[List[str], List[Tuple[int, int]]]
+        ] = {}
+        # Index lexical et dense par passage : clé (source, id, n° de passage)
+        self._lexical = BM25Index()
+        self._dense = DenseIndex()
+        # Textes en attente d'embedding (nouveaux passages ou modifiés)
+        self._pending: Dict[Tuple[str, Any, int], str] = {}
+        self._embed_lock = asyncio.Lock()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def passage_count(self) -> int:
+        """Nombre de passages indexés."""
+        return len(self._lexical)
+
+    def upsert(self, document: Dict[str, Any], text: str):
+        """Ajoute ou remplace un document.
+
+        Args:
+            document: Résultat pré-formaté (source, id, title, content, metadata)
+            text: Texte à indexer pour un document tenant en un passage ;
+                au-delà, chaque passage est indexé avec le titre du document
+                et celui de sa section
+        """
+        key = (document["source"], document["id"])
+        lines = (document.get("content") or "").splitlines()
+        passages = split_passages(
+            document.get("content") or "", self.max_chars, self.overlap
+        )
+
+        with self._lock:
+            self._remove(key)
+            self._documents[key] = document
+            self._passages[key] = (lines, passages)
+            for n, (start, end) in enumerate(passages):
+                passage_text = text if len(passages) == 1 else " ".join([
+                    document.get("title") or "",
+                    self._render(lines, start, end),
+                ])
+                self._lexical.add((*key, n), passage_text)
+                self._pending[(*key, n)] = passage_text
+
+    def remove(self, source: str, doc_id: Any):
+        """Retire un document de l'index."""
+        with self._lock:
+            self._remove((source, doc_id))
+
+    def _remove(self, key: Tuple[str, Any]):
+        self._documents.pop(key, None)
+        _, passages = self._passages.pop(key, (None, ()))
+        for n in range(len(passages)):
+            self._lexical.remove((*key, n))
+            self._dense.remove((*key, n))
+            self._pending.pop((*key, n), None)
+
+    @staticmethod
+    def _render(lines: List[str], start: int, end: int) -> str:
+        """Texte des lignes [start, end), précédé du titre de leur section."""
+        text = "\n".join(line.rstrip() for line in lines[start:end]).strip()
+        if start < len(lines) and not _HEADING_RE.match(lines[start]):
+            for i in range(start - 1, -1, -1):
+                if _HEADING_RE.match(lines[i]):
+                    return f"{lines[i].strip()}\n{text}"
+        return text
+
+    @property
+    def pending_embeddings(self) -> int:
+        """Nombre de passages dont l'embedding reste à calculer."""
+        return len(self._pending)
+
+    async def embed_pending(
+        self,
+        embed: Callable[[str], Awaitable[Sequence[float]]],
+        concurrency: int = 8,
+    ) -> int:
+        """Calcule les embeddings manquants de l'index dense.
+
+        Args:
+            embed: Fonction asynchrone texte -> embedding (ex: llm.get_embedding)
+            concurrency: Nombre maximum d'appels simultanés à embed
+
+        Returns:
+            Nombre de passages embarqués ; ceux dont l'embedding a échoué
+            restent en attente pour un prochain appel
+        """
+        async with self._embed_lock:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def embed_one(key, text):
+                async with semaphore:
+                    return key, text, await embed(text)
+
+            with self._lock:
+                pending = list(self._pending.items())
+            embedded = await asyncio.gather(
+                *(embed_one(key, text) for key, text in pending),
+                return_exceptions=True,
+            )
+
+            count = 0
+            with self._lock:
+                for result in embedded:
+                    if isinstance(result, BaseException):
+                        continue
+                    key, text, vector = result
+                    # Le document a pu être modifié ou supprimé entre-temps
+                    if self._pending.get(key) is text:
+                        self._dense.add(key, vector)
+                        del self._pending[key]
+                        count += 1
+            return count
+
+    def search_passages(
+        self, query: str, limit: int = 20
+    ) -> List[Tuple[Hashable, float]]:
+        """Recherche BM25 des passages : (clé de passage, score)."""
+        with self._lock:
+            return self._lexical.search(query, limit)
+
+    def search_dense_passages(
+        self, vector: Sequence[float], limit: int = 20
+    ) -> List[Tuple[Hashable, float]]:
+        """Recherche sémantique des passages : (clé de passage, cosinus)."""
+        with self._lock:
+            return self._dense.search(vector, limit)
+
+    def collapse(
+        self, hits: Sequence[Tuple[Hashable, float]], limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Regroupe des passages trouvés par document.
+
+        Les documents sont classés selon leur meilleur passage, dont ils
+        reprennent le score. Le contenu est réduit à leurs
+        PASSAGES_PER_RESULT meilleurs passages, dans l'ordre du document ;
+        les passages contigus ou recouvrants sont fusionnés.
+
+        Args:
+            hits: (clé de passage, score) triés par score décroissant
+            limit: Nombre maximum de documents
+
+        Returns:
+            Résultats au format des documents, avec leur score
+        """
+        grouped: Dict[Tuple[str, Any], Tuple[float, List[int]]] = {}
+        for (source, doc_id, n), score in hits:
+            key = (source, doc_id)
+            if key in grouped:
+                if len(grouped[key][1]) < self.PASSAGES_PER_RESULT:
+                    grouped[key][1].append(n)
+            elif len(grouped) < limit:
+                grouped[key] = (score, [n])
+
+        results = []
+        with self._lock:
+            for key, (score, numbers) in grouped.items():
+                document = self._documents.get(key)
+                if document is None:
+                    continue
+                lines, passages = self._passages[key]
+                if len(set(numbers)) < len(passages):
+                    document = {
+                        **document,
+                        "content": self._excerpt(lines, passages, numbers),
+                    }
+                results.append({**document, "score": score})
+        return results
+
+    def _excerpt(
+        self,
+        lines: List[str],
+        passages: List[Tuple[int, int]],
+        numbers: List[int],
+    ) -> str:
+        spans: List[List[int]] = []
+        for start, end in sorted(passages[n] for n in set(numbers)):
+            if spans and start <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return "\n[...]\n".join(
+            self._render(lines, start, end) for start, end in spans
+        )
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Recherche lexicale BM25 sur les documents indexés."""
+        hits = self.search_passages(query, limit * self.CANDIDATES_PER_RESULT)
+        return self.collapse(hits, limit)
+
+
+def fuse_ranks(
+    rankings: Sequence[Tuple[Sequence[Tuple[Hashable, float]], float]],
+    k: int = 60,
+    limit: int = 5,
+) -> List[Tuple[Hashable, float]]:
+    """Fusion RRF de classements de clés : somme(poids / (k + rang)).
+
+    Seul le rang compte, ce qui permet de combiner des scores d'échelles
+    différentes (BM25, cosinus).
+
+    Args:
+        rankings: Liste de tuples ([(clé, score)] triés, poids du classement)
+        k: Constante d'amortissement des rangs
+        limit: Nombre maximum de résultats
+
+    Returns:
+        Liste de tuples (clé, score RRF) triée par score décroissant
+    """
+    fused: Dict[Hashable, float] = {}
+    for hits, weight in rankings:
+        for rank, (key, _) in enumerate(hits, 1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return heapq.nlargest(limit, fused.items(), key=itemgetter(1))
+
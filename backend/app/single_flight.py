@@ -0,0 +1,146 @@
+"""Mutualisation des calculs identiques en cours (single-flight).
+
+Lors d'une panne, de nombreux utilisateurs posent la même question à
+quelques secondes d'intervalle. Le premier appel pour une clé lance le
+calcul (leader) ; les appels identiques qui arrivent pendant qu'il est en
+cours (followers) attendent le même résultat au lieu de relancer
+embedding, recherche et génération. La clé est libérée dès la fin du
+calcul : les appels suivants relèvent des caches habituels.
+
+Le calcul s'exécute dans sa propre tâche : la déconnexion d'un client,
+même du leader, ne l'interrompt pas pour les autres.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List
+
+
+class _Broadcast:
+    """Diffusion d'un flux à plusieurs abonnés, avec rejeu depuis le début."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, source: AsyncIterator[Any]):
+        """Consomme la source et publie chaque élément."""
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        """Éléments déjà publiés, puis les suivants au fil de l'eau."""
+        position = 0
+        while True:
+            changed = self._changed
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """Calculs en cours indexés par clé, partagés entre appels identiques."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _start(
+        self,
+        registry: Dict[Hashable, Any],
+        key: Hashable,
+        task: asyncio.Task,
+        value: Any,
+    ):
+        registry[key] = value
+        self.leaders += 1
+
+        def release(finished: asyncio.Task):
+            if registry.get(key) is value:
+                del registry[key]
+            # Erreur déjà transmise aux appelants (évite l'avertissement
+            # « exception was never retrieved » si tous sont partis)
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(release)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Résultat de func(), partagé avec les appels de même clé en cours.
+
+        Args:
+            key: Identifie les calculs équivalents
+            func: Fabrique de la coroutine à exécuter (appelée par le leader)
+
+        Returns:
+            Résultat du calcul (le même objet pour tous les appelants)
+
+        Raises:
+            Exception: L'erreur du calcul, transmise à tous les appelants
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._start(self._calls, key, task, task)
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    async def stream(
+        self, key: Hashable, func: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """Variante de do() pour un générateur asynchrone.
+
+        Un appelant qui rejoint un flux en cours reçoit d'abord les
+        éléments déjà produits, puis les suivants.
+
+        Args:
+            key: Identifie les flux équivalents
+            func: Fabrique du générateur (appelée par le leader)
+
+        Yields:
+            Éléments du flux partagé
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            task = asyncio.ensure_future(broadcast.pump(func()))
+            self._start(self._streams, key, task, broadcast)
+        else:
+            self.followers += 1
+        async for item in broadcast.subscribe():
+            yield item
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Indique si un calcul (ou flux) de cette clé est en cours."""
+        return key in self._calls or key in self._streams
+
+    def stats(self) -> Dict:
+        """Calculs lancés, appels mutualisés et calculs en cours."""
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalesced_rate": self.followers / total if total else 0.0,
+        }
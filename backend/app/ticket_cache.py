@@ -0,0 +1,153 @@
+"""Cache des détails de tickets GLPI, revalidé sur date_mod.
+
+Une entrée récente (moins de `ttl` secondes) est servie telle quelle.
+Au-delà, on relit uniquement le ticket (une requête au lieu de trois) :
+si son date_mod n'a pas bougé — GLPI le met à jour à chaque suivi ou
+solution ajouté — l'entrée est prolongée, sinon les détails sont
+rechargés. Si GLPI ne répond pas (revalidation ou rechargement), l'entrée
+périmée est servie tant qu'elle a moins de `max_stale` secondes.
+
+Les détails ne sont mis en cache que complets : `fetch` doit lever une
+exception plutôt que de renvoyer un résultat partiel.
+"""
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class TicketCache:
+    """Détails de tickets indexés par id, bornés en taille et en âge."""
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 30.0, max_stale: float = 3600.0):
+        self.ttl = ttl
+        # Entrée : {"details": ..., "checked_at": dernier contrôle GLPI}
+        self._entries = LRUCache(maxsize=maxsize, ttl=max_stale)
+        self._lock = threading.Lock()
+        # Ticket -> nombre d'invalidations : un chargement commencé avant
+        # une invalidation ne doit pas remettre en cache l'état antérieur
+        self._generations: Dict[int, int] = {}
+
+        self.hits = 0
+        self.revalidated = 0
+        self.refreshed = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.invalidations = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(
+        self,
+        ticket_id: int,
+        fetch: Callable[[int], Awaitable[Optional[Dict]]],
+        fetch_date_mod: Callable[[int], Awaitable[Optional[str]]],
+    ) -> Optional[Dict]:
+        """Détails du ticket, depuis le cache ou GLPI.
+
+        Args:
+            ticket_id: Id du ticket
+            fetch: Récupération complète des détails (None si introuvable) ;
+                lève une exception si une partie n'a pu être lue
+            fetch_date_mod: Lecture du seul date_mod du ticket ; lève une
+                exception si GLPI est injoignable
+
+        Returns:
+            Détails du ticket, ou None s'il est introuvable
+
+        Raises:
+            Exception: L'erreur de fetch si le ticket n'est pas en cache
+        """
+        # Capturée avant tout accès GLPI : voir _store
+        generation = self._generation(ticket_id)
+        entry = self._entries.get(ticket_id)
+        if entry is None:
+            self._count("misses")
+            return await self._load(ticket_id, fetch, generation)
+
+        if time.monotonic() - entry["checked_at"] < self.ttl:
+            self._count("hits")
+            return entry["details"]
+
+        try:
+            date_mod = await fetch_date_mod(ticket_id)
+        except Exception as e:
+            return self._serve_stale(ticket_id, entry, e)
+
+        if date_mod is not None and date_mod == entry["details"].get("date_mod"):
+            self._count("revalidated")
+            self._store(ticket_id, generation, {**entry, "checked_at": time.monotonic()})
+            return entry["details"]
+
+        self._count("refreshed")
+        try:
+            return await self._load(ticket_id, fetch, generation)
+        except Exception as e:
+            return self._serve_stale(ticket_id, entry, e)
+
+    def _serve_stale(self, ticket_id: int, entry: Dict, error: Exception) -> Dict:
+        logger.warning(
+            f"⚠️ Ticket #{ticket_id} non revalidé, copie en cache servie: {error}"
+        )
+        self._count("stale_served")
+        return entry["details"]
+
+    def _generation(self, ticket_id: int) -> int:
+        with self._lock:
+            return self._generations.get(ticket_id, 0)
+
+    def _store(self, ticket_id: int, generation: int, entry: Optional[Dict]):
+        """Met à jour l'entrée (None : la retire), sauf invalidation depuis
+        `generation` : la lecture a pu précéder la modification du ticket."""
+        with self._lock:
+            if self._generations.get(ticket_id, 0) != generation:
+                return
+            if entry is None:
+                self._entries.pop(ticket_id)
+            else:
+                self._entries.set(ticket_id, entry)
+
+    async def _load(
+        self,
+        ticket_id: int,
+        fetch: Callable[[int], Awaitable[Optional[Dict]]],
+        generation: int,
+    ) -> Optional[Dict]:
+        details = await fetch(ticket_id)
+        self._store(
+            ticket_id,
+            generation,
+            None if details is None
+            else {"details": details, "checked_at": time.monotonic()},
+        )
+        return details
+
+    def invalidate(self, ticket_id: int):
+        """Oublie un ticket (créé ou modifié par nos soins)."""
+        with self._lock:
+            self._generations[ticket_id] = self._generations.get(ticket_id, 0) + 1
+            self._entries.pop(ticket_id)
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Taille et compteurs du cache."""
+        with self._lock:
+            served = self.hits + self.revalidated + self.stale_served
+            lookups = served + self.refreshed + self.misses
+            return {
+                "size": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "refreshed": self.refreshed,
+                "misses": self.misses,
+                "stale_served": self.stale_served,
+                "invalidations": self.invalidations,
+                "hit_rate": served / lookups if lookups else 0.0,
+            }
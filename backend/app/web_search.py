@@ -0,0 +1,212 @@
+"""Recherche web (API Ollama Web Search) avec cache des résultats.
+
+Un seul client httpx (pool keep-alive) sert toutes les recherches. Les
+résultats sont mis en cache par requête normalisée (casse, espaces,
+Unicode) : en mémoire, et optionnellement sur disque pour survivre aux
+redémarrages et être partagés entre workers. Une entrée plus ancienne
+que `max_age` secondes est ignorée.
+
+L'URL de l'API est configurable (WEB_SEARCH_URL) : les tests pointent
+sur un serveur HTTP local.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .cache import DiskStore, LRUCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Forme canonique d'une requête : NFKC, minuscules, espaces réduits."""
+    query = unicodedata.normalize("NFKC", query)
+    return _SPACES_RE.sub(" ", query).strip().lower()
+
+
+class WebSearchCache:
+    """Résultats de recherche web en mémoire (TTL) et sur disque (max_age)."""
+
+    def __init__(self, maxsize: int, max_age: float, path: Optional[str] = None):
+        self.max_age = max_age
+        self.memory = LRUCache(maxsize=maxsize, ttl=max_age)
+        self.disk = DiskStore(path, table="web_search") if path else None
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        """Empreinte de la requête normalisée et du nombre de résultats."""
+        canonical = f"{normalize_query(query)}\0{max_results}"
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Retourne les résultats en cache, ou None."""
+        key = self.make_key(query, max_results)
+
+        results = self.memory.get(key)
+        if results is not None:
+            return results
+
+        if self.disk is not None:
+            try:
+                blob = self.disk.get(key, max_age=self.max_age)
+            except Exception as e:
+                logger.warning(f"⚠️ Cache recherche web disque illisible: {e}")
+                blob = None
+            if blob is not None:
+                results = json.loads(blob)
+                self.memory.set(key, results)
+                with self._lock:
+                    self.disk_hits += 1
+                return results
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, query: str, max_results: int, results: List[Dict[str, Any]]):
+        """Enregistre des résultats dans les deux niveaux."""
+        key = self.make_key(query, max_results)
+        self.memory.set(key, results)
+
+        if self.disk is not None:
+            try:
+                self.disk.set(key, json.dumps(results).encode("utf-8"))
+            except Exception as e:
+                logger.warning(f"⚠️ Cache recherche web disque non écrit: {e}")
+
+    def stats(self) -> Dict:
+        """Taille et taux de succès de chaque niveau."""
+        memory = self.memory.stats()
+        with self._lock:
+            lookups = memory["hits"] + self.disk_hits + self.misses
+            return {
+                "memory_size": memory["size"],
+                "max_age_s": self.max_age,
+                "memory_hits": memory["hits"],
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (memory["hits"] + self.disk_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+
+class WebSearchClient:
+    """Client de l'API de recherche web, partagé et mis en cache.
+
+    Args:
+        url: Point d'accès POST {"query", "max_results"} -> {"results": [...]}
+        api_key: Clé API (Bearer) ; sans clé, la recherche est désactivée
+        cache: Cache des résultats (None : pas de cache)
+        timeout: Délai maximal d'une recherche (s)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str],
+        cache: Optional[WebSearchCache] = None,
+        timeout: float = 10.0,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.cache = cache
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client HTTP partagé (pool de connexions keep-alive)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._client
+
+    async def aclose(self):
+        """Ferme le pool de connexions HTTP."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+        """Recherche sur le web.
+
+        Args:
+            query: Requête de recherche
+            max_results: Nombre maximum de résultats
+
+        Returns:
+            Résultats bruts (title, url, content) ; liste vide si la
+            recherche est désactivée ou en erreur (non mise en cache)
+        """
+        if not self.api_key:
+            logger.info("[Web Search] OLLAMA_API_KEY non configurée - recherche web désactivée")
+            return []
+
+        if self.cache is not None:
+            # Le cache peut lire le disque (SQLite) : hors de la boucle d'évènements
+            cached = await asyncio.to_thread(self.cache.get, query, max_results)
+            if cached is not None:
+                return cached
+
+        self.requests += 1
+        try:
+            r = await self.client.post(
+                self.url, json={"query": query, "max_results": max_results}
+            )
+            r.raise_for_status()
+            results = [
+                {
+                    "title": item.get("title") or "Sans titre",
+                    "url": item.get("url") or "",
+                    "content": item.get("content") or "",
+                }
+                for item in r.json().get("results") or []
+            ]
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"[Web Search] Erreur lors de la recherche web: {e}")
+            return []
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, query, max_results, results)
+        return results
+
+    def stats(self) -> Dict:
+        """Requêtes émises, erreurs et état du cache."""
+        return {
+            "enabled": bool(self.api_key),
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+web_search = WebSearchClient(
+    url=settings.WEB_SEARCH_URL,
+    api_key=settings.OLLAMA_API_KEY,
+    cache=WebSearchCache(
+        maxsize=settings.WEB_SEARCH_CACHE_SIZE,
+        max_age=settings.WEB_SEARCH_CACHE_MAX_AGE,
+        path=settings.WEB_SEARCH_CACHE_PATH or None,
+    ),
+    timeout=settings.WEB_SEARCH_TIMEOUT,
+)
@@ -0,0 +1,240 @@
+"""Tests pour ADService contre un annuaire LDAP en mémoire (ldap3 MOCK_SYNC)."""
+import pytest
+from ldap3 import MOCK_SYNC, OFFLINE_AD_2012_R2, Connection, Server
+
+from app import glpi_service as glpi_module
+from app.glpi_service import ADService
+from app.ldap_pool import LDAPConnectionPool, LDAPPoolTimeout
+
+BASE_DN = "DC=M2DATA,DC=LOCAL"
+SERVICE_DN = f"CN=svc,{BASE_DN}"
+
+
+@pytest.fixture
+def server():
+    """Annuaire en mémoire avec un compte de service et un utilisateur."""
+    server = Server("ad-test", get_info=OFFLINE_AD_2012_R2)
+    setup = Connection(server, client_strategy=MOCK_SYNC)
+    setup.strategy.add_entry(SERVICE_DN, {"userPassword": "secret", "sAMAccountName": "svc"})
+    setup.strategy.add_entry(f"CN=Jean Dupont,{BASE_DN}", {
+        "sAMAccountName": "jean.dupont",
+        "displayName": "Jean Dupont",
+        "mail": "jean.dupont@univ-corse.fr",
+        "department": "DSIN",
+        "objectClass": "user",
+    })
+    for i in range(1, 4):
+        setup.strategy.add_entry(f"CN=Agent {i},{BASE_DN}", {
+            "sAMAccountName": f"agent{i}",
+            "displayName": f"Agent {i}",
+            "objectClass": "user",
+        })
+    return server
+
+
+@pytest.fixture
+def ad(server, monkeypatch):
+    monkeypatch.setattr(glpi_module, "AD_USER", SERVICE_DN)
+    monkeypatch.setattr(glpi_module, "AD_PASSWORD", "secret")
+    monkeypatch.setattr(glpi_module, "AD_BASE_DN", BASE_DN)
+    return ADService(server=server, client_strategy=MOCK_SYNC)
+
+
+class TestADService:
+    """Tests des recherches utilisateur."""
+
+    def test_pool_created_on_first_search(self, ad):
+        """Test qu'aucune connexion n'est préparée avant la première recherche."""
+        assert ad.stats()["pool"] is None
+        ad.get_user_info("jean.dupont")
+        assert ad.stats()["pool"]["created"] == 1
+
+    def test_user_found(self, ad):
+        """Test la lecture des attributs d'un utilisateur."""
+        user = ad.get_user_info("jean.dupont")
+        assert user["displayName"] == "Jean Dupont"
+        assert user["mail"] == "jean.dupont@univ-corse.fr"
+        assert user["department"] == "DSIN"
+
+    def test_connection_reused(self, ad):
+        """Test qu'une seule connexion liée sert plusieurs recherches."""
+        ad.get_user_info("jean.dupont")
+        ad.invalidate("jean.dupont")
+        ad.get_user_info("jean.dupont")
+        stats = ad.stats()["pool"]
+        assert stats["created"] == 1
+        assert stats["reused"] == 1
+
+    def test_user_cached(self, ad):
+        """Test que la fiche est servie depuis le cache."""
+        ad.get_user_info("jean.dupont")
+        user = ad.get_user_info("jean.dupont")
+        assert user["displayName"] == "Jean Dupont"
+        assert ad.stats()["cache"]["hits"] == 1
+        assert ad.stats()["pool"]["reused"] == 0
+
+    def test_unknown_user_negative_cache(self, ad):
+        """Test qu'un login inconnu n'est recherché qu'une fois."""
+        assert ad.get_user_info("inconnu") is None
+        assert ad.get_user_info("inconnu") is None
+        assert ad.stats()["negative_cache"]["hits"] == 1
+        assert ad.stats()["pool"]["reused"] == 0
+
+
+@pytest.fixture
+def failing_searches(monkeypatch):
+    """Fait échouer les n prochaines recherches (serveur occupé)."""
+    remaining = [0]
+    search = Connection.search
+
+    def flaky_search(conn, *args, **kwargs):
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            conn.result = {
+                "result": 51, "description": "busy", "message": "", "controls": {}
+            }
+            return False
+        return search(conn, *args, **kwargs)
+
+    monkeypatch.setattr(Connection, "search", flaky_search)
+    return remaining
+
+
+class TestSearchErrors:
+    """Tests de la distinction entre « introuvable » et « recherche en échec »."""
+
+    def test_failed_search_retried(self, ad, failing_searches):
+        """Test qu'une recherche en échec est rejouée sur une autre connexion."""
+        failing_searches[0] = 1
+        assert ad.get_user_info("jean.dupont")["displayName"] == "Jean Dupont"
+        assert ad.stats()["pool"]["retries"] == 1
+
+    def test_failed_search_not_negative_cached(self, ad, failing_searches):
+        """Test qu'un échec persistant ne marque pas le login inconnu."""
+        failing_searches[0] = 2
+        assert ad.get_user_info("jean.dupont") is None
+        assert ad.get_user_info("jean.dupont")["displayName"] == "Jean Dupont"
+        assert ad.stats()["negative_cache"]["size"] == 0
+
+    def test_bulk_failed_search_not_negative_cached(self, ad, failing_searches):
+        """Test qu'un lot en échec ne marque aucun de ses logins inconnu."""
+        failing_searches[0] = 2
+        assert ad.get_users_info(["agent1", "agent2"]) == {
+            "agent1": None, "agent2": None
+        }
+        users = ad.get_users_info(["agent1", "agent2"])
+        assert users["agent1"]["displayName"] == "Agent 1"
+        assert ad.stats()["negative_cache"]["size"] == 0
+
+    def test_missing_base_dn_is_not_found(self, ad):
+        """Test qu'une base absente (noSuchObject) vaut « introuvable »."""
+        ad.base_dn = "OU=Absente,DC=M2DATA,DC=LOCAL"
+        assert ad.get_user_info("jean.dupont") is None
+        assert ad.stats()["negative_cache"]["size"] == 1
+
+
+class TestBulkLookup:
+    """Tests de la recherche groupée."""
+
+    def _count_searches(self, ad, monkeypatch):
+        filters = []
+        search_paged = ad._search_paged
+
+        def spy(conn, search_filter):
+            filters.append(search_filter)
+            return search_paged(conn, search_filter)
+
+        monkeypatch.setattr(ad, "_search_paged", spy)
+        return filters
+
+    def test_single_search_per_chunk(self, ad, monkeypatch):
+        """Test qu'un lot de logins est résolu en une seule recherche."""
+        filters = self._count_searches(ad, monkeypatch)
+        users = ad.get_users_info(["agent1", "agent2", "jean.dupont", "inconnu"])
+
+        assert len(filters) == 1
+        assert filters[0].startswith("(|(sAMAccountName=agent1)")
+        assert users["agent2"]["displayName"] == "Agent 2"
+        assert users["jean.dupont"]["mail"] == "jean.dupont@univ-corse.fr"
+        assert users["inconnu"] is None
+
+    def test_chunked(self, ad, monkeypatch):
+        """Test le découpage en lots de chunk_size logins."""
+        filters = self._count_searches(ad, monkeypatch)
+        users = ad.get_users_info(
+            ["agent1", "agent2", "agent3", "jean.dupont", "agent1"], chunk_size=2
+        )
+        assert len(filters) == 2
+        assert all(users.values())
+
+    def test_uses_cache(self, ad, monkeypatch):
+        """Test que seuls les logins absents du cache sont recherchés."""
+        ad.get_user_info("jean.dupont")
+        ad.get_user_info("inconnu")
+        filters = self._count_searches(ad, monkeypatch)
+
+        users = ad.get_users_info(["jean.dupont", "inconnu", "agent1"])
+        assert filters == ["(|(sAMAccountName=agent1))"]
+        assert users["jean.dupont"]["displayName"] == "Jean Dupont"
+        assert users["inconnu"] is None
+
+    def test_case_insensitive_match(self, ad):
+        """Test qu'un login en majuscules est rattaché à son entrée."""
+        users = ad.get_users_info(["AGENT3"])
+        assert users["AGENT3"]["displayName"] == "Agent 3"
+
+    def test_filter_values_escaped(self, ad):
+        """Test qu'un login ne peut pas injecter de filtre LDAP."""
+        assert ad.get_user_info("*") is None
+        assert ad.get_users_info(["jean*", "x)(sAMAccountName=*"]) == {
+            "jean*": None,
+            "x)(sAMAccountName=*": None,
+        }
+
+
+class TestLDAPConnectionPool:
+    """Tests du pool de connexions."""
+
+    def _pool(self, server, **kwargs):
+        return LDAPConnectionPool(
+            server, SERVICE_DN, "secret", client_strategy=MOCK_SYNC, **kwargs
+        )
+
+    def test_broken_connection_replaced(self, server):
+        """Test qu'une connexion fermée est remplacée par une connexion liée."""
+        pool = self._pool(server)
+        with pool.connection() as conn:
+            pass
+        conn.unbind()
+
+        with pool.connection() as replacement:
+            assert replacement is not conn
+            assert replacement.bound
+        assert pool.stats()["rebinds"] == 1
+
+    def test_idle_connection_checked(self, server):
+        """Test la vérification d'une connexion inactive."""
+        pool = self._pool(server, check_after=0)
+        with pool.connection() as conn:
+            pass
+        with pool.connection() as again:
+            assert again is conn
+        assert pool.stats()["health_check_failures"] == 0
+
+    def test_bounded(self, server):
+        """Test que le pool ne dépasse pas sa taille."""
+        pool = self._pool(server, size=1, timeout=0.05)
+        with pool.connection():
+            with pytest.raises(LDAPPoolTimeout):
+                with pool.connection():
+                    pass
+        assert pool.stats()["open"] == 1
+
+    def test_close(self, server):
+        """Test la fermeture des connexions libres."""
+        pool = self._pool(server)
+        with pool.connection() as conn:
+            pass
+        pool.close()
+        assert conn.closed
+        assert pool.stats()["open"] == 0
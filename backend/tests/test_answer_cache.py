@@ -0,0 +1,105 @@
+"""Tests pour le cache sémantique des réponses (SQLite en mémoire)."""
+import json
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.answer_cache import AnswerCache
+from app.models import Question, Reponse
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _add_answer(session, embedding, label, validite):
+    question = Question(
+        user_ad_id=1,
+        question_label=label,
+        embedding_question=json.dumps(embedding),
+    )
+    session.add(question)
+    session.commit()
+    reponse = Reponse(
+        reponse_label=f"Réponse {label}",
+        question_id=question.id,
+        validite=validite,
+        technicien_id=2,
+    )
+    session.add(reponse)
+    session.commit()
+    return reponse
+
+
+class TestAnswerCache:
+    """Tests de la recherche de réponses validées."""
+
+    def test_hit_on_similar_validated_answer(self, session):
+        """Test qu'une question proche réutilise la réponse validée."""
+        _add_answer(session, [1.0, 0.0, 0.0], "VPN", validite=1)
+        cache = AnswerCache(max_distance=0.05)
+
+        reponse = cache.lookup(session, [0.99, 0.05, 0.0])
+        assert reponse is not None
+        assert reponse.reponse_label == "Réponse VPN"
+        assert reponse.technicien_id == 2
+        assert cache.hits == 1
+
+    def test_miss_when_too_far(self, session):
+        """Test qu'une question différente ne déclenche pas le cache."""
+        _add_answer(session, [1.0, 0.0, 0.0], "VPN", validite=1)
+        cache = AnswerCache(max_distance=0.05)
+
+        assert cache.lookup(session, [0.0, 1.0, 0.0]) is None
+        assert cache.misses == 1
+
+    def test_ignores_unvalidated_answers(self, session):
+        """Test que seules les réponses validées sont réutilisées."""
+        _add_answer(session, [1.0, 0.0, 0.0], "neutre", validite=0)
+        _add_answer(session, [1.0, 0.0, 0.0], "invalide", validite=-1)
+        cache = AnswerCache(max_distance=0.05)
+
+        assert cache.lookup(session, [1.0, 0.0, 0.0]) is None
+
+    def test_hit_despite_many_unvalidated_duplicates(self, session):
+        """Test que les copies non validées d'une question ne masquent pas sa réponse validée."""
+        _add_answer(session, [1.0, 0.0, 0.0], "VPN", validite=1)
+        for i in range(60):
+            _add_answer(session, [1.0, 0.0, 0.0], f"VPN {i}", validite=0)
+        cache = AnswerCache(max_distance=0.05)
+
+        reponse = cache.lookup(session, [1.0, 0.0, 0.0])
+        assert reponse is not None
+        assert reponse.reponse_label == "Réponse VPN"
+
+    def test_returns_closest_answer(self, session):
+        """Test que la réponse la plus proche est choisie."""
+        _add_answer(session, [1.0, 0.1, 0.0], "proche", validite=1)
+        _add_answer(session, [1.0, 0.0, 0.0], "exacte", validite=1)
+        cache = AnswerCache(max_distance=0.05)
+
+        reponse = cache.lookup(session, [1.0, 0.0, 0.0])
+        assert reponse.reponse_label == "Réponse exacte"
+
+    def test_stats(self, session):
+        """Test les compteurs du cache."""
+        _add_answer(session, [1.0, 0.0], "VPN", validite=1)
+        cache = AnswerCache(max_distance=0.05)
+        cache.lookup(session, [1.0, 0.0])
+        cache.lookup(session, [0.0, 1.0])
+        cache.record_bypass()
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["bypassed"] == 1
+        assert stats["hit_rate"] == 0.5
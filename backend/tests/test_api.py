@@ -107,6 +107,23 @@ class TestAskEndpoint:
         assert response.status_code in [422, 500, 200]
 
 
+class TestAskStreamEndpoint:
+    """Tests de l'endpoint /ask/stream"""
+
+    def test_ask_stream_missing_fields(self):
+        response = client.post("/ask/stream", json={"user_ad_id": 1})
+        assert response.status_code == 422
+
+    def test_ask_stream_returns_event_stream(self):
+        """Test que la réponse est un flux SSE (erreur si Ollama absent)"""
+        response = client.post(
+            "/ask/stream", json={"user_ad_id": 1, "question": "VPN"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: done" in response.text or "event: error" in response.text
+
+
 class TestFeedbackEndpoint:
     """Tests de l'endpoint /feedback/"""
 
@@ -133,3 +150,48 @@ class TestFeedbackEndpoint:
         )
         # Devrait retourner 404 pour réponse non trouvée
         assert response.status_code in [404, 500]
+
+
+class TestMetricsEndpoint:
+    """Tests de l'endpoint /api/metrics"""
+
+    def test_metrics_answer_cache(self):
+        """Test la présence des compteurs du cache sémantique"""
+        response = client.get("/api/metrics")
+        assert response.status_code == 200
+        data = response.json()
+        assert "answer_cache" in data
+        assert "hits" in data["answer_cache"]
+
+
+class TestReadinessEndpoint:
+    """Tests de l'endpoint /api/ready"""
+
+    def test_not_ready_without_ollama(self):
+        """Test que le service n'est pas prêt tant que les modèles ne sont pas chargés"""
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+
+class TestInfrastructureEndpoints:
+    """Tests de validation des endpoints infrastructure"""
+
+    def test_tickets_details_requires_ids(self):
+        response = client.post(
+            "/api/infrastructure/tickets/details", json={"ticket_ids": []}
+        )
+        assert response.status_code == 422
+
+    def test_tickets_details_limit(self):
+        response = client.post(
+            "/api/infrastructure/tickets/details",
+            json={"ticket_ids": list(range(201))},
+        )
+        assert response.status_code == 422
+
+    def test_users_info_requires_usernames(self):
+        response = client.post(
+            "/api/infrastructure/users_info", json={"usernames": []}
+        )
+        assert response.status_code == 422
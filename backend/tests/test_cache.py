@@ -0,0 +1,115 @@
+"""Tests pour les caches (LRU mémoire, stockage disque, embeddings)."""
+import pytest
+from app.cache import DiskStore, LRUCache
+from app.embedding_cache import EmbeddingCache
+
+
+class TestLRUCache:
+    """Tests du cache LRU en mémoire."""
+
+    def test_get_set(self):
+        """Test lecture/écriture simple."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test l'éviction de l'entrée la moins récemment utilisée."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert len(cache) == 2
+
+    def test_ttl_expires_entries(self, monkeypatch):
+        """Test qu'une entrée plus ancienne que le TTL est ignorée."""
+        now = [100.0]
+        monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+        cache = LRUCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        now[0] += 5
+        assert cache.get("a") == 1
+        now[0] += 6
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_stats(self):
+        """Test les compteurs de succès."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class TestDiskStore:
+    """Tests du stockage SQLite."""
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test que les valeurs survivent à la réouverture."""
+        path = str(tmp_path / "store.db")
+        store = DiskStore(path)
+        store.set("k", b"valeur")
+        store.close()
+
+        assert DiskStore(path).get("k") == b"valeur"
+
+    def test_max_age(self, tmp_path):
+        """Test qu'une valeur trop ancienne est ignorée."""
+        store = DiskStore(str(tmp_path / "store.db"))
+        store.set("k", b"v")
+        assert store.get("k", max_age=60) == b"v"
+        assert store.get("k", max_age=-1) is None
+
+    def test_delete_and_len(self, tmp_path):
+        """Test suppression et comptage."""
+        store = DiskStore(str(tmp_path / "store.db"))
+        store.set("a", b"1")
+        store.set("b", b"2")
+        store.delete("a")
+        assert len(store) == 1
+        assert store.get("a") is None
+
+
+class TestEmbeddingCache:
+    """Tests du cache d'embeddings à deux niveaux."""
+
+    def test_memory_hit(self, tmp_path):
+        """Test qu'un embedding enregistré est retrouvé."""
+        cache = EmbeddingCache(maxsize=4, path=str(tmp_path / "emb.db"))
+        cache.set("nomic", "VPN", [0.5, 0.25])
+        assert cache.get("nomic", "VPN") == [0.5, 0.25]
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_disk_hit_after_restart(self, tmp_path):
+        """Test que le niveau disque survit à un redémarrage."""
+        path = str(tmp_path / "emb.db")
+        EmbeddingCache(maxsize=4, path=path).set("nomic", "VPN", [0.5, 0.25])
+
+        cache = EmbeddingCache(maxsize=4, path=path)
+        assert cache.get("nomic", "VPN") == pytest.approx([0.5, 0.25])
+        assert cache.stats()["disk_hits"] == 1
+        # Promu en mémoire
+        cache.get("nomic", "VPN")
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_keyed_by_model(self, tmp_path):
+        """Test qu'un changement de modèle invalide les entrées."""
+        cache = EmbeddingCache(maxsize=4, path=str(tmp_path / "emb.db"))
+        cache.set("nomic", "VPN", [1.0])
+        assert cache.get("autre-modele", "VPN") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_memory_only(self):
+        """Test le fonctionnement sans niveau disque."""
+        cache = EmbeddingCache(maxsize=4, path=None)
+        cache.set("nomic", "VPN", [1.0])
+        assert cache.get("nomic", "VPN") == [1.0]
+        assert cache.stats()["disk_size"] is None
@@ -0,0 +1,160 @@
+"""Tests pour le classement des questions par catégorie de technicien."""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import category_classifier as classifier_module
+from app.category_classifier import CategoryClassifier, load_validated_examples
+from app.models import Question, Reponse, Technicien
+
+CATEGORIES = {
+    "Réseau": "wifi, VPN",
+    "Copieurs": "imprimantes",
+    "Exchange": "messagerie",
+}
+VECTORS = {
+    "Réseau: wifi, VPN": [1.0, 0.0, 0.0],
+    "Copieurs: imprimantes": [0.0, 1.0, 0.0],
+    "Exchange: messagerie": [0.0, 0.0, 1.0],
+}
+
+
+async def _embed(text):
+    return VECTORS[text]
+
+
+def _classify(classifier, embedding):
+    async def run():
+        if not classifier.stats()["built"]:
+            await classifier.build()
+        return await classifier.classify(embedding)
+
+    return asyncio.run(run())
+
+
+class TestCategoryClassifier:
+    """Tests du plus proche centroïde."""
+
+    def test_nearest_description(self):
+        classifier = CategoryClassifier(CATEGORIES, _embed, min_score=0.5)
+        category, score = _classify(classifier, [0.1, 0.9, 0.0])
+        assert category == "Copieurs"
+        assert score == pytest.approx(0.994, abs=1e-3)
+
+    def test_below_min_score_unclassified(self):
+        """Test qu'une question équidistante n'est pas classée."""
+        classifier = CategoryClassifier(CATEGORIES, _embed, min_score=0.8)
+        category, _ = _classify(classifier, [1.0, 1.0, 1.0])
+        assert category is None
+        assert classifier.stats()["unclassified"] == 1
+
+    def test_history_moves_centroid(self):
+        """Test que les questions validées déplacent le centroïde."""
+        async def history():
+            # Questions « Outlook » validées comme relevant de Réseau
+            return [("Réseau", [0.0, 0.2, 1.0])] * 3 + [("Inconnue", [1.0, 0.0, 0.0])]
+
+        question = [0.3, 0.0, 0.7]
+        plain = CategoryClassifier(CATEGORIES, _embed, min_score=0.0)
+        assert _classify(plain, question)[0] == "Exchange"
+
+        trained = CategoryClassifier(
+            CATEGORIES, _embed, load_history=history, min_score=0.0
+        )
+        assert _classify(trained, question)[0] == "Réseau"
+        assert trained.stats()["examples"] == {"Réseau": 3, "Copieurs": 0, "Exchange": 0}
+
+    def test_not_built_unclassified(self):
+        """Test qu'aucun calcul n'a lieu pendant le classement."""
+        classifier = CategoryClassifier(CATEGORIES, _embed)
+        assert asyncio.run(classifier.classify([1.0, 0.0, 0.0])) == (None, 0.0)
+        assert classifier.stats()["builds"] == 0
+
+    def test_background_build_and_refresh(self):
+        """Test le calcul en tâche de fond, ses reprises et son rafraîchissement."""
+        calls = []
+
+        async def embed(text):
+            calls.append(text)
+            if len(calls) == 1:
+                raise ConnectionError("ollama")
+            return VECTORS[text]
+
+        classifier = CategoryClassifier(
+            CATEGORIES, embed, refresh_interval=3600, retry_interval=0.01
+        )
+
+        async def run():
+            classifier.start()
+            while not classifier.stats()["built"]:
+                await asyncio.sleep(0.01)
+            built = await classifier.classify([1.0, 0.0, 0.0])
+            classifier.invalidate()
+            while classifier.stats()["builds"] < 2:
+                await asyncio.sleep(0.01)
+            await classifier.stop()
+            return built
+
+        assert asyncio.run(run())[0] == "Réseau"
+        stats = classifier.stats()
+        assert (stats["builds"], stats["build_errors"]) == (2, 1)
+
+    def test_old_centroids_served_during_rebuild(self):
+        """Test que les centroïdes précédents restent utilisés pendant un calcul."""
+        release = None
+
+        async def slow_history():
+            await release.wait()
+            return []
+
+        classifier = CategoryClassifier(CATEGORIES, _embed, load_history=slow_history)
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            release.set()
+            await classifier.build()
+            release.clear()
+            rebuild = asyncio.ensure_future(classifier.build())
+            await asyncio.sleep(0.01)
+            during = await classifier.classify([0.0, 1.0, 0.0])
+            release.set()
+            await rebuild
+            return during
+
+        assert asyncio.run(run())[0] == "Copieurs"
+
+
+class TestLoadValidatedExamples:
+    """Tests de la lecture de l'historique."""
+
+    def test_only_validated_with_technicien(self, monkeypatch):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(engine)
+        monkeypatch.setattr(classifier_module, "engine", engine)
+
+        with Session(engine) as session:
+            technicien = Technicien(nom="Réseau", email="reseau@univ-corse.fr")
+            session.add(technicien)
+            session.flush()
+            for validite, technicien_id in [(1, technicien.id), (0, technicien.id), (1, None)]:
+                question = Question(
+                    user_ad_id=1, question_label="VPN",
+                    embedding_question=json.dumps([1.0, 0.0]),
+                )
+                session.add(question)
+                session.flush()
+                session.add(Reponse(
+                    reponse_label="ok", validite=validite,
+                    question_id=question.id, technicien_id=technicien_id,
+                ))
+            session.commit()
+
+        assert asyncio.run(load_validated_examples()) == [("Réseau", [1.0, 0.0])]
@@ -0,0 +1,84 @@
+"""Tests pour l'assemblage du contexte RAG."""
+from app.context_packer import (
+    estimate_tokens,
+    normalize_whitespace,
+    pack_context,
+    truncate_to_tokens,
+)
+
+
+def _render(number, result):
+    return f"[Source {number}]\n{result['title']}\n{result['content']}"
+
+
+def _source(doc_id, title, content):
+    return {"source": "kb_article", "id": doc_id, "title": title,
+            "content": content, "metadata": {}}
+
+
+class TestNormalizeWhitespace:
+    """Tests de la réduction des blancs."""
+
+    def test_indentation_and_blank_lines(self):
+        text = """
+                 Redémarrer   le poste.
+
+
+                 Puis\tréessayer.
+                """
+        assert normalize_whitespace(text) == "Redémarrer le poste.\n\nPuis réessayer."
+
+
+class TestTruncate:
+    """Tests de la troncature."""
+
+    def test_short_text_unchanged(self):
+        assert truncate_to_tokens("Redémarrer", 10) == "Redémarrer"
+
+    def test_cut_on_word(self):
+        text = " ".join(["imprimante"] * 50)
+        cut = truncate_to_tokens(text, 20)
+        assert cut.endswith("imprimante …")
+        assert estimate_tokens(cut) <= 20
+
+
+class TestPackContext:
+    """Tests de la sélection des sources."""
+
+    def test_keeps_order_and_normalizes(self):
+        results = [_source(1, "VPN", "  Cisco   AnyConnect"),
+                   _source(2, "Wifi", "Réseau eduroam")]
+        blocks, packed = pack_context(results, budget=500, render=_render)
+        assert [r["id"] for r in packed] == [1, 2]
+        assert blocks[0] == "[Source 1]\nVPN\nCisco AnyConnect"
+        assert results[0]["content"] == "  Cisco   AnyConnect"
+
+    def test_near_duplicates_dropped(self):
+        """Test qu'une source quasi identique à une précédente est écartée."""
+        content = "Installer Cisco AnyConnect puis se connecter à vpn.univ.fr"
+        results = [
+            _source(1, "VPN", content),
+            _source(2, "VPN", content + " !"),
+            _source(3, "Wifi", "Réseau eduroam"),
+        ]
+        blocks, packed = pack_context(results, budget=500, render=_render)
+        assert [r["id"] for r in packed] == [1, 3]
+        assert blocks[1].startswith("[Source 2]")
+
+    def test_budget_respected(self):
+        """Test le remplissage du budget et la troncature de la dernière source."""
+        results = [_source(i, f"Article {i}", "mot " * 200) for i in range(3)]
+        results = [{**r, "content": r["content"] + f"variante{r['id']}"} for r in results]
+        blocks, packed = pack_context(
+            results, budget=300, render=_render, duplicate_threshold=1.1
+        )
+        assert sum(estimate_tokens(block) for block in blocks) <= 300
+        assert len(packed) == 2
+        assert packed[1]["content"].endswith("…")
+
+    def test_small_remainder_skipped(self):
+        results = [_source(1, "A", "mot " * 60), _source(2, "B", "autre " * 60)]
+        _, packed = pack_context(
+            results, budget=80, render=_render, min_tokens=48
+        )
+        assert [r["id"] for r in packed] == [1]
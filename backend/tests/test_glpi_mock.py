@@ -29,6 +29,14 @@ class TestGLPIMockData:
         assert isinstance(glpi_mock.faq_items, list)
         assert len(glpi_mock.faq_items) > 0
 
+    def test_data_generated_on_first_access(self):
+        """Test que les données ne sont générées qu'au premier accès."""
+        mock = GLPIMockData()
+        assert "tickets" not in vars(mock)
+        assert "index" not in vars(mock)
+        assert len(mock.index) > 0
+        assert "tickets" in vars(mock)
+
 
 class TestTicketStructure:
     """Tests de la structure des tickets."""
@@ -0,0 +1,354 @@
+"""Tests pour le client GLPI (session partagée, ré-authentification)."""
+import asyncio
+
+import httpx
+
+from app import glpi_service as glpi_module
+from app.glpi_service import GLPIService
+
+
+class FakeGLPI:
+    """Serveur GLPI minimal servi par httpx.MockTransport."""
+
+    def __init__(self):
+        self.inits = 0
+        self.valid_tokens = set()
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        if path.endswith("/initSession"):
+            self.inits += 1
+            token = f"token-{self.inits}"
+            self.valid_tokens.add(token)
+            return httpx.Response(200, json={"session_token": token})
+        if path.endswith("/killSession"):
+            self.valid_tokens.discard(request.headers.get("Session-Token"))
+            return httpx.Response(200, json={})
+        if request.headers.get("Session-Token") not in self.valid_tokens:
+            return httpx.Response(401, json=["ERROR_SESSION_TOKEN_INVALID", ""])
+        if path.endswith("/Ticket/7"):
+            return httpx.Response(200, json={"id": 7, "name": "VPN", "status": 2})
+        if "/Ticket/7/" in path:
+            return httpx.Response(200, json=[])
+        return httpx.Response(200, json=[], headers={"Content-Range": "0-0/0"})
+
+
+def _service(fake: FakeGLPI) -> GLPIService:
+    service = GLPIService()
+    service._client = httpx.AsyncClient(
+        base_url="http://glpi/apirest.php",
+        transport=httpx.MockTransport(fake.handler),
+    )
+    return service
+
+
+class TestGLPISession:
+    """Tests de la réutilisation du jeton de session."""
+
+    def test_session_reused_across_calls(self):
+        """Test qu'un seul initSession sert plusieurs appels."""
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            for _ in range(3):
+                assert (await service.get_ticket_details(7))["id"] == 7
+            await service.get_items("Ticket")
+
+        asyncio.run(run())
+        assert fake.inits == 1
+        assert not any(p.endswith("/killSession") for p in fake.requests)
+        assert service.stats()["session_inits"] == 1
+
+    def test_concurrent_calls_share_one_session(self):
+        """Test que des appels simultanés n'ouvrent qu'une session."""
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            await asyncio.gather(*(service.get_items("Ticket") for _ in range(10)))
+
+        asyncio.run(run())
+        assert fake.inits == 1
+
+    def test_reauth_on_401(self):
+        """Test la ré-authentification transparente si GLPI refuse le jeton."""
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            await service.get_items("Ticket")
+            fake.valid_tokens.clear()  # session expirée côté serveur
+            return await service.get_ticket_details(7)
+
+        assert asyncio.run(run())["id"] == 7
+        assert fake.inits == 2
+        assert service.stats()["reauths"] == 1
+
+    def test_session_renewed_after_ttl(self, monkeypatch):
+        """Test qu'un jeton plus vieux que le TTL est renouvelé."""
+        monkeypatch.setattr(glpi_module, "GLPI_SESSION_TTL", 0)
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            await service.get_items("Ticket")
+            await service.get_items("Ticket")
+
+        asyncio.run(run())
+        assert fake.inits == 2
+
+    def test_aclose_kills_session(self):
+        """Test que la fermeture termine la session GLPI."""
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            await service.get_items("Ticket")
+            await service.aclose()
+
+        asyncio.run(run())
+        assert fake.requests[-1].endswith("/killSession")
+        assert service.stats()["session_active"] is False
+
+
+def _response(path, payload):
+    return httpx.Response(
+        200, json=payload, request=httpx.Request("GET", f"http://glpi{path}")
+    )
+
+
+class TestTicketDetails:
+    """Tests de la récupération des détails de tickets."""
+
+    def test_sub_resources_fetched_concurrently(self):
+        """Test que ticket, suivis et solutions partent en parallèle."""
+        fake = FakeGLPI()
+        service = _service(fake)
+        in_flight = []
+        peak = []
+
+        async def slow_request(method, path, **kwargs):
+            in_flight.append(path)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(path)
+            if path == "/Ticket/7":
+                return _response(path, {"id": 7, "solution": "Redémarrer"})
+            return _response(path, [])
+
+        service._request = slow_request
+        details = asyncio.run(service.get_ticket_details(7))
+        assert details["solution"] == "Redémarrer"
+        assert max(peak) == 3
+
+    def test_followup_preferred_over_solution(self):
+        """Test l'ordre de priorité des sources de solution."""
+        service = GLPIService()
+
+        async def fake_request(method, path, **kwargs):
+            if path.endswith("/TicketFollowup"):
+                return _response(path, [{"content": "Suivi détaillé du ticket"}])
+            if path.endswith("/ITILSolution"):
+                return _response(path, [{"content": "Solution ITIL"}])
+            return _response(path, {"id": 7})
+
+        service._request = fake_request
+        details = asyncio.run(service.get_ticket_details(7))
+        assert details["solution"] == "Suivi détaillé du ticket"
+
+    def test_details_cached_and_invalidated_on_update(self):
+        """Test le cache des détails et son invalidation à la mise à jour."""
+        fake = FakeGLPI()
+        service = _service(fake)
+
+        async def run():
+            await service.get_ticket_details(7)
+            await service.get_ticket_details(7)
+            assert await service.update_ticket(7, {"status": 5})
+            await service.get_ticket_details(7)
+
+        asyncio.run(run())
+        assert fake.requests.count("/apirest.php/Ticket/7/TicketFollowup") == 2
+        stats = service.stats()["ticket_cache"]
+        assert stats["hits"] == 1
+        assert stats["invalidations"] == 1
+
+    def test_partial_details_not_cached(self):
+        """Test qu'un suivi illisible n'est pas mis en cache comme absent."""
+        service = GLPIService()
+        followups_down = [True]
+
+        async def fake_request(method, path, **kwargs):
+            if path.endswith("/TicketFollowup"):
+                if followups_down[0]:
+                    raise httpx.ReadTimeout("GLPI lent")
+                return _response(path, [{"content": "Suivi détaillé du ticket"}])
+            if path.endswith("/ITILSolution"):
+                return _response(path, [])
+            return _response(path, {"id": 7, "date_mod": "2025-01-01 10:00:00"})
+
+        service._request = fake_request
+
+        async def run():
+            first = await service.get_ticket_details(7)
+            followups_down[0] = False
+            return first, await service.get_ticket_details(7)
+
+        first, second = asyncio.run(run())
+        assert first is None
+        assert second["solution"] == "Suivi détaillé du ticket"
+
+    def test_stale_details_served_when_refresh_fails(self):
+        """Test qu'un rechargement en échec sert les détails en cache."""
+        service = GLPIService()
+        state = {"date_mod": "2025-01-01 10:00:00", "down": False}
+
+        async def fake_request(method, path, **kwargs):
+            if path.endswith("/TicketFollowup"):
+                if state["down"]:
+                    raise httpx.ReadTimeout("GLPI lent")
+                return _response(path, [])
+            if path.endswith("/ITILSolution"):
+                return _response(path, [])
+            return _response(path, {"id": 7, "date_mod": state["date_mod"]})
+
+        service._request = fake_request
+        service.ticket_cache.ttl = 0
+
+        async def run():
+            await service.get_ticket_details(7)
+            state.update(date_mod="2025-01-02 10:00:00", down=True)
+            return await service.get_ticket_details(7)
+
+        details = asyncio.run(run())
+        assert details["date_mod"] == "2025-01-01 10:00:00"
+        assert service.stats()["ticket_cache"]["stale_served"] == 1
+
+    def test_bulk_bounded_concurrency(self):
+        """Test la récupération groupée avec concurrence bornée."""
+        service = GLPIService()
+        active = []
+        peak = []
+
+        async def fake_details(ticket_id):
+            active.append(ticket_id)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(ticket_id)
+            return None if ticket_id == 404 else {"id": ticket_id}
+
+        service.get_ticket_details = fake_details
+        details = asyncio.run(
+            service.get_tickets_details([1, 2, 3, 2, 404, 5, 6], concurrency=2)
+        )
+        assert list(details) == [1, 2, 3, 404, 5, 6]
+        assert details[404] is None
+        assert details[5] == {"id": 5}
+        assert max(peak) == 2
+
+
+class FakeGLPISearch(FakeGLPI):
+    """Ajoute l'API search : utilisateur 42 (jean.dupont) et ses tickets."""
+
+    def __init__(self, ticket_ids):
+        super().__init__()
+        self.ticket_ids = ticket_ids
+        self.searches = []
+
+    def handler(self, request):
+        path = request.url.path
+        if "/search/" not in path:
+            return super().handler(request)
+
+        params = request.url.params
+        self.searches.append((path.rsplit("/", 1)[1], params))
+        if path.endswith("/User"):
+            found = params["criteria[0][value]"] == "^jean.dupont$"
+            data = [{"2": 42}] if found else []
+            return httpx.Response(200, json={"totalcount": len(data), "data": data})
+
+        ids = sorted(self.ticket_ids, reverse=True)
+        for i in range(1, 5):
+            if params.get(f"criteria[{i}][field]") == "2":
+                before = int(params[f"criteria[{i}][value]"])
+                ids = [t for t in ids if t < before]
+        start, end = map(int, params["range"].split("-"))
+        page = ids[start:end + 1]
+        data = [{"2": t, "1": f"Ticket {t}", "12": 2} for t in page]
+        return httpx.Response(
+            200,
+            json={"totalcount": len(ids), "count": len(page), "data": data},
+            headers={"Content-Range": f"{start}-{start + len(page) - 1}/{len(ids)}"},
+        )
+
+
+class TestUserTicketsSearch:
+    """Tests de la recherche de tickets filtrée par GLPI."""
+
+    def test_criteria_sent_to_glpi(self):
+        """Test que le filtre demandeur/statut/date est fait par GLPI."""
+        fake = FakeGLPISearch([1, 2, 3])
+        service = _service(fake)
+
+        tickets = asyncio.run(
+            service.get_user_tickets("jean.dupont", status="notold", since="2025-01-01")
+        )
+        assert [t["id"] for t in tickets] == [3, 2, 1]
+
+        _, params = fake.searches[-1]
+        assert params["criteria[0][field]"] == "4"
+        assert params["criteria[0][value]"] == "42"
+        assert params["criteria[1][field]"] == "12"
+        assert params["criteria[1][value]"] == "notold"
+        assert params["criteria[2][searchtype]"] == "morethan"
+        assert params["range"] == "0-19"
+
+    def test_cursor(self):
+        """Test la pagination par curseur (id du dernier ticket reçu)."""
+        fake = FakeGLPISearch([1, 2, 3, 4, 5])
+        service = _service(fake)
+
+        tickets = asyncio.run(
+            service.get_user_tickets("jean.dupont", limit=2, before_id=4)
+        )
+        assert [t["id"] for t in tickets] == [3, 2]
+
+    def test_unknown_user(self):
+        """Test qu'un login inconnu ne renvoie aucun ticket."""
+        fake = FakeGLPISearch([1])
+        service = _service(fake)
+        assert asyncio.run(service.get_user_tickets("inconnu")) == []
+
+    def test_user_id_cached(self):
+        """Test que le login n'est résolu qu'une fois."""
+        fake = FakeGLPISearch([1])
+        service = _service(fake)
+
+        async def run():
+            await service.get_user_tickets("jean.dupont")
+            await service.get_user_tickets("jean.dupont")
+
+        asyncio.run(run())
+        assert [t for t, _ in fake.searches].count("User") == 1
+
+    def test_iter_pages_lazily(self):
+        """Test le parcours page par page guidé par Content-Range."""
+        fake = FakeGLPISearch([1, 2, 3, 4, 5])
+        service = _service(fake)
+
+        async def first_only():
+            async for ticket in service.iter_user_tickets("jean.dupont", page_size=2):
+                return ticket
+
+        async def all_tickets():
+            return [t["id"] async for t in service.iter_user_tickets("jean.dupont", page_size=2)]
+
+        assert asyncio.run(first_only())["id"] == 5
+        assert [t for t, _ in fake.searches].count("Ticket") == 1
+
+        fake.searches.clear()
+        assert asyncio.run(all_tickets()) == [5, 4, 3, 2, 1]
+        assert [t for t, _ in fake.searches].count("Ticket") == 3
@@ -0,0 +1,269 @@
+"""Tests pour la synchronisation incrémentale GLPI."""
+import asyncio
+
+from app.glpi_sync import GLPISyncEngine, html_to_text
+
+
+class FakeGLPIService:
+    """Service GLPI en mémoire : getAllItems trié par date_mod décroissante."""
+
+    def __init__(self):
+        self.items = {"Ticket": [], "ITILSolution": [], "KnowbaseItem": []}
+        self.calls = []
+
+    async def get_items(self, itemtype, start=0, end=49, **params):
+        self.calls.append((itemtype, start, params.get("is_deleted", 0)))
+        deleted = params.get("is_deleted", 0)
+        items = [
+            item for item in self.items[itemtype]
+            if item.get("is_deleted", 0) == deleted
+        ]
+        key = params.get("sort", "date_mod")
+        items.sort(key=lambda item: item[key], reverse=params.get("order") == "DESC")
+        page = items[start:end + 1]
+        if params.get("only_id"):
+            page = [{"id": item["id"]} for item in page]
+        return page, len(items)
+
+
+def _ticket(ticket_id, date_mod, name="VPN en panne", **fields):
+    return {
+        "id": ticket_id, "name": name, "content": "&lt;p&gt;Le VPN coupe&lt;/p&gt;",
+        "status": 5, "date_mod": date_mod, **fields,
+    }
+
+
+def _solution(ticket_id, date_mod, content="Réinstaller le client VPN", **fields):
+    return {
+        "id": ticket_id * 10, "itemtype": "Ticket", "items_id": ticket_id,
+        "content": content, "status": 3, "date_mod": date_mod, **fields,
+    }
+
+
+def _engine(service, page_size=2, reconcile_interval=0):
+    return GLPISyncEngine(
+        service, page_size=page_size, reconcile_interval=reconcile_interval
+    )
+
+
+class TestHtmlToText:
+    """Tests de la conversion des champs riches GLPI."""
+
+    def test_unescapes_and_strips_tags(self):
+        value = "&lt;p&gt;Ligne 1&lt;br /&gt;Ligne&amp;nbsp;2&lt;/p&gt;"
+        assert html_to_text(value) == "Ligne 1\nLigne\xa02"
+
+    def test_empty(self):
+        assert html_to_text(None) == ""
+
+
+class TestGLPISyncEngine:
+    """Tests du moteur de synchronisation."""
+
+    def test_indexes_solved_tickets_only(self):
+        """Test qu'un ticket n'est indexé qu'avec sa solution."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [_ticket(1, "2025-01-01 10:00:00")]
+        engine = _engine(service)
+
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 0
+
+        service.items["ITILSolution"] = [_solution(1, "2025-01-02 10:00:00")]
+        asyncio.run(engine.sync_once())
+
+        results = engine.index.search("VPN")
+        assert results[0]["source"] == "ticket"
+        assert "Le VPN coupe" in results[0]["content"]
+        assert "Réinstaller le client VPN" in results[0]["content"]
+
+    def test_incremental_sync_stops_at_high_water_mark(self):
+        """Test qu'un second passage ne relit que les éléments modifiés."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [
+            _ticket(i, f"2025-01-0{i} 10:00:00") for i in range(1, 6)
+        ]
+        engine = _engine(service)
+
+        changes = asyncio.run(engine.sync_once())
+        assert changes["Ticket"] == 5
+        assert engine.high_water["Ticket"] == "2025-01-05 10:00:00"
+
+        service.items["Ticket"][0]["date_mod"] = "2025-01-09 10:00:00"
+        service.calls.clear()
+        changes = asyncio.run(engine.sync_once())
+
+        # Ticket modifié + celui dont date_mod égale le mark précédent
+        assert changes["Ticket"] == 2
+        assert ("Ticket", 4, 0) not in service.calls
+        assert engine.high_water["Ticket"] == "2025-01-09 10:00:00"
+
+    def test_deleted_ticket_removed(self):
+        """Test qu'un ticket mis à la corbeille sort de l'index."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [_ticket(1, "2025-01-01 10:00:00")]
+        service.items["ITILSolution"] = [_solution(1, "2025-01-01 11:00:00")]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 1
+
+        service.items["Ticket"][0].update(
+            is_deleted=1, date_mod="2025-01-03 10:00:00"
+        )
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 0
+
+    def test_refused_solution_removed(self):
+        """Test qu'une solution refusée retire le ticket de l'index."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [_ticket(1, "2025-01-01 10:00:00")]
+        service.items["ITILSolution"] = [_solution(1, "2025-01-01 11:00:00")]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+
+        service.items["ITILSolution"][0].update(
+            status=4, date_mod="2025-01-02 10:00:00"
+        )
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 0
+
+    def test_newest_solution_wins(self):
+        """Test qu'une solution plus ancienne ne remplace pas la plus récente."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [_ticket(1, "2025-01-01 10:00:00")]
+        service.items["ITILSolution"] = [
+            _solution(1, "2025-01-02 10:00:00", content="Ancienne solution", id=10),
+            _solution(1, "2025-01-03 10:00:00", content="Nouvelle solution", id=11),
+        ]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+
+        [result] = engine.index.search("solution")
+        assert "Nouvelle solution" in result["content"]
+        assert "Ancienne" not in result["content"]
+
+    def test_older_refused_solution_ignored(self):
+        """Test qu'une solution refusée plus ancienne ne retire pas le ticket."""
+        service = FakeGLPIService()
+        service.items["Ticket"] = [_ticket(1, "2025-01-01 10:00:00")]
+        service.items["ITILSolution"] = [
+            _solution(1, "2025-01-02 10:00:00", content="Refusée", id=10, status=4),
+            _solution(1, "2025-01-03 10:00:00", content="Acceptée", id=11),
+        ]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+
+        assert len(engine.index) == 1
+        assert "Acceptée" in engine.index.search("VPN")[0]["content"]
+
+    def test_kb_items_and_faq(self):
+        """Test l'indexation des articles et le passage en FAQ."""
+        service = FakeGLPIService()
+        article = {
+            "id": 3, "name": "Configurer Outlook", "answer": "Ouvrir le profil",
+            "is_faq": 0, "date_mod": "2025-01-01 10:00:00",
+        }
+        service.items["KnowbaseItem"] = [article]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+        assert engine.index.search("Outlook")[0]["source"] == "kb_article"
+
+        article.update(is_faq=1, date_mod="2025-01-02 10:00:00")
+        asyncio.run(engine.sync_once())
+        results = engine.index.search("Outlook")
+        assert [r["source"] for r in results] == ["faq"]
+
+    def test_unpublished_kb_item_removed(self):
+        """Test qu'un article hors période de publication n'est pas servi."""
+        service = FakeGLPIService()
+        article = {
+            "id": 3, "name": "Configurer Outlook", "answer": "Ouvrir le profil",
+            "is_faq": 1, "date_mod": "2025-01-01 10:00:00",
+        }
+        service.items["KnowbaseItem"] = [article]
+        engine = _engine(service)
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 1
+
+        article.update(end_date="2025-01-02 00:00:00", date_mod="2025-01-02 10:00:00")
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 0
+
+    def test_stats(self):
+        """Test l'état exposé dans les métriques."""
+        engine = _engine(FakeGLPIService())
+        asyncio.run(engine.sync_once())
+        stats = engine.stats()
+        assert stats["runs"] == 1
+        assert stats["documents"] == 0
+        assert stats["running"] is False
+
+
+class TestReconciliation:
+    """Tests du retrait des éléments purgés ou masqués."""
+
+    def _synced(self):
+        service = FakeGLPIService()
+        service.items["Ticket"] = [
+            _ticket(1, "2025-01-01 10:00:00"), _ticket(2, "2025-01-01 11:00:00"),
+        ]
+        service.items["ITILSolution"] = [
+            _solution(1, "2025-01-02 10:00:00", content="Ancienne solution", id=10),
+            _solution(1, "2025-01-03 10:00:00", content="Nouvelle solution", id=11),
+            _solution(2, "2025-01-02 10:00:00", id=20),
+        ]
+        service.items["KnowbaseItem"] = [{
+            "id": 3, "name": "Configurer Outlook", "answer": "Ouvrir le profil",
+            "is_faq": 0, "date_mod": "2025-01-01 10:00:00",
+        }]
+        engine = _engine(service, reconcile_interval=1e-9)
+        asyncio.run(engine.sync_once())
+        assert len(engine.index) == 3
+        return service, engine
+
+    def test_purged_items_removed(self):
+        """Test qu'un ticket et un article purgés sortent de l'index."""
+        service, engine = self._synced()
+        del service.items["Ticket"][1]
+        del service.items["KnowbaseItem"][0]
+
+        changes = asyncio.run(engine.sync_once())
+        assert changes["Suppressions"] == 2
+        assert [r["id"] for r in engine.index.search("VPN Outlook")] == [1]
+        assert engine.stats()["reconcile_removals"] == 2
+
+    def test_deleted_solution_falls_back(self):
+        """Test qu'une solution supprimée laisse place à la précédente."""
+        service, engine = self._synced()
+        del service.items["ITILSolution"][1]
+        asyncio.run(engine.sync_once())
+        content = engine.index.search("solution")[0]["content"]
+        assert "Ancienne solution" in content
+
+        del service.items["ITILSolution"][0]
+        asyncio.run(engine.sync_once())
+        assert [r["id"] for r in engine.index.search("VPN")] == [2]
+
+    def test_first_sync_does_not_reconcile(self):
+        service = FakeGLPIService()
+        engine = _engine(service, reconcile_interval=1e-9)
+        changes = asyncio.run(engine.sync_once())
+        assert "Suppressions" not in changes
+        assert engine.stats()["reconciliations"] == 0
+
+    def test_postponed_when_list_changes(self):
+        """Test qu'une liste modifiée pendant la lecture ne retire rien."""
+        service, engine = self._synced()
+        get_items = service.get_items
+
+        async def shrinking(itemtype, start=0, end=49, **params):
+            items, total = await get_items(itemtype, start, end, **params)
+            if itemtype == "Ticket" and start:
+                # Suppression entre deux pages : le total a changé
+                return [], total - 1
+            return items, total
+
+        service.get_items = shrinking
+        engine.page_size = 1
+        asyncio.run(engine._reconcile())
+        assert set(engine._tickets) == {1, 2}
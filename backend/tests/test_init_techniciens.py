@@ -1,8 +1,15 @@
 """Tests pour le module init_techniciens."""
 import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+
+from app import init_techniciens as init_module
 from app.init_techniciens import (
     TECHNICIENS_DATA,
-    get_all_categories
+    get_all_categories,
+    get_technicien_id,
+    init_techniciens,
 )
 
 
@@ -63,3 +70,41 @@ class TestGetAllCategories:
         for cat in categories:
             assert isinstance(cat, str)
             assert len(cat) > 0
+
+
+class TestInitTechniciens:
+    """Tests de l'initialisation de la table."""
+
+    @pytest.fixture
+    def selects(self, monkeypatch):
+        """Base SQLite en mémoire ; renvoie la liste des SELECT exécutés."""
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(engine)
+        monkeypatch.setattr(init_module, "engine", engine)
+        monkeypatch.setattr(init_module, "_technicien_ids", {})
+
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        return statements
+
+    def test_single_select(self, selects):
+        """Test que l'initialisation ne lit la table qu'une fois."""
+        init_techniciens()
+        assert len(selects) == 1
+        assert get_technicien_id("Réseau") is not None
+
+        selects.clear()
+        init_techniciens()
+        assert len(selects) == 1
+        assert len({get_technicien_id(t["nom"]) for t in TECHNICIENS_DATA}) == len(
+            TECHNICIENS_DATA
+        )
@@ -1,10 +1,17 @@
 """Tests pour les fonctions de parsing du module LLM (sans Ollama)."""
+import asyncio
+
 import pytest
+from app import llm
 from app.llm import (
+    CategoryTagFilter,
+    chat_options,
+    format_rag_prompt,
     parse_category_from_response,
     _build_categories_prompt,
     TECHNICIEN_CATEGORIES
 )
+from app.retrieval import KnowledgeIndex
 
 
 class TestParseCategoryFromResponse:
@@ -108,3 +115,123 @@ class TestTechnicienCategories:
         ]
         for cat in expected:
             assert cat in TECHNICIEN_CATEGORIES, f"Catégorie {cat} manquante"
+
+
+class TestCategoryTagFilter:
+    """Tests du filtrage des tags de catégorie en streaming."""
+
+    def _run(self, chunks):
+        tag_filter = CategoryTagFilter()
+        output = "".join(tag_filter.feed(chunk) for chunk in chunks)
+        return output + tag_filter.flush()
+
+    def test_plain_text_passes_through(self):
+        """Test que le texte sans crochet est restitué immédiatement."""
+        tag_filter = CategoryTagFilter()
+        assert tag_filter.feed("Redémarrez ") == "Redémarrez "
+        assert tag_filter.feed("le poste.") == "le poste."
+
+    def test_category_tag_split_across_chunks(self):
+        """Test qu'un tag découpé en plusieurs tokens est retiré."""
+        output = self._run(["Réponse. [CAT", "EGORY:Ré", "seau]"])
+        assert output == "Réponse. "
+
+    def test_text_is_held_until_bracket_closes(self):
+        """Test que le texte après un crochet ouvrant est retenu."""
+        tag_filter = CategoryTagFilter()
+        assert tag_filter.feed("Voir [Sour") == "Voir "
+        assert tag_filter.feed("ce 1] ici") == "[Source 1] ici"
+
+    def test_unknown_category_tag_removed(self):
+        """Test qu'un tag CATEGORY inconnu est aussi retiré."""
+        assert self._run(["Texte [CATEGORY:Inconnue]"]) == "Texte "
+
+    def test_unclosed_bracket_flushed(self):
+        """Test que le texte retenu est restitué en fin de flux."""
+        assert self._run(["Tableau [1"]) == "Tableau [1"
+
+
+class TestFormatRagPrompt:
+    """Tests de la construction du prompt."""
+
+    def test_instructions_not_duplicated(self):
+        results = [{"source": "faq", "id": 1, "title": "VPN",
+                    "content": "   Utiliser   AnyConnect", "metadata": {}}]
+        prompt, sources = format_rag_prompt("VPN ?", results, "CONTEXTE GLPI")
+        assert prompt.count("UNIQUEMENT") == 1
+        assert prompt.count("[CATEGORY:") == 1
+        assert "Utiliser AnyConnect" in prompt
+        assert sources == [{"type": "faq", "id": 1, "title": "VPN", "metadata": {}}]
+
+    def test_no_context(self):
+        assert format_rag_prompt("VPN ?", [], "CONTEXTE GLPI") == ("VPN ?", [])
+
+
+class TestChatOptions:
+    """Tests de l'ajustement de num_ctx."""
+
+    def test_small_prompt(self):
+        assert chat_options("Bonjour")["num_ctx"] == 2048
+
+    def test_grows_by_power_of_two(self):
+        options = chat_options("x" * 20000)
+        assert options["num_ctx"] == 8192
+        assert options["num_predict"] > 0
+
+
+class TestPromptWithoutCategory:
+    """Tests du prompt d'une question déjà classée."""
+
+    def test_categories_omitted(self):
+        results = [{"source": "faq", "id": 1, "title": "VPN",
+                    "content": "Utiliser AnyConnect", "metadata": {}}]
+        prompt, _ = format_rag_prompt(
+            "VPN ?", results, "CONTEXTE GLPI", ask_category=False
+        )
+        assert "CATEGORY" not in prompt
+        assert "CATÉGORIES DE TECHNICIENS" not in prompt
+        assert prompt.endswith("RÉPONSE:")
+
+
+class TestKnowledgeEmbeddings:
+    """Tests du calcul des embeddings de l'index hors du chemin de /ask."""
+
+    @pytest.fixture
+    def index(self, monkeypatch):
+        index = KnowledgeIndex()
+        for doc_id, text in enumerate(["wifi", "outlook"]):
+            index.upsert(
+                {"source": "faq", "id": doc_id, "title": text,
+                 "content": text, "metadata": {}},
+                text
+            )
+        monkeypatch.setattr(llm, "_knowledge_index", lambda: index)
+        return index
+
+    def test_search_does_not_embed_corpus(self, index, monkeypatch):
+        """Test que la recherche n'embarque pas les passages en attente."""
+        calls = []
+
+        async def get_embedding(text):
+            calls.append(text)
+            return [1.0, 0.0]
+
+        monkeypatch.setattr(llm, "get_embedding", get_embedding)
+        assert asyncio.run(llm._dense_hits("wifi", 5, [1.0, 0.0])) == []
+        assert calls == []
+        assert index.pending_embeddings == 2
+
+    def test_background_retries_failures(self, index, monkeypatch):
+        """Test que les passages en échec sont repris jusqu'au dernier."""
+        failures = ["outlook"]
+
+        async def get_embedding(text):
+            if text in failures:
+                failures.remove(text)
+                raise ConnectionError("ollama")
+            return [1.0, 0.0] if text == "wifi" else [0.0, 1.0]
+
+        monkeypatch.setattr(llm, "get_embedding", get_embedding)
+        asyncio.run(llm.embed_knowledge_index(retry_interval=0))
+        assert index.pending_embeddings == 0
+        assert len(asyncio.run(llm._dense_hits("outlook", 5, [0.0, 1.0]))) == 2
@@ -0,0 +1,210 @@
+"""Tests pour l'ordonnancement des générations LLM."""
+import asyncio
+
+import httpx
+import pytest
+
+from app import llm
+from app import main
+from app.llm_scheduler import LLMOverloaded, LLMScheduler
+
+
+async def _generate(scheduler, user, log, delay=0.01):
+    async with scheduler.slot(user):
+        log.append(user)
+        await asyncio.sleep(delay)
+
+
+class TestLLMScheduler:
+    """Tests de la limite de concurrence et de la file équitable."""
+
+    def test_concurrency_limit(self):
+        """Test qu'au plus max_concurrent générations s'exécutent ensemble."""
+        scheduler = LLMScheduler(max_concurrent=2)
+        running, peak = [0], [0]
+
+        async def generate(user):
+            async with scheduler.slot(user):
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.01)
+                running[0] -= 1
+
+        async def run():
+            await asyncio.gather(*(generate(i % 3) for i in range(6)))
+
+        asyncio.run(run())
+        assert peak[0] == 2
+        stats = scheduler.stats()
+        assert (stats["running"], stats["queued"], stats["admitted"]) == (0, 0, 6)
+
+    def test_round_robin_between_users(self):
+        """Test qu'un utilisateur en rafale ne passe pas devant les autres."""
+        scheduler = LLMScheduler(max_concurrent=1, max_queue_per_user=10)
+        log = []
+
+        async def run():
+            holder = asyncio.ensure_future(_generate(scheduler, "x", log))
+            await asyncio.sleep(0)
+            waiters = [
+                asyncio.ensure_future(_generate(scheduler, user, log))
+                for user in ["a", "a", "a", "b", "c"]
+            ]
+            await asyncio.gather(holder, *waiters)
+
+        asyncio.run(run())
+        assert log == ["x", "a", "b", "c", "a", "a"]
+
+    def test_queue_full_rejected(self):
+        """Test le refus immédiat quand la file est pleine."""
+        scheduler = LLMScheduler(max_concurrent=1, max_queue=2)
+        log = []
+
+        async def run():
+            tasks = [
+                asyncio.ensure_future(_generate(scheduler, user, log))
+                for user in ["a", "b", "c"]
+            ]
+            await asyncio.sleep(0)
+            with pytest.raises(LLMOverloaded) as error:
+                scheduler.check("d")
+            await asyncio.gather(*tasks)
+            return error.value
+
+        error = asyncio.run(run())
+        assert error.retry_after >= 1
+        assert log == ["a", "b", "c"]
+        assert scheduler.stats()["rejected"] == 1
+
+    def test_per_user_limit(self):
+        scheduler = LLMScheduler(max_concurrent=1, max_queue_per_user=1)
+        log = []
+
+        async def run():
+            tasks = [
+                asyncio.ensure_future(_generate(scheduler, user, log))
+                for user in ["a", "a", "a", "b"]
+            ]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert isinstance(results[2], LLMOverloaded)
+        assert log == ["a", "a", "b"]
+
+    def test_queue_timeout(self):
+        scheduler = LLMScheduler(max_concurrent=1, queue_timeout=0.01)
+
+        async def run():
+            holder = asyncio.ensure_future(_generate(scheduler, "a", [], delay=0.05))
+            await asyncio.sleep(0)
+            with pytest.raises(LLMOverloaded):
+                await _generate(scheduler, "b", [])
+            await holder
+
+        asyncio.run(run())
+        stats = scheduler.stats()
+        assert (stats["timeouts"], stats["queued"], stats["running"]) == (1, 0, 0)
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """Test qu'une requête abandonnée libère sa place dans la file."""
+        scheduler = LLMScheduler(max_concurrent=1)
+        log = []
+
+        async def run():
+            holder = asyncio.ensure_future(_generate(scheduler, "a", log))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(_generate(scheduler, "b", log))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await holder
+            await _generate(scheduler, "c", log)
+
+        asyncio.run(run())
+        assert log == ["a", "c"]
+        assert scheduler.stats()["queued"] == 0
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """Planificateur saturé : un créneau occupé, file pleine."""
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=0)
+    scheduler._running = 1
+    monkeypatch.setattr(main, "llm_scheduler", scheduler)
+    monkeypatch.setattr(llm, "llm_scheduler", scheduler)
+    return scheduler
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Pipeline /ask/ sans Ollama ni base ; réponse en cache paramétrable."""
+    cached = {}
+
+    async def get_embedding(text):
+        return [0.1] * 8
+
+    async def search_glpi(question, question_embedding=None):
+        return [], False
+
+    async def select_context(question, glpi_results, relevant):
+        return [], None
+
+    async def classify_question(embedding):
+        return None
+
+    async def store(*args):
+        return 1
+
+    for func in (get_embedding, search_glpi, select_context, classify_question):
+        monkeypatch.setattr(llm, func.__name__, func)
+    monkeypatch.setattr(main, "_store_question", store)
+    monkeypatch.setattr(main, "_store_reponse", store)
+    monkeypatch.setattr(
+        main, "_lookup_cached_answer", lambda request, embedding: cached or None
+    )
+    return cached
+
+
+def _request(method, path, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(run())
+
+
+class TestAdmission:
+    """Tests du refus des questions quand le LLM est saturé."""
+
+    def test_ask_429(self, saturated, pipeline):
+        response = _request(
+            "POST", "/ask/", json={"user_ad_id": 1, "question": "VPN"}
+        )
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert saturated.stats()["rejected"] == 1
+
+    def test_ask_cached_answer_served(self, saturated, pipeline):
+        """Test qu'une réponse en cache est servie malgré la saturation."""
+        pipeline.update(
+            id=3, answer="Redémarrez le VPN.", technicien_id=None, category=None
+        )
+        response = _request(
+            "POST", "/ask/", json={"user_ad_id": 1, "question": "VPN"}
+        )
+        assert response.status_code == 200
+        assert response.json()["cached"] is True
+        assert saturated.stats()["rejected"] == 0
+
+    def test_ask_stream_429(self, saturated):
+        response = _request(
+            "POST", "/ask/stream", json={"user_ad_id": 1, "question": "VPN"}
+        )
+        assert response.status_code == 429
+
+    def test_preview_still_served(self, saturated):
+        """Test que les endpoints légers restent servis."""
+        response = _request("GET", "/glpi/preview/faq")
+        assert response.status_code == 200
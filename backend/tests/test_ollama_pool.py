@@ -0,0 +1,311 @@
+"""Tests pour la répartition des appels sur plusieurs serveurs Ollama."""
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import ollama
+import pytest
+
+from app.ollama_pool import (
+    OllamaPool, load_chat_model, load_embedding_model, parse_hosts,
+    parse_keep_alive,
+)
+
+
+def _free_port_url():
+    """URL d'un port local sur lequel rien n'écoute (serveur en panne)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def ollama_server():
+    """Serveur local imitant l'API Ollama (tags, ps, chargement, chat)."""
+    models = ["mistral:latest"]
+    loaded, keep_alive = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload, content_type="application/json"):
+            body = payload.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            names = loaded if self.path == "/api/ps" else models
+            self._send(json.dumps({"models": [
+                {"model": name, "name": name} for name in names
+            ]}))
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if "keep_alive" in body:
+                keep_alive.append(body["keep_alive"])
+                loaded.append(f"{body['model']}:latest")
+            if self.path == "/api/generate":
+                self._send(json.dumps({"model": body["model"], "response": "", "done": True}))
+            elif self.path == "/api/embeddings":
+                self._send(json.dumps({"embedding": [0.5, 0.5]}))
+            elif body.get("stream"):
+                chunks = [
+                    {"message": {"role": "assistant", "content": word}, "done": False}
+                    for word in ["Redémarrez ", "le VPN."]
+                ]
+                chunks.append({"message": {"role": "assistant", "content": ""}, "done": True})
+                self._send(
+                    "".join(json.dumps(c) + "\n" for c in chunks),
+                    "application/x-ndjson",
+                )
+            else:
+                self._send(json.dumps({
+                    "message": {"role": "assistant", "content": "Redémarrez le VPN."},
+                    "done": True,
+                }))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield SimpleNamespace(
+        url=f"http://127.0.0.1:{server.server_port}",
+        models=models,
+        loaded=loaded,
+        keep_alive=keep_alive,
+    )
+    server.shutdown()
+    server.server_close()
+
+
+def _run(pool, coroutine):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await pool.stop()
+
+    return asyncio.run(run())
+
+
+def test_parse_keep_alive():
+    assert parse_keep_alive("30m") == "30m"
+    assert parse_keep_alive("-1") == -1
+
+
+def test_parse_hosts():
+    assert parse_hosts("http://a:11434, http://b:11434 http://c:11434") == [
+        "http://a:11434", "http://b:11434", "http://c:11434"
+    ]
+
+
+class TestRouting:
+    """Tests du choix du serveur."""
+
+    def test_least_outstanding(self):
+        """Test que les appels simultanés se répartissent sur les serveurs."""
+        pool = OllamaPool("chat", ["http://a", "http://b"], model="mistral")
+        used = []
+
+        async def operation(client):
+            used.append(next(b.host for b in pool.backends if b.client is client))
+            await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(pool.call(operation) for _ in range(4)))
+
+        _run(pool, run())
+        assert sorted(used) == ["http://a", "http://a", "http://b", "http://b"]
+
+    def test_request_error_not_retried(self):
+        """Test qu'une erreur propre à la requête n'est pas rejouée ailleurs."""
+        pool = OllamaPool("chat", ["http://a", "http://b"], model="mistral")
+        calls = []
+
+        async def operation(client):
+            calls.append(client)
+            raise ollama.ResponseError("requête invalide", 400)
+
+        with pytest.raises(ollama.ResponseError):
+            _run(pool, pool.call(operation))
+        assert len(calls) == 1
+        assert all(b.healthy for b in pool.backends)
+
+
+class TestFailover:
+    """Tests du basculement sur un serveur en panne."""
+
+    def test_call_fails_over(self, ollama_server):
+        url = ollama_server.url
+        dead = _free_port_url()
+        pool = OllamaPool("embed", [dead, url], model="nomic-embed-text")
+        pool.backends[1].last_used = 1.0  # le serveur en panne est essayé d'abord
+
+        response = _run(pool, pool.call(
+            lambda client: client.embeddings(model="nomic-embed-text", prompt="vpn")
+        ))
+        assert response["embedding"] == [0.5, 0.5]
+        assert pool.stats()["failovers"] == 1
+        assert not pool.backends[0].healthy
+
+        # Serveur en panne écarté des appels suivants
+        assert pool.candidates() == [pool.backends[1]]
+
+    def test_stream_fails_over(self, ollama_server):
+        url = ollama_server.url
+        pool = OllamaPool("chat", [_free_port_url(), url], model="mistral")
+        pool.backends[1].last_used = 1.0
+
+        async def run():
+            stream = pool.stream(lambda client: client.chat(
+                model="mistral",
+                messages=[{"role": "user", "content": "vpn"}],
+                stream=True,
+            ))
+            return [chunk["message"]["content"] async for chunk in stream]
+
+        assert "".join(_run(pool, run())) == "Redémarrez le VPN."
+        assert pool.stats()["failovers"] == 1
+        assert [b.in_flight for b in pool.backends] == [0, 0]
+
+    def test_all_down(self):
+        pool = OllamaPool("chat", [_free_port_url(), _free_port_url()], model="mistral")
+        with pytest.raises(ConnectionError):
+            _run(pool, pool.call(lambda client: client.list()))
+        assert pool.stats()["healthy"] == 0
+
+
+class TestHealthCheck:
+    """Tests de la vérification des serveurs."""
+
+    def test_missing_model_marked_down(self, ollama_server):
+        url, models = ollama_server.url, ollama_server.models
+        chat = OllamaPool("chat", [url], model="mistral")
+        embed = OllamaPool("embed", [url], model="nomic-embed-text")
+
+        _run(chat, chat.check_all())
+        _run(embed, embed.check_all())
+        assert chat.backends[0].healthy
+        assert not embed.backends[0].healthy
+        assert "nomic-embed-text" in embed.backends[0].last_error
+
+        # Modèle téléchargé : serveur réintégré
+        models.append("nomic-embed-text:latest")
+        _run(embed, embed.check_all())
+        assert embed.backends[0].healthy
+
+    def test_unreachable_marked_down(self):
+        pool = OllamaPool("chat", [_free_port_url()], model="mistral")
+        _run(pool, pool.check_all())
+        assert not pool.backends[0].healthy
+
+
+class TestWarmUp:
+    """Tests du préchargement des modèles et de la disponibilité."""
+
+    def test_warm_up_makes_ready(self, ollama_server):
+        server = ollama_server
+        pool = OllamaPool(
+            "chat", [server.url], model="mistral", keep_alive="30m",
+            load=load_chat_model,
+        )
+        assert not pool.ready()
+
+        async def run():
+            await pool.check_all()
+            ready_before = pool.ready()
+            await pool.warm_all()
+            await pool.check_all()
+            return ready_before
+
+        assert _run(pool, run()) is False
+        assert pool.ready()
+        assert pool.backends[0].loaded
+        assert server.keep_alive == ["30m"]
+        assert pool.stats()["warm_ups"] == 1
+
+    def test_already_loaded_not_reloaded(self, ollama_server):
+        server = ollama_server
+        server.models.append("nomic-embed-text:latest")
+        server.loaded.append("nomic-embed-text:latest")
+        pool = OllamaPool(
+            "embed", [server.url], model="nomic-embed-text",
+            load=load_embedding_model,
+        )
+
+        async def run():
+            await pool.check_all()
+            await pool.warm_all()
+
+        _run(pool, run())
+        assert pool.ready()
+        assert server.keep_alive == []
+
+    def test_ready_without_warm_up(self, ollama_server):
+        """Test que sans préchargement, un serveur sain suffit."""
+        url = ollama_server.url
+        pool = OllamaPool("chat", [url], model="mistral")
+        _run(pool, pool.check_all())
+        assert pool.ready()
+        assert not pool.backends[0].loaded
+
+    def test_keep_warm_interval(self):
+        pool = OllamaPool(
+            "chat", ["http://a"], model="mistral",
+            load=load_chat_model, keep_warm_interval=60,
+        )
+        backend = pool.backends[0]
+        backend.loaded = backend.warmed = True
+        backend.last_warm = time.monotonic()
+        assert not pool._needs_warming(backend)
+
+        backend.last_warm -= 61
+        assert pool._needs_warming(backend)
+
+        pool.keep_warm_interval = 0
+        assert not pool._needs_warming(backend)
+
+    def _expire(self, server, pool):
+        async def run():
+            await pool.check_all()
+            await pool.warm_all()
+            server.loaded.clear()  # keep_alive expiré sur un serveur inactif
+            await pool.check_all()
+            expired = pool.ready()
+            await pool.warm_all()
+            await pool.check_all()
+            return expired
+
+        return _run(pool, run())
+
+    def test_not_reloaded_after_keep_alive_expiry(self, ollama_server):
+        """Test que sans keep-warm, keep_alive est respecté (serveur prêt, froid)."""
+        server = ollama_server
+        pool = OllamaPool(
+            "chat", [server.url], model="mistral", load=load_chat_model,
+        )
+        assert self._expire(server, pool) is True
+        assert not pool.backends[0].loaded
+        assert pool.ready()
+        assert pool.stats()["warm_ups"] == 1
+
+    def test_keep_warm_reloads_after_expiry(self, ollama_server):
+        """Test qu'avec keep-warm, un modèle déchargé est rechargé."""
+        server = ollama_server
+        pool = OllamaPool(
+            "chat", [server.url], model="mistral", load=load_chat_model,
+            keep_warm_interval=3600,
+        )
+        self._expire(server, pool)
+        assert pool.backends[0].loaded
+        assert pool.stats()["warm_ups"] == 2
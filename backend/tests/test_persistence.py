@@ -0,0 +1,180 @@
+"""Tests pour la persistance différée des questions et réponses."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models import Question, Reponse
+from app.persistence import IdAllocator, WriteBehindStore
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _question(label="VPN"):
+    return Question(user_ad_id=1, question_label=label, embedding_question="[]")
+
+
+async def _add_pair(store, label="VPN"):
+    question_id = await store.add(_question(label))
+    reponse_id = await store.add(
+        Reponse(reponse_label=f"Réponse {label}", question_id=question_id)
+    )
+    return question_id, reponse_id
+
+
+def _store(engine, **kwargs):
+    # SQLite : un seul processus écrit dans les tests
+    return WriteBehindStore(engine, single_process=True, **kwargs)
+
+
+class TestIdAllocator:
+    """Tests de la réservation d'identifiants."""
+
+    def test_continues_after_existing_rows(self, engine):
+        """Test que les identifiants suivent ceux déjà en base."""
+        with Session(engine) as session:
+            session.add(Question(id=7, user_ad_id=1, question_label="x"))
+            session.commit()
+
+        allocator = IdAllocator(engine, block_size=3)
+        assert allocator.take(Question) is None
+        assert allocator.refill(Question) == 8
+        assert allocator.take(Question) == 9
+        assert allocator.take(Question) == 10
+        assert allocator.take(Question) is None
+        assert allocator.refill(Question) == 11
+
+    def test_take_not_blocked_by_reservation(self, engine):
+        """Test que take() n'attend pas l'accès base d'un refill en cours."""
+        allocator = IdAllocator(engine, block_size=3)
+        reserving, release = threading.Event(), threading.Event()
+        reserve = allocator._reserve
+
+        def slow_reserve(model):
+            reserving.set()
+            release.wait(5.0)
+            return reserve(model)
+
+        allocator._reserve = slow_reserve
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            refills = [executor.submit(allocator.refill, Question) for _ in range(2)]
+            assert reserving.wait(5.0)
+            started = time.monotonic()
+            assert allocator.take(Question) is None
+            assert time.monotonic() - started < 1.0
+            release.set()
+            assert sorted(f.result() for f in refills) == [1, 2]
+        # Le second refill a pris dans le bloc réservé par le premier
+        assert allocator.take(Question) == 3
+
+
+class TestWriteBehindStore:
+    """Tests de l'écriture différée."""
+
+    def test_ids_returned_before_write(self, engine):
+        """Test que les lignes sont écrites après flush avec leur id."""
+        store = _store(engine, flush_interval=0.01)
+        question_id, reponse_id = asyncio.run(_add_pair(store))
+        assert store.flush(timeout=5.0)
+
+        with Session(engine) as session:
+            reponse = session.get(Reponse, reponse_id)
+            assert reponse.question_id == question_id
+            assert reponse.question.question_label == "VPN"
+        store.close()
+
+    def test_batches_rows(self, engine):
+        """Test que plusieurs lignes sont écrites en une transaction."""
+        store = _store(engine, batch_size=100, flush_interval=0.2)
+
+        async def add_many():
+            for i in range(5):
+                await _add_pair(store, f"Q{i}")
+
+        asyncio.run(add_many())
+        assert store.flush(timeout=5.0)
+
+        assert store.rows_written == 10
+        assert store.batches == 1
+        store.close()
+
+    def test_close_writes_pending_rows(self, engine):
+        """Test que l'arrêt écrit les lignes restantes."""
+        store = _store(engine, flush_interval=1.0)
+        asyncio.run(_add_pair(store))
+        store.close()
+
+        with Session(engine) as session:
+            assert len(session.exec(select(Reponse)).all()) == 1
+
+    def test_failed_row_does_not_block_batch(self, engine):
+        """Test qu'une ligne invalide n'empêche pas l'écriture des autres."""
+        store = _store(engine, flush_interval=0.2)
+
+        async def add_rows():
+            await store.add(_question("ok"))
+            # Libellé obligatoire manquant
+            await store.add(Question(user_ad_id=1, question_label=None))
+
+        asyncio.run(add_rows())
+        assert store.flush(timeout=5.0)
+
+        assert store.rows_written == 1
+        assert store.rows_failed == 1
+        store.close()
+
+    def test_sync_mode(self, engine):
+        """Test que le mode synchrone écrit immédiatement."""
+        store = WriteBehindStore(engine, mode="sync")
+        _, reponse_id = asyncio.run(_add_pair(store))
+
+        with Session(engine) as session:
+            assert session.get(Reponse, reponse_id) is not None
+        assert store.stats()["mode"] == "sync"
+
+    def test_sqlite_multi_process_refused(self, engine):
+        """Test que l'écriture différée exige un seul processus hors PostgreSQL."""
+        assert WriteBehindStore(engine).stats()["mode"] == "sync"
+
+    def test_duplicate_id_not_overwritten(self, engine):
+        """Test qu'un identifiant déjà pris par un autre processus n'écrase rien."""
+        first, second = _store(engine, flush_interval=0.01), _store(engine, flush_interval=0.01)
+        question_id = asyncio.run(first.add(_question("premier")))
+        assert first.flush(timeout=5.0)
+        # Même identifiant attribué par le compteur d'un autre processus
+        duplicate = _question("second")
+        duplicate.id = question_id
+        asyncio.run(second.add(duplicate))
+        assert second.flush(timeout=5.0)
+
+        with Session(engine) as session:
+            assert session.get(Question, question_id).question_label == "premier"
+        assert second.failed(Question, question_id)
+        assert second.stats()["last_error"].startswith(f"Question #{question_id}")
+        first.close()
+        second.close()
+
+    def test_wait_for_single_row(self, engine):
+        """Test l'attente d'une ligne en file ; un id inconnu n'attend pas."""
+        store = _store(engine, flush_interval=0.2)
+        question_id = asyncio.run(store.add(_question()))
+        assert store.is_pending(Question, question_id)
+        assert not store.is_pending(Question, question_id + 1000)
+
+        assert store.wait_for(Question, question_id, timeout=5.0)
+        assert not store.is_pending(Question, question_id)
+        assert not store.failed(Question, question_id)
+        store.close()
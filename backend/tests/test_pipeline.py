@@ -0,0 +1,110 @@
+"""Tests pour le graphe d'étapes asynchrones."""
+import asyncio
+
+import pytest
+
+from app.pipeline import StageGraph, StageStats
+
+
+def _stage(value, delay=0.0, log=None):
+    async def run(*inputs):
+        if log is not None:
+            log.append(("start", value))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", value))
+        return (value, inputs)
+    return run
+
+
+class TestStageGraph:
+    """Tests de l'exécution du graphe."""
+
+    def test_passes_dependency_results(self):
+        """Test que chaque étape reçoit les résultats de ses dépendances."""
+        graph = StageGraph()
+        graph.add("a", _stage("a"))
+        graph.add("b", _stage("b"), after=["a"])
+
+        results = asyncio.run(graph.run())
+        assert results["a"] == ("a", ())
+        assert results["b"] == ("b", (("a", ()),))
+
+    def test_independent_stages_run_concurrently(self):
+        """Test que deux étapes indépendantes se chevauchent."""
+        log = []
+        graph = StageGraph()
+        graph.add("a", _stage("a", 0.02, log))
+        graph.add("b", _stage("b", 0.02, log))
+        asyncio.run(graph.run())
+
+        assert log[:2] == [("start", "a"), ("start", "b")]
+
+    def test_unknown_dependency(self):
+        """Test qu'une dépendance non déclarée est refusée."""
+        graph = StageGraph()
+        with pytest.raises(ValueError):
+            graph.add("b", _stage("b"), after=["a"])
+
+    def test_duplicate_stage(self):
+        """Test qu'un nom d'étape ne peut être déclaré deux fois."""
+        graph = StageGraph()
+        graph.add("a", _stage("a"))
+        with pytest.raises(ValueError):
+            graph.add("a", _stage("a"))
+
+    def test_failure_cancels_other_stages(self):
+        """Test qu'une erreur est propagée et annule les autres étapes."""
+        log = []
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        graph = StageGraph()
+        graph.add("slow", _stage("slow", 1.0, log))
+        graph.add("fail", fail)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(graph.run())
+        assert ("end", "slow") not in log
+
+    def test_critical_path(self):
+        """Test que le chemin critique suit les étapes les plus lentes."""
+        graph = StageGraph()
+        graph.add("embed", _stage("embed", 0.01))
+        graph.add("slow", _stage("slow", 0.05), after=["embed"])
+        graph.add("fast", _stage("fast"), after=["embed"])
+        graph.add("end", _stage("end"), after=["slow", "fast"])
+        asyncio.run(graph.run())
+
+        assert graph.critical_path() == ["embed", "slow", "end"]
+
+    def test_server_timing(self):
+        """Test le format de l'en-tête Server-Timing."""
+        graph = StageGraph()
+        graph.add("a", _stage("a"))
+        graph.add("b", _stage("b"), after=["a"])
+        asyncio.run(graph.run())
+
+        header = graph.server_timing()
+        assert header.startswith("a;dur=")
+        assert ", b;dur=" in header
+
+
+class TestStageStats:
+    """Tests de l'agrégation des durées."""
+
+    def test_record(self):
+        """Test les compteurs agrégés par étape."""
+        stats = StageStats()
+        for _ in range(2):
+            graph = StageGraph()
+            graph.add("a", _stage("a"))
+            graph.add("b", _stage("b", 0.01))
+            asyncio.run(graph.run())
+            stats.record(graph)
+
+        result = stats.stats()
+        assert result["a"]["count"] == 2
+        assert result["b"]["critical_ratio"] == 1.0
+        assert result["b"]["max_ms"] >= result["b"]["avg_ms"] > 0
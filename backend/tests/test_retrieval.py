@@ -0,0 +1,359 @@
+"""Tests pour le moteur de recherche (BM25 et vectoriel)."""
+import asyncio
+
+import pytest
+from app.retrieval import (
+    BM25Index,
+    DenseIndex,
+    KnowledgeIndex,
+    fold_accents,
+    fuse_ranks,
+    split_passages,
+    tokenize
+)
+
+
+ARTICLE = """# Guide VPN
+
+## Windows
+Installer Cisco AnyConnect depuis le portail.
+Se connecter avec vpn.univ.fr.
+
+## macOS
+Autoriser l'extension système dans les préférences.
+
+## Imprimantes
+Ajouter la file d'impression Xerox.
+Choisir le pilote PCL6.
+"""
+
+
+class TestTokenize:
+    """Tests de la tokenisation."""
+
+    def test_fold_accents(self):
+        """Test suppression des accents."""
+        assert fold_accents("Réseau, câble, écran") == "Reseau, cable, ecran"
+
+    def test_tokenize_lowercase_and_accents(self):
+        """Test que les termes sont en minuscules et sans accents."""
+        assert tokenize("Problème RÉSEAU") == ["probleme", "reseau"]
+
+    def test_tokenize_removes_stopwords(self):
+        """Test suppression des mots vides."""
+        assert tokenize("Comment configurer le VPN ?") == ["configurer", "vpn"]
+
+    def test_tokenize_plural(self):
+        """Test que pluriel et singulier donnent le même terme."""
+        assert tokenize("imprimantes") == tokenize("imprimante")
+        assert tokenize("réseaux") == tokenize("réseau")
+
+    def test_tokenize_keeps_error_codes(self):
+        """Test que les codes d'erreur restent un seul terme."""
+        assert tokenize("Erreur MEMORY_MANAGEMENT") == ["erreur", "memory_management"]
+
+
+class TestSplitPassages:
+    """Tests du découpage en passages."""
+
+    def test_one_passage_per_section(self):
+        """Test que chaque titre ouvre un passage (titre seul rattaché)."""
+        lines = ARTICLE.splitlines()
+        passages = split_passages(ARTICLE, max_chars=200)
+        assert [lines[start] for start, _ in passages] == [
+            "# Guide VPN", "## macOS", "## Imprimantes"
+        ]
+        assert passages[-1][1] == len(lines)
+
+    def test_long_section_windows_overlap(self):
+        """Test le découpage d'une section longue en fenêtres recouvrantes."""
+        text = "\n".join(f"Ligne numéro {i:02d}" for i in range(20))
+        passages = split_passages(text, max_chars=80, overlap=20)
+        assert len(passages) > 1
+        assert passages[0][0] == 0 and passages[-1][1] == 20
+        for (_, end), (start, _) in zip(passages, passages[1:]):
+            assert start == end - 1
+
+    def test_short_text_single_passage(self):
+        assert split_passages("Redémarrer le poste.") == [(0, 1)]
+        assert split_passages("") == [(0, 0)]
+
+
+class TestBM25Index:
+    """Tests de l'index BM25."""
+
+    @pytest.fixture
+    def index(self):
+        index = BM25Index()
+        index.add("vpn", "Connexion VPN impossible, timeout du client VPN")
+        index.add("printer", "L'imprimante du bureau ne répond plus")
+        index.add("mail", "Outlook est lent à la réception des emails")
+        return index
+
+    def test_search_ranks_matching_document_first(self, index):
+        """Test que le document pertinent arrive en tête."""
+        results = index.search("problème de VPN")
+        assert results[0][0] == "vpn"
+
+    def test_search_only_matching_documents(self, index):
+        """Test que seuls les documents contenant un terme sont retournés."""
+        keys = [key for key, _ in index.search("imprimante")]
+        assert keys == ["printer"]
+
+    def test_scores_are_normalized(self, index):
+        """Test que les scores sont dans [0, 1]."""
+        for _, score in index.search("VPN outlook imprimante"):
+            assert 0.0 < score <= 1.0
+
+    def test_full_match_scores_higher_than_partial(self, index):
+        """Test qu'une requête entièrement couverte a un score élevé."""
+        full = dict(index.search("client VPN"))
+        partial = dict(index.search("client VPN xyzinconnu"))
+        assert full["vpn"] > partial["vpn"]
+        assert full["vpn"] >= 0.5
+
+    def test_search_limit(self, index):
+        """Test la limite de résultats."""
+        assert len(index.search("VPN outlook imprimante", limit=2)) == 2
+
+    def test_search_empty_query(self, index):
+        """Test requête vide ou composée de mots vides."""
+        assert index.search("") == []
+        assert index.search("le la les") == []
+
+    def test_add_replaces_document(self, index):
+        """Test que ré-indexer une clé remplace son contenu."""
+        index.add("vpn", "Messagerie Exchange")
+        assert index.search("VPN") == []
+        assert len(index) == 3
+
+    def test_remove_document(self, index):
+        """Test suppression d'un document."""
+        index.remove("printer")
+        assert "printer" not in index
+        assert index.search("imprimante") == []
+
+
+class TestDenseIndex:
+    """Tests de l'index vectoriel."""
+
+    @pytest.fixture
+    def index(self):
+        index = DenseIndex()
+        index.add("x", [1.0, 0.0, 0.0])
+        index.add("y", [0.0, 2.0, 0.0])
+        index.add("xy", [1.0, 1.0, 0.0])
+        return index
+
+    def test_search_cosine_order(self, index):
+        """Test l'ordre par similarité cosinus."""
+        results = index.search([1.0, 0.1, 0.0])
+        assert [key for key, _ in results] == ["x", "xy", "y"]
+        assert results[0][1] == pytest.approx(0.995, abs=1e-3)
+
+    def test_search_limit(self, index):
+        """Test la sélection partielle des k meilleurs."""
+        results = index.search([0.0, 1.0, 0.1], limit=2)
+        assert [key for key, _ in results] == ["y", "xy"]
+
+    def test_add_replaces_vector(self, index):
+        """Test remplacement de l'embedding d'une clé."""
+        index.add("x", [0.0, 0.0, 1.0])
+        assert len(index) == 3
+        assert index.search([0.0, 0.0, 1.0], limit=1)[0][0] == "x"
+
+    def test_remove_keeps_other_rows(self, index):
+        """Test que la suppression conserve les autres vecteurs."""
+        index.remove("x")
+        assert "x" not in index
+        assert index.search([0.0, 1.0, 0.0], limit=1)[0][0] == "y"
+        assert index.search([1.0, 1.0, 0.0], limit=1)[0][0] == "xy"
+
+    def test_grows_beyond_initial_capacity(self):
+        """Test l'agrandissement de la matrice."""
+        index = DenseIndex()
+        for i in range(40):
+            index.add(i, [float(i), 1.0])
+        assert len(index) == 40
+        assert index.search([39.0, 1.0], limit=1)[0][0] == 39
+
+    def test_dimension_mismatch(self, index):
+        """Test qu'une dimension différente est refusée."""
+        with pytest.raises(ValueError):
+            index.add("z", [1.0, 0.0])
+
+    def test_search_empty_index(self):
+        """Test recherche dans un index vide."""
+        assert DenseIndex().search([1.0, 0.0]) == []
+
+
+class TestKnowledgeIndex:
+    """Tests de l'index de documents GLPI."""
+
+    def test_search_returns_document_with_score(self):
+        """Test que le résultat reprend le document et ajoute un score."""
+        index = KnowledgeIndex()
+        document = {
+            "source": "faq",
+            "id": 1,
+            "title": "VPN",
+            "content": "Utilisez Cisco AnyConnect",
+            "metadata": {"category": "Réseau"},
+        }
+        index.upsert(document, "Accès VPN avec Cisco AnyConnect")
+
+        results = index.search("anyconnect")
+        assert len(results) == 1
+        assert results[0]["id"] == 1
+        assert results[0]["metadata"] == {"category": "Réseau"}
+        assert "score" in results[0]
+        assert "score" not in document
+
+    def test_embed_pending_enables_dense_search(self):
+        """Test que les documents en attente sont embarqués."""
+        index = KnowledgeIndex()
+        for doc_id, text in enumerate(["wifi", "outlook"]):
+            index.upsert(
+                {"source": "faq", "id": doc_id, "title": text,
+                 "content": text, "metadata": {}},
+                text
+            )
+        assert index.pending_embeddings == 2
+
+        vectors = {"wifi": [1.0, 0.0], "outlook": [0.0, 1.0]}
+
+        async def embed(text):
+            return vectors[text]
+
+        assert asyncio.run(index.embed_pending(embed)) == 2
+        assert index.pending_embeddings == 0
+
+        hits = index.search_dense_passages([0.9, 0.1], limit=1)
+        results = index.collapse(hits)
+        assert results[0]["title"] == "wifi"
+        assert results[0]["score"] > 0.9
+
+    def test_failed_embeddings_stay_pending(self):
+        """Test qu'un embedding en échec n'annule pas les autres."""
+        index = KnowledgeIndex()
+        for doc_id, text in enumerate(["wifi", "outlook"]):
+            index.upsert(
+                {"source": "faq", "id": doc_id, "title": text,
+                 "content": text, "metadata": {}},
+                text
+            )
+
+        async def embed(text):
+            if text == "outlook":
+                raise ConnectionError("ollama")
+            return [1.0, 0.0]
+
+        assert asyncio.run(index.embed_pending(embed)) == 1
+        assert index.pending_embeddings == 1
+
+    def test_upsert_invalidates_embedding(self):
+        """Test qu'un document modifié doit être ré-embarqué."""
+        index = KnowledgeIndex()
+        document = {"source": "faq", "id": 1, "title": "t",
+                    "content": "c", "metadata": {}}
+        index.upsert(document, "avant")
+
+        async def embed(text):
+            return [1.0, 0.0]
+
+        asyncio.run(index.embed_pending(embed))
+        index.upsert(document, "après")
+        assert index.pending_embeddings == 1
+        assert index.search_dense_passages([1.0, 0.0]) == []
+
+
+class TestPassageSearch:
+    """Tests de la recherche par passages."""
+
+    @pytest.fixture
+    def index(self):
+        index = KnowledgeIndex(max_chars=200)
+        index.upsert(
+            {"source": "kb_article", "id": 1, "title": "Guide VPN",
+             "content": ARTICLE, "metadata": {}},
+            ARTICLE
+        )
+        index.upsert(
+            {"source": "faq", "id": 2, "title": "Wifi",
+             "content": "Se connecter au réseau eduroam.", "metadata": {}},
+            "Wifi eduroam"
+        )
+        return index
+
+    def test_passages_indexed(self, index):
+        assert len(index) == 2
+        assert index.passage_count == 4
+
+    def test_content_reduced_to_matching_section(self, index):
+        """Test que seul le passage trouvé est renvoyé, avec son titre."""
+        [result] = index.search("pilote Xerox")
+        assert result["id"] == 1
+        assert result["content"].startswith("## Imprimantes")
+        assert "AnyConnect" not in result["content"]
+
+    def test_one_result_per_document(self, index):
+        """Test le regroupement des passages d'un même document."""
+        results = index.search("AnyConnect extension impression eduroam")
+        assert sorted(r["id"] for r in results) == [1, 2]
+
+    def test_adjacent_passages_merged(self, index):
+        """Test la fusion de passages contigus et la coupure sinon."""
+        merged = index.collapse(
+            [(("kb_article", 1, 0), 1.0), (("kb_article", 1, 1), 0.5)]
+        )
+        assert "[...]" not in merged[0]["content"]
+        assert "## Windows" in merged[0]["content"]
+        assert "## macOS" in merged[0]["content"]
+
+        apart = index.collapse(
+            [(("kb_article", 1, 0), 1.0), (("kb_article", 1, 2), 0.5)]
+        )
+        assert "\n[...]\n## Imprimantes" in apart[0]["content"]
+        assert apart[0]["score"] == 1.0
+
+    def test_short_document_unchanged(self, index):
+        [result] = index.search("eduroam")
+        assert result["content"] == "Se connecter au réseau eduroam."
+
+    def test_upsert_replaces_passages(self, index):
+        """Test qu'un document raccourci perd ses anciens passages."""
+        index.upsert(
+            {"source": "kb_article", "id": 1, "title": "Guide VPN",
+             "content": "Utiliser AnyConnect.", "metadata": {}},
+            "Guide VPN AnyConnect"
+        )
+        assert index.passage_count == 2
+        assert index.search("Xerox") == []
+
+        index.remove("kb_article", 1)
+        assert index.passage_count == 1
+
+
+class TestFuseRanks:
+    """Tests de la fusion de classements par rang réciproque (RRF)."""
+
+    def test_key_in_both_rankings_wins(self):
+        """Test qu'une clé classée par les deux moteurs passe devant."""
+        fused = fuse_ranks([([("a", 0.9), ("b", 0.5)], 1.0), ([("b", 0.8)], 1.0)])
+        assert [key for key, _ in fused] == ["b", "a"]
+        assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+    def test_weights(self):
+        """Test que le poids favorise un classement."""
+        fused = fuse_ranks([([("a", 1.0)], 0.5), ([("b", 0.9)], 2.0)])
+        assert fused[0][0] == "b"
+
+    def test_scores_ignored(self):
+        """Test que seul le rang compte, pas l'échelle des scores."""
+        fused = fuse_ranks([([("a", 12.0)], 1.0), ([("b", 0.3)], 1.0)], k=60)
+        assert fused[0][1] == fused[1][1] == pytest.approx(1 / 61)
+
+    def test_limit(self):
+        """Test la limite de résultats."""
+        hits = [(i, 1.0) for i in range(10)]
+        assert len(fuse_ranks([(hits, 1.0)], limit=4)) == 4
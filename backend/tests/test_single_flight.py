@@ -0,0 +1,249 @@
+"""Tests pour la mutualisation des calculs identiques (single-flight)."""
+import asyncio
+
+import httpx
+import pytest
+
+from app import llm
+from app import main
+from app.single_flight import SingleFlight
+
+
+def _counting(calls, value="ok", delay=0.02, error=None):
+    async def run():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+    return run
+
+
+class TestDo:
+    """Tests du partage d'une coroutine."""
+
+    def test_concurrent_calls_share_result(self):
+        """Test que des appels simultanés de même clé n'exécutent qu'un calcul."""
+        flights, calls = SingleFlight(), []
+
+        async def run():
+            return await asyncio.gather(
+                *(flights.do("vpn", _counting(calls)) for _ in range(5))
+            )
+
+        assert asyncio.run(run()) == ["ok"] * 5
+        assert calls == ["ok"]
+        stats = flights.stats()
+        assert (stats["leaders"], stats["followers"], stats["in_flight"]) == (1, 4, 0)
+
+    def test_distinct_keys_not_shared(self):
+        flights, calls = SingleFlight(), []
+
+        async def run():
+            return await asyncio.gather(
+                flights.do("vpn", _counting(calls, "a")),
+                flights.do("imprimante", _counting(calls, "b")),
+            )
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert sorted(calls) == ["a", "b"]
+
+    def test_key_released_after_completion(self):
+        """Test qu'un appel postérieur relance le calcul."""
+        flights, calls = SingleFlight(), []
+
+        async def run():
+            await flights.do("vpn", _counting(calls))
+            await flights.do("vpn", _counting(calls))
+
+        asyncio.run(run())
+        assert len(calls) == 2
+
+    def test_error_propagated_to_all(self):
+        flights, calls = SingleFlight(), []
+
+        async def run():
+            return await asyncio.gather(
+                *(flights.do("vpn", _counting(calls, error=ValueError("panne")))
+                  for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(calls) == 1
+        assert flights.stats()["in_flight"] == 0
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test que l'annulation du premier demandeur n'interrompt pas le calcul."""
+        flights, calls = SingleFlight(), []
+
+        async def run():
+            leader = asyncio.ensure_future(flights.do("vpn", _counting(calls)))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do("vpn", _counting(calls)))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == "ok"
+        assert len(calls) == 1
+
+
+class TestStream:
+    """Tests du partage d'un générateur."""
+
+    def test_late_subscriber_replays(self):
+        """Test qu'un abonné tardif reçoit aussi les éléments déjà produits."""
+        flights, started = SingleFlight(), []
+
+        async def source():
+            started.append(True)
+            for i in range(4):
+                yield i
+                await asyncio.sleep(0.01)
+
+        async def collect(delay):
+            await asyncio.sleep(delay)
+            return [item async for item in flights.stream("vpn", source)]
+
+        async def run():
+            return await asyncio.gather(collect(0), collect(0.015))
+
+        assert asyncio.run(run()) == [[0, 1, 2, 3], [0, 1, 2, 3]]
+        assert len(started) == 1
+        assert flights.stats()["followers"] == 1
+
+    def test_error_propagated(self):
+        flights = SingleFlight()
+
+        async def source():
+            yield "sources"
+            raise RuntimeError("ollama")
+
+        async def run():
+            items = []
+            with pytest.raises(RuntimeError):
+                async for item in flights.stream("vpn", source):
+                    items.append(item)
+            return items
+
+        assert asyncio.run(run()) == ["sources"]
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    """Enregistrements Question/Reponse en mémoire (sans base de données)."""
+    stored = []
+
+    async def store_question(request, embedding):
+        stored.append(("question", request.user_ad_id))
+        return len(stored)
+
+    async def store_reponse(question_id, reponse_label, technicien_id):
+        stored.append(("reponse", question_id))
+        return len(stored)
+
+    monkeypatch.setattr(main, "_store_question", store_question)
+    monkeypatch.setattr(main, "_store_reponse", store_reponse)
+    return stored
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, rows):
+    """Pipeline /ask/ sans Ollama ; compte les générations."""
+    generations = []
+
+    async def get_embedding(text):
+        return [0.1] * 8
+
+    async def search_glpi(question, question_embedding=None):
+        return [], False
+
+    async def select_context(question, glpi_results, relevant):
+        return [], None
+
+    async def classify_question(embedding):
+        return None
+
+    async def get_chat_response(prompt):
+        generations.append(prompt)
+        await asyncio.sleep(0.05)
+        return "Redémarrez le client VPN."
+
+    async def stream_rag_response(question, question_embedding=None):
+        generations.append(question)
+        yield "sources", []
+        await asyncio.sleep(0.05)
+        yield "token", "Redémarrez le client VPN."
+        yield "answer", ("Redémarrez le client VPN.", None)
+
+    for func in (
+        get_embedding, search_glpi, select_context, classify_question,
+        get_chat_response, stream_rag_response,
+    ):
+        monkeypatch.setattr(llm, func.__name__, func)
+    monkeypatch.setattr(main.settings, "ASK_COALESCING_ENABLED", True)
+    return generations
+
+
+def _post_concurrently(path, questions):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await asyncio.gather(*(
+                client.post(path, json={
+                    "user_ad_id": user, "question": question, "use_cache": False
+                })
+                for user, question in enumerate(questions, start=1)
+            ))
+
+    return asyncio.run(run())
+
+
+class TestAskCoalescing:
+    """Tests de /ask/ et /ask/stream avec questions identiques simultanées."""
+
+    def test_ask_shares_generation(self, fake_llm, rows):
+        """Test une génération pour trois demandeurs, chacun sa réponse en base."""
+        responses = _post_concurrently("/ask/", ["VPN ne marche pas"] * 3)
+
+        assert [r.status_code for r in responses] == [200] * 3
+        assert len(fake_llm) == 1
+        data = [r.json() for r in responses]
+        assert {d["answer"] for d in data} == {"Redémarrez le client VPN."}
+        assert len({d["response_id"] for d in data}) == 3
+        assert {d["question"] for d in data} == {"VPN ne marche pas"}
+        assert sorted(r for r in rows if r[0] == "question") == [
+            ("question", 1), ("question", 2), ("question", 3)
+        ]
+
+    def test_ask_different_questions_not_shared(self, fake_llm):
+        _post_concurrently("/ask/", ["VPN ne marche pas", "Imprimante bloquée"])
+        assert len(fake_llm) == 2
+
+    def test_ask_variant_labels_not_shared(self, fake_llm):
+        """Test la casse et les espaces du libellé séparent les calculs."""
+        _post_concurrently(
+            "/ask/", ["VPN ne marche pas", "vpn  ne marche pas", "VPN ne marche pas "]
+        )
+        assert len(fake_llm) == 3
+
+    def test_stream_shares_generation(self, fake_llm, rows):
+        responses = _post_concurrently("/ask/stream", ["VPN ne marche pas"] * 3)
+
+        assert len(fake_llm) == 1
+        ids = set()
+        for response in responses:
+            assert "event: token" in response.text
+            done = response.text.split("event: done\ndata: ")[1]
+            ids.add(done.split('"response_id": ')[1].split(",")[0])
+        assert len(ids) == 3
+        assert len([r for r in rows if r[0] == "question"]) == 3
+
+    def test_disabled(self, fake_llm, monkeypatch):
+        monkeypatch.setattr(main.settings, "ASK_COALESCING_ENABLED", False)
+        _post_concurrently("/ask/", ["VPN ne marche pas"] * 2)
+        assert len(fake_llm) == 2
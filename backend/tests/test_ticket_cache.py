@@ -0,0 +1,171 @@
+"""Tests pour le cache des détails de tickets."""
+import asyncio
+
+import pytest
+
+from app.ticket_cache import TicketCache
+
+
+class FakeTickets:
+    """Détails de tickets GLPI et compteurs d'appels."""
+
+    def __init__(self):
+        self.date_mod = {1: "2025-01-01 10:00:00"}
+        self.fetches = 0
+        self.checks = 0
+        self.down = False
+        self.fetch_fails = False
+
+    async def fetch(self, ticket_id):
+        self.fetches += 1
+        if self.fetch_fails:
+            raise TimeoutError("TicketFollowup")
+        if ticket_id not in self.date_mod:
+            return None
+        return {"id": ticket_id, "date_mod": self.date_mod[ticket_id]}
+
+    async def fetch_date_mod(self, ticket_id):
+        self.checks += 1
+        if self.down:
+            raise ConnectionError("GLPI injoignable")
+        return self.date_mod.get(ticket_id)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.ticket_cache.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def _get(cache, tickets, ticket_id=1):
+    return asyncio.run(cache.get(ticket_id, tickets.fetch, tickets.fetch_date_mod))
+
+
+class TestTicketCache:
+    """Tests de la fraîcheur et de la revalidation."""
+
+    def test_fresh_entry_served_without_glpi(self, clock):
+        """Test qu'une entrée récente ne sollicite pas GLPI."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        _get(cache, tickets)
+        clock[0] += 10
+        assert _get(cache, tickets)["id"] == 1
+        assert tickets.fetches == 1
+        assert tickets.checks == 0
+        assert cache.stats()["hits"] == 1
+
+    def test_unchanged_ticket_revalidated(self, clock):
+        """Test qu'un date_mod inchangé évite le rechargement complet."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        _get(cache, tickets)
+        clock[0] += 60
+        _get(cache, tickets)
+        assert tickets.fetches == 1
+        assert tickets.checks == 1
+        assert cache.stats()["revalidated"] == 1
+
+        # Revalidé : de nouveau frais
+        clock[0] += 10
+        _get(cache, tickets)
+        assert tickets.checks == 1
+
+    def test_modified_ticket_reloaded(self, clock):
+        """Test qu'un date_mod modifié recharge les détails."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        _get(cache, tickets)
+        tickets.date_mod[1] = "2025-01-02 10:00:00"
+        clock[0] += 60
+        assert _get(cache, tickets)["date_mod"] == "2025-01-02 10:00:00"
+        assert tickets.fetches == 2
+        assert cache.stats()["refreshed"] == 1
+
+    def test_stale_served_when_glpi_down(self, clock):
+        """Test qu'une copie périmée est servie si GLPI est injoignable."""
+        cache, tickets = TicketCache(ttl=30, max_stale=3600), FakeTickets()
+        _get(cache, tickets)
+        tickets.down = True
+        clock[0] += 60
+        assert _get(cache, tickets)["id"] == 1
+        assert cache.stats()["stale_served"] == 1
+
+        # Au-delà de max_stale, l'entrée n'est plus utilisable
+        clock[0] += 3600
+        _get(cache, tickets)
+        assert tickets.fetches == 2
+
+    def test_stale_served_when_reload_fails(self, clock):
+        """Test qu'un rechargement en échec sert la copie au lieu de l'oublier."""
+        cache, tickets = TicketCache(ttl=30, max_stale=3600), FakeTickets()
+        _get(cache, tickets)
+        tickets.date_mod[1] = "2025-01-02 10:00:00"
+        tickets.fetch_fails = True
+        clock[0] += 60
+        assert _get(cache, tickets)["date_mod"] == "2025-01-01 10:00:00"
+        assert cache.stats()["stale_served"] == 1
+        assert cache.stats()["size"] == 1
+
+        tickets.fetch_fails = False
+        assert _get(cache, tickets)["date_mod"] == "2025-01-02 10:00:00"
+
+    def test_failed_fetch_not_cached(self, clock):
+        """Test qu'un échec sans copie en cache est levé et rien n'est stocké."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        tickets.fetch_fails = True
+        with pytest.raises(TimeoutError):
+            _get(cache, tickets)
+        assert cache.stats()["size"] == 0
+
+    def test_invalidate(self, clock):
+        """Test qu'un ticket modifié par le service est relu."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        _get(cache, tickets)
+        cache.invalidate(1)
+        _get(cache, tickets)
+        assert tickets.fetches == 2
+        assert cache.stats()["invalidations"] == 1
+
+    def test_invalidated_during_fetch_not_cached(self, clock):
+        """Test qu'une lecture antérieure à une modification n'est pas gardée."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        fetch = tickets.fetch
+
+        async def fetch_then_update(ticket_id):
+            details = await fetch(ticket_id)
+            # update_ticket termine pendant la lecture
+            tickets.date_mod[ticket_id] = "2025-01-02 10:00:00"
+            cache.invalidate(ticket_id)
+            return details
+
+        async def run():
+            first = await cache.get(1, fetch_then_update, tickets.fetch_date_mod)
+            second = await cache.get(1, tickets.fetch, tickets.fetch_date_mod)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first["date_mod"] == "2025-01-01 10:00:00"
+        assert second["date_mod"] == "2025-01-02 10:00:00"
+        assert tickets.fetches == 2
+
+    def test_invalidated_during_revalidation_not_cached(self, clock):
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        _get(cache, tickets)
+        clock[0] += 60
+        fetch_date_mod = tickets.fetch_date_mod
+
+        async def check_then_update(ticket_id):
+            date_mod = await fetch_date_mod(ticket_id)
+            cache.invalidate(ticket_id)
+            return date_mod
+
+        asyncio.run(cache.get(1, tickets.fetch, check_then_update))
+        assert cache.stats()["size"] == 0
+
+    def test_missing_ticket_not_cached(self, clock):
+        """Test qu'un ticket introuvable n'est pas mis en cache."""
+        cache, tickets = TicketCache(ttl=30), FakeTickets()
+        assert _get(cache, tickets, ticket_id=99) is None
+        assert _get(cache, tickets, ticket_id=99) is None
+        assert tickets.fetches == 2
+        assert cache.stats()["size"] == 0
@@ -0,0 +1,165 @@
+"""Tests pour la recherche web contre un serveur HTTP local."""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.web_search import WebSearchCache, WebSearchClient, normalize_query
+
+
+@pytest.fixture
+def endpoint():
+    """Serveur local imitant /api/web_search ; expose les requêtes reçues."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received.append((self.headers["Authorization"], body))
+            if body["query"] == "panne":
+                self.send_response(503)
+                self.end_headers()
+                return
+            payload = json.dumps({"results": [
+                {
+                    "title": f"Résultat {i} pour {body['query']}",
+                    "url": f"https://example.org/{i}",
+                    "content": "Contenu",
+                }
+                for i in range(body["max_results"])
+            ]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/web_search", received
+    server.shutdown()
+    server.server_close()
+
+
+def _search(client, *queries, max_results=2):
+    async def run():
+        try:
+            return [await client.search(q, max_results=max_results) for q in queries]
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+class TestNormalizeQuery:
+    """Tests de la normalisation des requêtes."""
+
+    def test_case_and_spaces(self):
+        assert normalize_query("  Configurer   le VPN\n") == "configurer le vpn"
+
+    def test_unicode_forms(self):
+        assert normalize_query("ﬁchier") == normalize_query("fichier")
+
+
+class TestWebSearchClient:
+    """Tests du client de recherche web."""
+
+    def test_results_and_auth(self, endpoint):
+        """Test l'appel à l'API et la clé transmise."""
+        url, received = endpoint
+        client = WebSearchClient(url, "secret")
+        [results] = _search(client, "vpn")
+
+        assert [r["url"] for r in results] == [
+            "https://example.org/0", "https://example.org/1"
+        ]
+        assert received == [
+            ("Bearer secret", {"query": "vpn", "max_results": 2})
+        ]
+
+    def test_normalized_query_cached(self, endpoint):
+        """Test qu'une requête équivalente est servie depuis le cache."""
+        url, received = endpoint
+        cache = WebSearchCache(maxsize=16, max_age=60)
+        client = WebSearchClient(url, "secret", cache=cache)
+
+        first, second = _search(client, "Config VPN", "  config   vpn ")
+        assert second == first
+        assert len(received) == 1
+        assert client.stats()["cache"]["memory_hits"] == 1
+
+    def test_max_results_part_of_key(self, endpoint):
+        url, received = endpoint
+        client = WebSearchClient(url, "secret", cache=WebSearchCache(16, 60))
+        _search(client, "vpn", max_results=2)
+        _search(client, "vpn", max_results=3)
+        assert len(received) == 2
+
+    def test_errors_not_cached(self, endpoint):
+        """Test qu'une erreur renvoie une liste vide sans être mise en cache."""
+        url, received = endpoint
+        client = WebSearchClient(url, "secret", cache=WebSearchCache(16, 60))
+        assert _search(client, "panne", "panne") == [[], []]
+        assert len(received) == 2
+        assert client.stats()["errors"] == 2
+
+    def test_disabled_without_key(self, endpoint):
+        url, received = endpoint
+        assert _search(WebSearchClient(url, None), "vpn") == [[]]
+        assert received == []
+
+    def test_disk_cache_shared(self, endpoint, tmp_path):
+        """Test que le cache disque sert un autre processus (autre instance)."""
+        url, received = endpoint
+        path = str(tmp_path / "web.db")
+        _search(WebSearchClient(url, "secret", cache=WebSearchCache(16, 60, path)), "vpn")
+
+        other = WebSearchClient(url, "secret", cache=WebSearchCache(16, 60, path))
+        [results] = _search(other, "VPN")
+        assert len(results) == 2
+        assert len(received) == 1
+        assert other.stats()["cache"]["disk_hits"] == 1
+
+    def test_cache_off_event_loop(self, endpoint, tmp_path, monkeypatch):
+        """Test que le cache (lecture disque) n'est pas consulté dans la boucle."""
+        url, _ = endpoint
+        cache = WebSearchCache(16, 60, str(tmp_path / "web.db"))
+        threads = []
+        for name in ("get", "set"):
+            method = getattr(cache, name)
+
+            def spy(*args, _method=method):
+                threads.append(threading.current_thread())
+                return _method(*args)
+
+            monkeypatch.setattr(cache, name, spy)
+
+        _search(WebSearchClient(url, "secret", cache=cache), "vpn")
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+
+    def test_max_age(self, endpoint, tmp_path, monkeypatch):
+        """Test qu'un résultat plus ancien que max_age est redemandé."""
+        url, received = endpoint
+        now = [1000.0]
+        monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+        monkeypatch.setattr("app.cache.time.time", lambda: now[0])
+        cache = WebSearchCache(16, max_age=60, path=str(tmp_path / "web.db"))
+        client = WebSearchClient(url, "secret", cache=cache)
+
+        _search(client, "vpn")
+        now[0] += 30
+        _search(client, "vpn")
+        assert len(received) == 1
+
+        now[0] += 31
+        _search(client, "vpn")
+        assert len(received) == 2
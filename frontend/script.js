@@ -71,7 +71,7 @@ async function sendMessage() {
     typingIndicator.classList.remove('hidden');
 
     try {
-        const response = await fetch(`${API_URL}/ask/`, {
+        const response = await fetch(`${API_URL}/ask/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -82,17 +82,33 @@ async function sendMessage() {
             })
         });
 
-        if (!response.ok) {
+        if (!response.ok || !response.body) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
-
-        // Hide typing indicator
-        typingIndicator.classList.add('hidden');
-
-        // Add assistant response
-        addMessage(data.answer, 'assistant', data.sources, data.response_id);
+        let sources = [];
+        let messageDiv = null;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'sources') {
+                sources = data;
+            } else if (event === 'token') {
+                if (!messageDiv) {
+                    // Premier token : la bulle remplace l'indicateur de saisie
+                    typingIndicator.classList.add('hidden');
+                    messageDiv = addMessage('', 'assistant');
+                }
+                appendToMessage(messageDiv, data);
+            } else if (event === 'done') {
+                typingIndicator.classList.add('hidden');
+                if (!messageDiv) {
+                    messageDiv = addMessage('', 'assistant');
+                }
+                finalizeMessage(messageDiv, data.answer, sources, data.response_id);
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
 
     } catch (error) {
         console.error('Error:', error);
@@ -107,6 +123,40 @@ async function sendMessage() {
     }
 }
 
+// ============================================
+// Read Server-Sent Events
+// ============================================
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // Les évènements sont séparés par une ligne vide
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            let event = 'message';
+            const dataLines = [];
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+
+            if (dataLines.length > 0) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 // ============================================
 // Add Message to Chat
 // ============================================
@@ -147,6 +197,33 @@ function addMessage(text, sender, sources = null, responseId = null) {
 
     // Animation
     messageDiv.style.animation = 'fadeIn 0.3s ease';
+
+    return messageDiv;
+}
+
+// ============================================
+// Streaming Helpers
+// ============================================
+function appendToMessage(messageDiv, text) {
+    const contentDiv = messageDiv.querySelector('.message-content');
+    contentDiv.textContent += text;
+    chatLog.scrollTop = chatLog.scrollHeight;
+}
+
+function finalizeMessage(messageDiv, text, sources, responseId) {
+    // Texte définitif (tag de catégorie retiré côté serveur)
+    messageDiv.querySelector('.message-content').textContent = text;
+
+    if (sources && sources.length > 0) {
+        messageDiv.appendChild(createSourcesElement(sources));
+    }
+
+    if (responseId) {
+        const messageId = messageDiv.id.replace('msg-', '');
+        messageDiv.appendChild(createFeedbackElement(responseId, messageId));
+    }
+
+    chatLog.scrollTop = chatLog.scrollHeight;
 }
 
 // ============================================